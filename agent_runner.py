@@ -1,12 +1,27 @@
-from langchain.agents import initialize_agent, AgentType, Tool
-from langchain_community.llms import Ollama
+from langchain.agents import AgentType, Tool, ZeroShotAgent
 from langchain.agents.agent import AgentExecutor
+from langchain_core.agents import AgentFinish
 from functools import partial
-from tool_registry import tool_registry
+from tool_registry import tool_registry, is_terminal_tool, render_tool_result
 from tools import get_user_id_from_tc_and_verify_identity, get_user_info
-from memory import AgentMemory
+from memory import memory
+from metrics import Counter, Gauge, Histogram
+from intent_classifier import IntentClassifier, load_or_train, normalize_text
+from tool_selector import ToolSelector
+from streaming import StreamEventHandler
+from summarizer import BackgroundSummarizer, llm_summarizer
+from llm_profiles import make_llm, track_token_usage
+from llm_cache import completion_cache_disabled
+from tracing import set_attrs, span, start_trace
+import asyncio
+import os
 import re
-from typing import Dict, Any, Callable
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Any, Callable, Iterable, Literal, Optional, Tuple
+from pydantic import BaseModel, ValidationError
 import json
 from enum import Enum
 
@@ -35,11 +50,46 @@ from tools import (
 )
 
 
-memory = AgentMemory()
-CURRENT_CONTEXT: Dict[str, Any] = {"user_id": None}
-# Modeli deterministik tutun
-llm = Ollama(model="qwen3:32B", base_url="http://localhost:11434", temperature=0.0)
-policy_llm = Ollama(model="qwen3:32B", base_url="http://localhost:11434", temperature=0.0)
+# İstek kapsamlı kullanıcı bağlamı: her thread / asyncio görevi kendi değerini görür.
+# LangChain senkron araçları executor'da çalıştırırken bağlamı kopyaladığı için araçlara da taşınır.
+_CURRENT_USER_ID: ContextVar[Optional[str]] = ContextVar("current_user_id", default=None)
+
+
+def current_user_id() -> Optional[str]:
+    return _CURRENT_USER_ID.get()
+
+
+@contextmanager
+def user_context(user_id: Optional[str]):
+    """Blok süresince current_user_id() değerini ayarlar, çıkışta eski değeri geri yükler."""
+    token = _CURRENT_USER_ID.set(user_id)
+    try:
+        yield
+    finally:
+        _CURRENT_USER_ID.reset(token)
+
+# Modeli deterministik tutun; düşünme kapalı, çıktı uzunluğu profil ile sınırlı (llm_profiles.py)
+llm = make_llm("agent_step", model="qwen3:32B", base_url="http://localhost:11434", temperature=0.0)
+policy_llm = make_llm("supervisor", model="qwen3:32B", base_url="http://localhost:11434", temperature=0.0)
+# Uzun oturumlarda eski turlar arka planda özetlenir (summarizer.py). Özetleyici import sırasında değil,
+# servis başlarken start_background_summaries() ile bağlanır: agent_runner'ı import eden benchmark ve
+# testler canlı LLM'e özet isteği göndermez.
+summary_llm = make_llm("summary", model="qwen3:32B", base_url="http://localhost:11434", temperature=0.0)
+_summarizer: Optional[BackgroundSummarizer] = None
+_summarizer_lock = threading.Lock()
+
+
+def start_background_summaries() -> Optional[BackgroundSummarizer]:
+    """Özetleyiciyi belleğe bir kez bağlar; AGENT_MEMORY_SUMMARIES=0 ise bağlamaz (None)."""
+    global _summarizer
+    if os.environ.get("AGENT_MEMORY_SUMMARIES", "1") == "0":
+        return None
+    with _summarizer_lock:
+        if _summarizer is None:
+            _summarizer = BackgroundSummarizer(llm_summarizer(summary_llm))
+            memory.attach_summarizer(_summarizer)
+    return _summarizer
+
 
 class IntentType(str, Enum):
     CAMPAIGN_JOIN = "kampanyaya_katil"
@@ -89,6 +139,101 @@ intent_to_tool: Dict[IntentType, Callable[..., Any]] = {
     IntentType.GENERAL_QUESTION: general_question
 }
 supported_intents = [i.value for i in IntentType]
+# Araç adı -> niyet; scenarios.json'daki tool_chain_plan etiketlerini niyet uzayına çevirir
+TOOL_TO_INTENT: Dict[str, str] = {func.__name__: intent.value for intent, func in intent_to_tool.items()}
+
+# Yerel sınıflandırıcı bu güvenin üzerindeyse supervisor LLM'i yerine geçer ve araç listesini daraltır.
+# Çapraz doğrulamada eşiği aşan tahminlerin %95'i doğru olacak şekilde seçilir:
+#   python intent_classifier.py --cv 5 --target-precision 0.95   (160 örnek: 19/20 doğru)
+INTENT_CONFIDENCE_THRESHOLD = 0.976
+# Her şeyi kapsayan niyetlerde araç listesi daraltılmaz
+BROAD_INTENTS = {IntentType.GENERAL_QUESTION.value}
+# Sistemde değişiklik yapan niyetler: ajan adımları LLM önbelleğinden okunmaz/yazılmaz
+WRITE_INTENTS = {
+    IntentType.CAMPAIGN_JOIN.value,
+    IntentType.CUSTOMER_INFO_UPDATE.value,
+    IntentType.PACKAGE_CHANGE.value,
+    IntentType.CANCEL_PACKAGE.value,
+    IntentType.ADDITIONAL_PACKAGE.value,
+    IntentType.BILLING_DISPUTE.value,
+    IntentType.TECH_SUPPORT.value,
+    IntentType.CANCEL_SUPPORT_TICKET.value,
+    IntentType.PAY_BILL.value,
+    IntentType.USER_FEEDBACK.value,
+}
+
+_intent_classifier: Optional[IntentClassifier] = None
+_intent_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier() -> IntentClassifier:
+    global _intent_classifier
+    if _intent_classifier is None:
+        with _intent_classifier_lock:
+            if _intent_classifier is None:
+                _intent_classifier = load_or_train(TOOL_TO_INTENT)
+    return _intent_classifier
+
+
+def classify_intent(message: str) -> Tuple[str, float]:
+    try:
+        with span("intent.classify"):
+            intent, confidence = get_intent_classifier().predict(message)
+            set_attrs(intent=intent, confidence=round(confidence, 4))
+            return intent, confidence
+    except Exception as e:
+        print(f"[WARN] Niyet sınıflandırma hatası: {e}")
+        return "", 0.0
+
+
+# --- Araç seçimi -------------------------------------------------------------
+# Ajan promptuna en fazla bu kadar araç girer (niyet kapsamı daha büyükse kapsam korunur)
+TOOL_SELECTION_TOP_K = 6
+# Güven eşiği altında, olasılığı bunu aşan en fazla TOOL_SELECTION_MAX_INTENTS niyetin kapsamı alınır
+TOOL_INTENT_MIN_PROB = 0.15
+TOOL_SELECTION_MAX_INTENTS = 3
+# Sözcüksel eşleşme bu benzerliğin altındaysa araç eklenmez
+TOOL_LEXICAL_MIN_SCORE = 0.05
+# Güven eşiği altında seçilen niyetlerin toplam olasılığı bunun altındaysa alt küme kurulmaz (tüm araçlar)
+TOOL_SELECTION_MIN_MASS = 0.5
+
+
+def select_tool_names(message: str, prediction: Tuple[str, float],
+                      top_k: int = TOOL_SELECTION_TOP_K) -> Optional[list]:
+    """
+    Mesaj için ajana verilecek araç adlarını seçer; None tüm araçlar demektir.
+    Önce niyet kapsamı (güvenliyse tek niyet, değilse olası niyetler), sonra araç açıklamalarıyla
+    sözcüksel eşleşme ile top_k'ya tamamlanır. Genel sorularda da kapsam senaryolardan gelir
+    (çoğunlukla get_user_info), bu yüzden tüm araçlara düşülmez.
+    """
+    intent, confidence = prediction
+    names: list = []
+
+    def _add(candidates):
+        for name in candidates:
+            if name not in names:
+                names.append(name)
+
+    try:
+        classifier = get_intent_classifier()
+        if intent and confidence >= INTENT_CONFIDENCE_THRESHOLD:
+            _add(classifier.tools_for(intent))
+        else:
+            likely = [(i, p) for i, p in classifier.probabilities(message) if p >= TOOL_INTENT_MIN_PROB]
+            likely = likely[:TOOL_SELECTION_MAX_INTENTS]
+            if sum(p for _, p in likely) < TOOL_SELECTION_MIN_MASS:
+                return None
+            for candidate, _ in likely:
+                _add(classifier.tools_for(candidate))
+    except Exception as e:
+        print(f"[WARN] Niyet kapsamı alınamadı: {e}")
+        return None
+
+    for name, score in get_tool_selector().rank(message):
+        if len(names) >= top_k or score < TOOL_LEXICAL_MIN_SCORE:
+            break
+        _add([name])
+    return names or None
 
 
 def call_tool_function(func, params, *args, **kwargs):
@@ -108,7 +253,7 @@ def call_tool_function(func, params, *args, **kwargs):
 
     # user_id otomatik ekle
     if "user_id" in params and not kwargs.get("user_id"):
-        kwargs["user_id"] = CURRENT_CONTEXT.get("user_id")
+        kwargs["user_id"] = current_user_id()
 
     call_args = {}
     for i, p in enumerate(params):
@@ -119,10 +264,33 @@ def call_tool_function(func, params, *args, **kwargs):
         else:
             call_args[p] = None
 
-    if isinstance(call_args, str):
-        return func(call_args)
-    else:
-        return func(**call_args)
+    return invoke_tool(func, call_args)
+
+
+TOOL_CALLS = Counter(
+    "tool_calls_total",
+    "Araç çağrıları (outcome: success, error = success=False dönüşü, exception)",
+    ("tool", "outcome"),
+)
+TOOL_LATENCY = Histogram("tool_call_duration_seconds", "Araç çağrı süresi", ("tool",))
+
+
+def invoke_tool(func, call_args, **span_attrs):
+    """Aracı çağırır; span, çağrı sayısı/hata ve süre metriklerini kaydeder."""
+    tool_name = getattr(func, "__name__", str(func))
+    outcome = "exception"
+    with span("tool", tool=tool_name, **span_attrs), TOOL_LATENCY.time(tool=tool_name):
+        try:
+            if isinstance(call_args, str):
+                result = func(call_args)
+            else:
+                result = func(**call_args)
+            outcome = "error" if isinstance(result, dict) and result.get("success") is False else "success"
+            if isinstance(result, dict):
+                set_attrs(success=result.get("success"))
+            return result
+        finally:
+            TOOL_CALLS.inc(tool=tool_name, outcome=outcome)
 
 def _field_names_from_args_schema(args_schema):
     """
@@ -153,7 +321,32 @@ def make_tools_from_registry(registry):
         )
     return tools
 
-tools = make_tools_from_registry(tool_registry)
+# tool_registry'den üretilen (araç adları, ajan araçları, seçici); sonradan kaydedilen araçlar da
+# seçilebilsin diye kayıtlı adlar değiştiğinde yeniden kurulur
+_tool_set: Tuple[Tuple[str, ...], list, Optional[ToolSelector]] = ((), [], None)
+_tool_set_lock = threading.Lock()
+
+
+def _registered_tool_set():
+    global _tool_set
+    entries = list(tool_registry)
+    names = tuple(entry.name for entry in entries)
+    current = _tool_set
+    if current[0] != names:
+        with _tool_set_lock:
+            current = _tool_set
+            if current[0] != names:
+                current = _tool_set = (names, make_tools_from_registry(entries), ToolSelector.from_registry(entries))
+    return current
+
+
+def get_tools() -> list:
+    """Ajanın kullanabileceği tüm araçlar (tool_registry'nin güncel hali)."""
+    return _registered_tool_set()[1]
+
+
+def get_tool_selector() -> ToolSelector:
+    return _registered_tool_set()[2]
 
 # Çıkışı disipline eden ek kurallar
 STRICT_PREFIX = f"""Sen bir ReAct ajanısın. Sadece iki biçimde yanıt ver:
@@ -194,26 +387,154 @@ def _safe_template(s: str) -> str:
     return s.replace("{", "{{").replace("}", "}}")
 
 
-def build_agent(prefix_extra: str = ""):
+# ZeroShotAgent'ın varsayılan son eki ve önüne bellek değişkenleri (AgentMemory.load_memory_variables):
+# token bütçesine göre kırpılmış geçmiş (özet varsa "Özet: ..." satırıyla) ve ajan durumu
+AGENT_SUFFIX = """Konuşma geçmişi:
+{chat_history}
+
+Ajan durumu:
+{agent_state}
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+AGENT_INPUT_VARIABLES = ["input", "chat_history", "agent_state", "agent_scratchpad"]
+
+
+TERMINAL_RETURN = Counter(
+    "agent_terminal_return_total",
+    "Terminal araç başarılı döndüğü için son LLM turu atlanan ajan çalıştırmaları",
+    ("tool",),
+)
+
+
+AGENT_FALLBACK = Counter(
+    "agent_tool_fallback_total",
+    "Araç alt kümesiyle kurulan ajanın tüm araçlarla yeniden çalıştırıldığı turlar",
+    ("reason",),
+)
+
+# Nihai yanıt yerine dönen ReAct adımı ("Action: ..." / "Action Input: ...")
+_REACT_STEP_RE = re.compile(r"^\s*(Action|Action Input)\s*:", re.MULTILINE)
+
+
+class AgentFallback(Exception):
+    """Ajan turu bitiremedi (alt küme dışı araç ya da nihai yanıt yerine ReAct adımı)."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class TerminalToolAgentExecutor(AgentExecutor):
+    """
+    tool_registry'de return_direct işaretli bir araç başarılı dönerse döngüyü bitirir ve yanıtı
+    şablondan üretir; gözlemi "Final Answer"a çevirmek için ayrıca LLM çağrılmaz.
+    Araç başarısızsa veya şablon doldurulamazsa ajan normal şekilde devam eder.
+
+    restricted ajan (araç alt kümesi) listesinde olmayan bir araç seçerse, ya da herhangi bir ajan
+    nihai yanıt yerine ReAct adımı döndürürse AgentFallback atılır; çıktı belleğe yazılmaz.
+    """
+    restricted: bool = False
+
+    def _get_tool_return(self, next_step_output):
+        agent_action, observation = next_step_output
+        if (self.restricted and not agent_action.tool.startswith("_Exception")
+                and agent_action.tool not in {tool.name for tool in self.tools}):
+            raise AgentFallback("invalid_tool")
+        if is_terminal_tool(agent_action.tool):
+            reply = render_tool_result(agent_action.tool, observation)
+            if reply:
+                TERMINAL_RETURN.inc(tool=agent_action.tool)
+                return_key = (self._action_agent.return_values or ["output"])[0]
+                return AgentFinish({return_key: reply}, "")
+        return super()._get_tool_return(next_step_output)
+
+    def _check_finish(self, output: AgentFinish):
+        text = _strip_think(str(next(iter(output.return_values.values()), "")))
+        if _REACT_STEP_RE.search(text):
+            raise AgentFallback("react_step")
+
+    def _return(self, output, intermediate_steps, run_manager=None):
+        self._check_finish(output)
+        return super()._return(output, intermediate_steps, run_manager)
+
+    async def _areturn(self, output, intermediate_steps, run_manager=None):
+        self._check_finish(output)
+        return await super()._areturn(output, intermediate_steps, run_manager)
+
+
+def build_agent(prefix_extra: str = "", agent_tools=None):
     full_prefix = SYSTEM_PROMPT_TR.strip()
-    if prefix_extra:
+    if prefix_extra and prefix_extra.strip() != full_prefix:
         full_prefix += "\n" + prefix_extra.strip()
 
-    agent = initialize_agent(
-        tools=tools,
-        llm=llm,
-        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+    all_tools = get_tools()
+    agent_tools = agent_tools if agent_tools is not None else all_tools
+    # initialize_agent(ZERO_SHOT_REACT_DESCRIPTION) ile aynı kurulum, yalnızca yürütücü sınıfı farklı
+    agent_obj = ZeroShotAgent.from_llm_and_tools(llm, agent_tools, prefix=_safe_template(full_prefix),
+                                                 suffix=AGENT_SUFFIX, input_variables=AGENT_INPUT_VARIABLES)
+    agent = TerminalToolAgentExecutor.from_agent_and_tools(
+        agent=agent_obj,
+        tools=agent_tools,
+        tags=[AgentType.ZERO_SHOT_REACT_DESCRIPTION.value],
         verbose=True,
         memory=memory,
         early_stopping_method="generate",
         max_iterations=4,
-        agent_kwargs={"prefix": _safe_template(full_prefix)},
         handle_parsing_errors=True,
+        restricted=len(agent_tools) < len(all_tools),
     )
     return agent
 
 
-SUPERVISOR_PROMPT = _safe_template("""
+# Prompt varyantları: SYSTEM_PROMPT_TR her zaman başta; varyant yalnızca ek kuralları belirler.
+PROMPT_VARIANTS: Dict[str, str] = {
+    "default": "",
+    "strict": STRICT_PREFIX,
+}
+
+# Süreç genelinde ajan önbelleği: (model, prompt varyantı, araç seti) -> AgentExecutor
+# Ajan durumsuzdur; kullanıcıya özel bilgiler (user_id, mesaj) invoke sırasında verilir.
+_AGENT_CACHE: Dict[Tuple[str, str, Tuple[str, ...]], AgentExecutor] = {}
+_AGENT_CACHE_LOCK = threading.Lock()
+
+
+def get_agent(prompt_variant: str = "default", tool_names: Optional[Iterable[str]] = None) -> AgentExecutor:
+    """
+    Önbellekten ajan döner; yoksa bir kez kurar.
+    tool_names verilmezse tüm kayıtlı araçlar kullanılır.
+    """
+    if prompt_variant not in PROMPT_VARIANTS:
+        raise ValueError(f"Bilinmeyen prompt varyantı: {prompt_variant}")
+
+    all_tools = get_tools()
+    if tool_names is None:
+        selected = all_tools
+    else:
+        wanted = set(tool_names)
+        selected = [t for t in all_tools if t.name in wanted] or all_tools
+    key = (getattr(llm, "model", type(llm).__name__), prompt_variant, tuple(sorted(t.name for t in selected)))
+
+    agent = _AGENT_CACHE.get(key)
+    if agent is not None:
+        return agent
+
+    with _AGENT_CACHE_LOCK:
+        agent = _AGENT_CACHE.get(key)
+        if agent is None:
+            agent = build_agent(prefix_extra=PROMPT_VARIANTS[prompt_variant], agent_tools=selected)
+            _AGENT_CACHE[key] = agent
+    return agent
+
+
+def clear_agent_cache():
+    with _AGENT_CACHE_LOCK:
+        _AGENT_CACHE.clear()
+
+
+SUPERVISOR_PROMPT = """
 Aşağıdaki konuşma durumu ve son kullanıcı mesajını değerlendir:
 - current_task: Şu anda yürüyen işlem/niyet (boş olabilir)
 - suspended_task: Askıya alınmış önceki işlem/niyet (boş olabilir)
@@ -243,42 +564,289 @@ pending_params: {pending_params}
 
 --- USER ---
 message: {user_message}
-""")
+"""
+
+
+class SupervisorDecision(BaseModel):
+    decision: Literal["ContextSwitch", "InputForRunningTool", "NoChange"] = "NoChange"
+    should_apply_system_prompt: bool = False
+    detected_new_intent: str = ""
+    notes: str = ""
+
+
+# Yapılandırılmış mod: Ollama'dan şemaya uyan JSON istenir, kısa prompt kullanılır.
+# Ollama < 0.5 JSON şemasını desteklemez; o sürümlerde SUPERVISOR_OUTPUT_FORMAT = "json" yapın.
+SUPERVISOR_STRUCTURED_OUTPUT = True
+SUPERVISOR_OUTPUT_FORMAT: Any = SupervisorDecision.model_json_schema()
+
+SUPERVISOR_PROMPT_COMPACT = """Durum: current_task={current_task} | suspended_task={suspended_task} | pending_params={pending_params}
+Kullanıcı: {user_message}
+
+decision: yeni konu -> ContextSwitch; beklenen parametreyi verdiyse -> InputForRunningTool; değilse NoChange.
+should_apply_system_prompt: bağlam değişimi veya girdi eşleme mantığı gerekiyorsa true.
+detected_new_intent: yeni konunun kısa adı ya da "".
+notes: en fazla 8 kelime.
+Sadece JSON döndür."""
+
+
+# Bu görevler "boşta" sayılır: askıya alınsa bile geri dönülecek bir işlem yoktur.
+IDLE_TASKS = {"", "giris"}
+
+SUPERVISOR_GATE = Counter(
+    "supervisor_gate_total",
+    "Supervisor LLM çağrısı yapılan/atlanan mesaj sayısı",
+    ("action", "reason"),
+)
+
+SUPERVISOR_PARSE = Counter(
+    "supervisor_parse_total",
+    "Supervisor LLM çıktısının SupervisorDecision olarak ayrıştırılma sonucu (ok/error)",
+    ("mode", "outcome"),
+)
 
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def parse_supervisor_output(text: str) -> Optional[SupervisorDecision]:
+    """LLM çıktısını doğrular; <think> ve JSON dışı metin ayıklanır. Geçersizse None."""
+    text = _strip_think(text or "")
+    match = _JSON_OBJECT_RE.search(text)
+    if not match:
+        return None
+    try:
+        return SupervisorDecision.model_validate_json(match.group(0))
+    except ValidationError:
+        return None
+
+
+def supervisor_skip_reason(uid: Optional[str]) -> Optional[str]:
+    """
+    Supervisor LLM'inin karar vereceği bir durum yoksa atlama nedenini döner: yürüyen bir görev, askıda
+    bir görev veya beklenen parametre yoksa askıya alınacak ya da girdi bekleyen bir şey yoktur (boşta
+    iken güvenli sınıflandırıcı tahmini görevi LLM'siz başlatır, bkz. _prepare_supervisor).
+    current_task turlar arasında korunur (_start_turn yalnız ilk turda "giris" yazar).
+    None dönerse supervisor çalıştırılmalıdır.
+    """
+    if not uid:
+        return "no_user"
+    if memory.get_context(uid, "pending_params"):
+        return None
+    if (memory.get_context(uid, "suspended_task") or "") not in IDLE_TASKS:
+        return None
+    if (memory.get_context(uid, "current_task") or "") not in IDLE_TASKS:
+        return None
+    return "idle_state"
+
+
+def _prepare_supervisor(user_message: str, prediction: Optional[Tuple[str, float]]):
+    """
+    LLM gerektirmeyen kararları verir. (karar, None) ya da LLM'e gidilecekse (None, prompt, state) döner.
+    """
+    uid = current_user_id()
+    predicted_intent, confidence = prediction or ("", 0.0)
+    if confidence < INTENT_CONFIDENCE_THRESHOLD:
+        predicted_intent = ""
+
+    skip_reason = supervisor_skip_reason(uid)
+    if skip_reason:
+        SUPERVISOR_GATE.inc(action="skip", reason=skip_reason)
+        if skip_reason == "idle_state" and predicted_intent:
+            # Boşta iken güvenli tahmin yeni görevi başlatır; askıya alınacak görev yoktur
+            _switch_task(uid, "", predicted_intent)
+        return {
+            "decision": "NoChange",
+            "should_apply_system_prompt": False,
+            "detected_new_intent": predicted_intent,
+            "notes": f"skipped:{skip_reason}"
+        }, None, None
 
-def run_supervisor(user_message: str) -> Dict[str, Any]:
-    uid = CURRENT_CONTEXT.get("user_id")
     current_task = memory.get_context(uid, "current_task") if uid else ""
     suspended_task = memory.get_context(uid, "suspended_task") if uid else ""
     pending_params = memory.get_context(uid, "pending_params") if uid else []
 
-    prompt = SUPERVISOR_PROMPT.format(
+    if predicted_intent and not pending_params:
+        # Çalışan araç girdi beklemiyorsa karar yalnızca niyet değişimine bağlıdır
+        SUPERVISOR_GATE.inc(action="skip", reason="classifier")
+        switched = (current_task or "") not in IDLE_TASKS and current_task != predicted_intent
+        data = {
+            "decision": "ContextSwitch" if switched else "NoChange",
+            "should_apply_system_prompt": switched,
+            "detected_new_intent": predicted_intent,
+            "notes": f"classifier:{confidence:.2f}"
+        }
+        if switched:
+            _switch_task(uid, current_task, predicted_intent)
+        return data, None, None
+
+    SUPERVISOR_GATE.inc(action="call", reason="active_state")
+
+    template = SUPERVISOR_PROMPT_COMPACT if SUPERVISOR_STRUCTURED_OUTPUT else SUPERVISOR_PROMPT
+    prompt = template.format(
         current_task=current_task or "",
         suspended_task=suspended_task or "",
         pending_params=json.dumps(pending_params or []),
         user_message=user_message
     )
+    state = {"uid": uid, "current_task": current_task, "predicted_intent": predicted_intent}
+    return None, prompt, state
 
-    resp = policy_llm(prompt)
-    try:
-        data = json.loads(resp)
-    except Exception:
-        data = {
-            "decision": "NoChange",
-            "should_apply_system_prompt": False,
-            "detected_new_intent": "",
-            "notes": "parse_error"
-        }
 
-    if data.get("decision") == "ContextSwitch" and current_task:
+def _switch_task(uid: str, current_task: Optional[str], new_task: str):
+    """Yürüyen görevi (boşta değilse) askıya alır ve new_task'ı başlatır; görev durumunu yalnız supervisor yazar."""
+    if (current_task or "") not in IDLE_TASKS:
         memory.set_context(uid, "suspended_task", current_task)
-        memory.set_context(uid, "current_task", data.get("detected_new_intent") or "context_switch")
+    memory.set_context(uid, "current_task", new_task)
+
+
+def _supervisor_llm_kwargs() -> Dict[str, Any]:
+    return {"format": SUPERVISOR_OUTPUT_FORMAT} if SUPERVISOR_STRUCTURED_OUTPUT else {}
+
+
+def _finish_supervisor(resp: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    uid, current_task = state["uid"], state["current_task"]
+    mode = "structured" if SUPERVISOR_STRUCTURED_OUTPUT else "legacy"
+    parsed = parse_supervisor_output(resp)
+    SUPERVISOR_PARSE.inc(mode=mode, outcome="ok" if parsed else "error")
+    if parsed:
+        data = parsed.model_dump()
+    else:
+        data = SupervisorDecision(notes="parse_error").model_dump()
+    if state["predicted_intent"]:
+        data["detected_new_intent"] = state["predicted_intent"]
+
+    if data.get("decision") == "ContextSwitch":
+        _switch_task(uid, current_task, data.get("detected_new_intent") or "context_switch")
     elif data.get("decision") == "InputForRunningTool":
         memory.set_context(uid, "current_task", current_task or "running_tool")
 
     return data
 
 
+def run_supervisor(user_message: str, prediction: Optional[Tuple[str, float]] = None) -> Dict[str, Any]:
+    """
+    prediction: yerel sınıflandırıcının (intent, confidence) çıktısı.
+    Güven eşiği aşılırsa detected_new_intent her zaman sınıflandırıcıdan gelir;
+    beklenen parametre yoksa LLM hiç çağrılmaz.
+    """
+    with span("supervisor"):
+        decision, prompt, state = _prepare_supervisor(user_message, prediction)
+        if decision is None:
+            decision = _finish_supervisor(policy_llm.invoke(prompt, **_supervisor_llm_kwargs()), state)
+        set_attrs(decision=decision.get("decision"), notes=decision.get("notes"))
+        return decision
+
+
+async def arun_supervisor(user_message: str, prediction: Optional[Tuple[str, float]] = None) -> Dict[str, Any]:
+    """
+    run_supervisor'ın asenkron karşılığı; LLM çağrısı event loop'u bloklamaz, bellek okuma/yazımları
+    (_prepare_supervisor, _finish_supervisor) thread havuzunda çalışır.
+    """
+    with span("supervisor"):
+        decision, prompt, state = await asyncio.to_thread(_prepare_supervisor, user_message, prediction)
+        if decision is None:
+            resp = await policy_llm.ainvoke(prompt, **_supervisor_llm_kwargs())
+            decision = await asyncio.to_thread(_finish_supervisor, resp, state)
+        set_attrs(decision=decision.get("decision"), notes=decision.get("notes"))
+        return decision
+
+
+# --- Deterministik hızlı yol --------------------------------------------------
+# Tek araçla yanıtlanan okuma niyetleri: araç doğrudan çağrılır, yanıt şablondan üretilir.
+FAST_PATH_INTENTS = {
+    IntentType.PACKAGE_INFO.value,
+    IntentType.LINE_STATUS.value,
+    IntentType.GET_OUTSTANDING_BALANCE.value,
+    IntentType.BILLING_INFO.value,
+}
+FAST_PATH_CONFIDENCE_THRESHOLD = 0.9
+
+FAST_PATH = Counter(
+    "fast_path_total",
+    "Hızlı yolla yanıtlanan / ajana düşen mesaj sayısı",
+    ("intent", "outcome"),
+)
+
+_TOOL_PARAMS: Dict[str, list] = {
+    entry.name: _field_names_from_args_schema(entry.args_schema) for entry in tool_registry
+}
+
+_TR_MONTH_NUMBERS = {
+    "ocak": 1, "subat": 2, "mart": 3, "nisan": 4, "mayis": 5, "haziran": 6,
+    "temmuz": 7, "agustos": 8, "eylul": 9, "ekim": 10, "kasim": 11, "aralik": 12,
+}
+_ISO_MONTH_RE = re.compile(r"\b(\d{4})-(0[1-9]|1[0-2])\b")
+_YEAR_RE = re.compile(r"^(19|20)\d{2}$")
+
+
+def extract_month(message: str) -> Optional[str]:
+    """
+    Mesajdan 'YYYY-MM' biçiminde ay çıkarır ("2025-05", "Mayıs 2025", "2025 mayıs ayı").
+    Yıl belirtilmemişse tahmin yapılmaz; None döner.
+    """
+    m = _ISO_MONTH_RE.search(message or "")
+    if m:
+        return f"{m.group(1)}-{m.group(2)}"
+    words = normalize_text(message).split()
+    for i, word in enumerate(words):
+        month = next((num for name, num in _TR_MONTH_NUMBERS.items() if word.startswith(name)), None)
+        if month is None:
+            continue
+        for neighbor in words[max(0, i - 1):i] + words[i + 1:i + 2]:
+            if _YEAR_RE.match(neighbor):
+                return f"{neighbor}-{month:02d}"
+    return None
+
+
+_PARAM_EXTRACTORS: Dict[str, Callable[[str], Optional[str]]] = {
+    "month": extract_month,
+}
+
+
+def try_fast_path(user_id: str, message: str, prediction: Tuple[str, float],
+                  decision: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Yüksek güvenli tek-araç okuma niyetlerinde aracı doğrudan çağırır ve şablon yanıtı döner.
+    Parametre eksikse, araç başarısızsa veya yürüyen bir araç girdi bekliyorsa None döner (ajan devralır).
+    """
+    intent, confidence = prediction
+    if intent not in FAST_PATH_INTENTS or confidence < FAST_PATH_CONFIDENCE_THRESHOLD:
+        return None
+    if (decision or {}).get("decision") == "InputForRunningTool" or memory.get_context(user_id, "pending_params"):
+        return None
+
+    func = intent_to_tool[IntentType(intent)]
+    tool_name = func.__name__
+    call_args: Dict[str, Any] = {}
+    for param in _TOOL_PARAMS.get(tool_name, []):
+        if param == "user_id":
+            call_args[param] = user_id
+            continue
+        extractor = _PARAM_EXTRACTORS.get(param)
+        value = extractor(message) if extractor else None
+        if value is None:
+            FAST_PATH.inc(intent=intent, outcome="missing_param")
+            return None
+        call_args[param] = value
+
+    try:
+        result = invoke_tool(func, call_args, fast_path=True)
+    except Exception as e:
+        print(f"[WARN] Hızlı yol aracı hata verdi ({tool_name}): {e}")
+        result = None
+
+    reply = render_tool_result(tool_name, result)
+    if not reply:
+        FAST_PATH.inc(intent=intent, outcome="tool_failed")
+        return None
+
+    FAST_PATH.inc(intent=intent, outcome="served")
+    memory.save_context(
+        {"input": f"[user_id:{user_id}] {message}", "user_id": user_id},
+        {"output": reply, "tool": tool_name, "tool_output": result},
+    )
+    return reply
+
+
 def sanitize_llm_text(text: str) -> str:
     text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL|re.IGNORECASE)
     text = re.sub(r".*?", "", text, flags=re.DOTALL)  # üçlü çit bloklarını at
@@ -301,7 +869,8 @@ def _strip_think(text: str) -> str:
     text = re.sub(r"<think>.*", "", text, flags=re.DOTALL | re.IGNORECASE)
     return text.strip()
 
-def main(user_id_or_tc: str, message: str) -> Dict[str, Any]:
+def _authenticate(user_id_or_tc: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """(authenticated_id, None) ya da (None, hata sonucu) döner."""
     try:
         if isinstance(user_id_or_tc, str) and len(user_id_or_tc) == 11 and user_id_or_tc.isdigit():
             result = get_user_id_from_tc_and_verify_identity(
@@ -309,55 +878,237 @@ def main(user_id_or_tc: str, message: str) -> Dict[str, Any]:
                 challenge_response=user_id_or_tc
             )
             if not result.get("success"):
-                return {"success": False, "error": f"Kullanıcı doğrulama hatası: {result.get('error', 'bilinmeyen')}"}
+                return None, {"success": False, "error": f"Kullanıcı doğrulama hatası: {result.get('error', 'bilinmeyen')}"}
             authenticated_id = result.get("data")
         else:
             authenticated_id = user_id_or_tc
 
         if not authenticated_id:
-            return {"success": False, "error": "Kimlik doğrulama başarısız: user_id bulunamadı."}
+            return None, {"success": False, "error": "Kimlik doğrulama başarısız: user_id bulunamadı."}
     except Exception as auth_err:
-        return {"success": False, "error": f"Kimlik doğrulama hatası: {auth_err}"}
+        return None, {"success": False, "error": f"Kimlik doğrulama hatası: {auth_err}"}
+    return authenticated_id, None
 
+
+# Son SESSION_IDLE_SECONDS içinde tur başlatan kullanıcılar "aktif oturum" sayılır
+SESSION_IDLE_SECONDS = 30 * 60
+_SESSION_LAST_SEEN: Dict[str, float] = {}
+_session_lock = threading.Lock()
+
+
+def _touch_session(user_id: str):
+    with _session_lock:
+        _SESSION_LAST_SEEN[user_id] = time.monotonic()
+
+
+def active_session_count() -> int:
+    cutoff = time.monotonic() - SESSION_IDLE_SECONDS
+    with _session_lock:
+        for uid in [uid for uid, seen in _SESSION_LAST_SEEN.items() if seen < cutoff]:
+            del _SESSION_LAST_SEEN[uid]
+        return len(_SESSION_LAST_SEEN)
+
+
+ACTIVE_SESSIONS = Gauge("active_sessions", f"Son {SESSION_IDLE_SECONDS} sn içinde mesaj gönderen kullanıcı sayısı")
+ACTIVE_SESSIONS.set_function(active_session_count)
+
+
+def _log_token_usage(authenticated_id: str, usage):
+    if usage.calls:
+        print(f"[TOKENS] user={authenticated_id} {usage.summary()}")
+
+
+def _start_turn(authenticated_id: str):
+    # Yürüyen görev turlar arasında korunur; supervisor onu askıya alıp almamaya karar verir
     try:
-        CURRENT_CONTEXT["user_id"] = authenticated_id
-        memory.set_context(authenticated_id, "current_task", "giris")
+        if memory.get_context(authenticated_id, "current_task") is None:
+            memory.set_context(authenticated_id, "current_task", "giris")
     except Exception as mem_err:
         pass
 
+
+def _begin_turn(authenticated_id: str, message: str) -> Tuple[str, float]:
+    _start_turn(authenticated_id)
+    return classify_intent(message)
+
+
+def _apply_decision(authenticated_id: str, decision: Optional[Dict[str, Any]],
+                    event_handler: Optional[StreamEventHandler]):
+    # Görev değişimi supervisor içinde (_switch_task) belleğe yazıldı; burada yalnız olay yayılır
+    if event_handler and decision:
+        event_handler.emit("supervisor", decision)
+
+
+def _agent_call_args(authenticated_id: str, message: str, prediction: Tuple[str, float],
+                     event_handler: Optional[StreamEventHandler]):
+    agent = get_agent(tool_names=select_tool_names(message, prediction))
+    llm_input = f"[user_id:{authenticated_id}] {message}"
+    config = {"callbacks": [event_handler]} if event_handler else None
+    return agent, {"input": llm_input, "user_id": authenticated_id}, config
+
+
+def _agent_cache_scope(prediction: Tuple[str, float]):
+    # Güven düşük olsa da en olası niyet yazma işlemiyse önbelleği kullanma
+    return completion_cache_disabled() if prediction[0] in WRITE_INTENTS else nullcontext()
+
+
+AGENT_NO_ANSWER = {"success": False, "error": "Agent hatası: nihai yanıt üretilemedi"}
+
+
+def _fallback_agent(agent: AgentExecutor, e: AgentFallback,
+                    event_handler: Optional[StreamEventHandler]) -> Optional[AgentExecutor]:
+    """Alt kümeyle kurulan ajan için tüm araçlı ajanı döner; zaten tüm araçlar varsa None."""
+    set_attrs(fallback=e.reason)
+    if not getattr(agent, "restricted", False):
+        return None
+    AGENT_FALLBACK.inc(reason=e.reason)
+    if event_handler:
+        event_handler.emit("agent_retry", {"reason": e.reason})
+    return get_agent()
+
+
+def _invoke_agent(agent: Optional[AgentExecutor], inputs, config,
+                  event_handler: Optional[StreamEventHandler]) -> Dict[str, Any]:
+    # En fazla iki deneme: alt küme, sonra tüm araçlar (tüm araçlı ajan restricted değildir)
+    while agent is not None:
+        with span("agent", tools=len(agent.tools)):
+            try:
+                return _agent_response(agent.invoke(inputs, config=config))
+            except AgentFallback as e:
+                agent = _fallback_agent(agent, e, event_handler)
+    return dict(AGENT_NO_ANSWER)
+
+
+async def _ainvoke_agent(agent: Optional[AgentExecutor], inputs, config,
+                         event_handler: Optional[StreamEventHandler]) -> Dict[str, Any]:
+    while agent is not None:
+        with span("agent", tools=len(agent.tools)):
+            try:
+                return _agent_response(await agent.ainvoke(inputs, config=config))
+            except AgentFallback as e:
+                agent = _fallback_agent(agent, e, event_handler)
+    return dict(AGENT_NO_ANSWER)
+
+
+def _agent_response(result) -> Dict[str, Any]:
+    raw = result["output"] if isinstance(result, dict) and "output" in result else result
+
+    raw = _strip_think(raw)
+    cleaned = sanitize_llm_text(raw) if 'sanitize_llm_text' in globals() else raw
+    response_text = (cleaned or raw or "").strip()
+
+    if not response_text:
+        response_text = "Üzgünüm, şu an yanıt üretemedim."
+
+    return {"success": True, "response": response_text}
+
+
+def _fast_path_response(authenticated_id: str, message: str, prediction: Tuple[str, float],
+                        decision: Optional[Dict[str, Any]], event_handler: Optional[StreamEventHandler]):
+    fast_reply = try_fast_path(authenticated_id, message, prediction, decision)
+    if not fast_reply:
+        return None
+    if event_handler:
+        event_handler.emit_text(fast_reply)
+    return {"success": True, "response": fast_reply}
+
+
+def main(user_id_or_tc: str, message: str, event_handler: Optional[StreamEventHandler] = None) -> Dict[str, Any]:
+    """
+    event_handler verilirse supervisor kararı, araç olayları ve nihai yanıt parçaları ona akıtılır.
+    Her tur tracing.TRACE_PATH'e bir iz olarak yazılır.
+    """
+    with start_trace("turn"):
+        with span("auth"):
+            authenticated_id, error = _authenticate(user_id_or_tc)
+        if error:
+            set_attrs(success=False)
+            return error
+        set_attrs(user_id=authenticated_id)
+        _touch_session(authenticated_id)
+        with user_context(authenticated_id), track_token_usage() as usage:
+            try:
+                result = _run_turn(authenticated_id, message, event_handler)
+            finally:
+                with span("memory.flush"):
+                    memory.end_turn(authenticated_id)
+        set_attrs(success=result.get("success"), **usage.as_attrs())
+    _log_token_usage(authenticated_id, usage)
+    return result
+
+
+def _run_turn(authenticated_id: str, message: str, event_handler: Optional[StreamEventHandler]) -> Dict[str, Any]:
+    prediction = _begin_turn(authenticated_id, message)
     try:
-        decision = run_supervisor(message)
-        if decision.get("decision") == "ContextSwitch" and decision.get("detected_new_intent"):
-            memory.set_context(authenticated_id, "suspended_task", memory.get_context(authenticated_id, "current_task"))
-            memory.set_context(authenticated_id, "current_task", decision["detected_new_intent"])
+        decision = run_supervisor(message, prediction=prediction)
     except Exception:
-        pass
+        decision = None
+    _apply_decision(authenticated_id, decision, event_handler)
+
+    fast = _fast_path_response(authenticated_id, message, prediction, decision, event_handler)
+    if fast:
+        return fast
 
     try:
-        agent = build_agent(prefix_extra=SYSTEM_PROMPT_TR)
+        agent, inputs, config = _agent_call_args(authenticated_id, message, prediction, event_handler)
+        with _agent_cache_scope(prediction):
+            return _invoke_agent(agent, inputs, config, event_handler)
+    except Exception as e:
+        return {"success": False, "error": f"Agent hatası: {str(e)}"}
 
-        llm_input = f"[user_id:{authenticated_id}] {message}"
 
-        result = agent.invoke({"input": llm_input})
-        raw = result["output"] if isinstance(result, dict) and "output" in result else result
+async def amain(user_id_or_tc: str, message: str, event_handler: Optional[StreamEventHandler] = None) -> Dict[str, Any]:
+    """
+    main()'in asenkron karşılığı. LLM çağrıları (supervisor ve ajan adımları) Ollama'ya
+    asenkron HTTP ile gider; kimlik doğrulama, bellek okuma/yazımları, niyet sınıflandırma ve hızlı yol
+    thread havuzunda çalışır (ajan belleği LangChain'in aload/asave'i ile executor'da).
+    Böylece bekleyen her konuşma bir thread tutmaz.
+    """
+    with start_trace("turn"):
+        with span("auth"):
+            authenticated_id, error = await asyncio.to_thread(_authenticate, user_id_or_tc)
+        if error:
+            set_attrs(success=False)
+            return error
+        set_attrs(user_id=authenticated_id)
+        _touch_session(authenticated_id)
+        # Bağlam bu görevde ayarlanmalı: to_thread ve araç executor'ları bağlamın kopyasını alır
+        with user_context(authenticated_id), track_token_usage() as usage:
+            try:
+                result = await _arun_turn(authenticated_id, message, event_handler)
+            finally:
+                with span("memory.flush"):
+                    await asyncio.to_thread(memory.end_turn, authenticated_id)
+        set_attrs(success=result.get("success"), **usage.as_attrs())
+    _log_token_usage(authenticated_id, usage)
+    return result
 
-        raw = _strip_think(raw)
-        cleaned = sanitize_llm_text(raw) if 'sanitize_llm_text' in globals() else raw
-        response_text = (cleaned or raw or "").strip()
 
-        if not response_text:
-            response_text = "Üzgünüm, şu an yanıt üretemedim."
+async def _arun_turn(authenticated_id: str, message: str, event_handler: Optional[StreamEventHandler]) -> Dict[str, Any]:
+    # Bellek yazımları (kilit + depo) ve niyet modeli (ilk çağrıda yükleme/eğitim) olay döngüsünü bekletmez
+    prediction = await asyncio.to_thread(_begin_turn, authenticated_id, message)
+    try:
+        decision = await arun_supervisor(message, prediction=prediction)
+    except Exception:
+        decision = None
+    await asyncio.to_thread(_apply_decision, authenticated_id, decision, event_handler)
 
-        return {"success": True, "response": response_text}
+    fast = await asyncio.to_thread(_fast_path_response, authenticated_id, message, prediction, decision, event_handler)
+    if fast:
+        return fast
 
+    try:
+        agent, inputs, config = _agent_call_args(authenticated_id, message, prediction, event_handler)
+        with _agent_cache_scope(prediction):
+            return await _ainvoke_agent(agent, inputs, config, event_handler)
     except Exception as e:
         return {"success": False, "error": f"Agent hatası: {str(e)}"}
 
 # --- MAIN ENTRY --------------------------------------------------------------
 if __name__ == "__main__":
+    start_background_summaries()
     print("Çağrı merkezi ajanına hoş geldiniz. Nasıl yardımcı olabilirim?\n")
     context = {"user_id": None}
-    CURRENT_CONTEXT.update(context)
 
     while not context["user_id"]:
         print("\n[Ajan]: Merhaba, lütfen TC kimlik numaranızı giriniz.")
@@ -370,6 +1121,7 @@ if __name__ == "__main__":
         result = get_user_id_from_tc_and_verify_identity(tc=tc_input, challenge_response=tc_input)
         if result["success"]:
             context["user_id"] = result["data"]
+            _CURRENT_USER_ID.set(context["user_id"])
             memory.set_context(context["user_id"], "current_task", "giris")
             print("[Sistem]: Giriş başarılı.")
         else:
@@ -381,18 +1133,17 @@ if __name__ == "__main__":
             print("Sistemden çıkılıyor...")
             break
 
-        soru_tagged = f"[user_id:{context['user_id']}] {soru}" if context.get("user_id") else soru
-        decision = run_supervisor(soru)
         uid = context["user_id"]
+        try:
+            prediction = classify_intent(soru)
+            decision = run_supervisor(soru, prediction=prediction)
 
-        if decision["decision"] == "ContextSwitch" and decision.get("detected_new_intent"):
-            memory.set_context(uid, "suspended_task", memory.get_context(uid, "current_task"))
-            memory.set_context(uid, "current_task", decision["detected_new_intent"])
-
-        if context.get("user_id"):
-            soru = f"[user_id:{context['user_id']}] {soru}"
-
-        agent = build_agent(prefix_extra=SYSTEM_PROMPT_TR)
-        raw = agent.run(soru)
-        cevap = sanitize_llm_text(raw)
-        print(f"Cevap: {cevap}\n")
\ No newline at end of file
+            # Araç seçimi etiketsiz mesajla yapılır (web yolundaki _agent_call_args gibi)
+            agent = get_agent(tool_names=select_tool_names(soru, prediction))
+            result = agent.invoke({"input": f"[user_id:{uid}] {soru}", "user_id": uid})
+            raw = result["output"] if isinstance(result, dict) and "output" in result else result
+            cevap = sanitize_llm_text(raw)
+            print(f"Cevap: {cevap}\n")
+        finally:
+            # main() gibi: batched modda tur kalıcı olur, özet ve tahliye planlanır
+            memory.end_turn(uid)
\ No newline at end of file
@@ -12,6 +12,7 @@ const ChatWindow = ({ user, messages, setMessages, input, setInput }) => {
   const [showRecorder, setShowRecorder] = useState(false);
   const [isSending, setIsSending] = useState(false);
   const [agentTyping, setAgentTyping] = useState(false);
+  const [agentStatus, setAgentStatus] = useState("");
 
   useEffect(() => {
     chatEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -69,46 +70,101 @@ const ChatWindow = ({ user, messages, setMessages, input, setInput }) => {
     setIsSending(true);
     setAgentTyping(true);
 
+    // Yanıt SSE ile parça parça gelir; ilk parçada ajan balonu açılır ve güncellenir.
+    const agentMsgId = `agent-${Date.now()}`;
+    let agentMsgAdded = false;
+    let streamedText = "";
+
+    const upsertAgentMessage = (text) => {
+      if (!agentMsgAdded) {
+        agentMsgAdded = true;
+        setAgentTyping(false);
+        setMessages((prev) => [...prev, { id: agentMsgId, role: "agent", text }]);
+      } else {
+        setMessages((prev) =>
+          prev.map((m) => (m.id === agentMsgId ? { ...m, text } : m))
+        );
+      }
+    };
+
     try {
-      const res = await fetch(`${API_BASE}/api/message`, {
+      const res = await fetch(`${API_BASE}/api/message/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ user_id: userIdToSend, message: messageText }),
       });
 
-      let data = null;
-      try {
-        data = await res.json();
-      } catch (jsonErr) {
-        console.error("JSON parse hatası:", jsonErr);
-      }
-
-      if (!res.ok) {
-        const txt = normalizeAgentText(data) || `Sunucu hatası: ${res.status}`;
-        setMessages((prev) => [...prev, { role: "agent", text: txt }]);
+      if (!res.ok || !res.body) {
+        upsertAgentMessage(`Sunucu hatası: ${res.status}`);
         return;
       }
 
-      const agentText = normalizeAgentText(data);
-      const finalText =
-        agentText && String(agentText).trim().length > 0
-          ? agentText
-          : "Boş yanıt alındı.";
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder("utf-8");
+      let buffer = "";
+      let finalText = "";
+
+      const handleEvent = (event, data) => {
+        if (event === "token") {
+          streamedText += data.text || "";
+          upsertAgentMessage(streamedText);
+        } else if (event === "tool_start") {
+          setAgentStatus(`${data.tool} çalışıyor...`);
+        } else if (event === "tool_end") {
+          setAgentStatus("");
+        } else if (event === "done") {
+          finalText = normalizeAgentText(data);
+        }
+      };
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+          const frame = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+
+          let event = "message";
+          let dataStr = "";
+          for (const line of frame.split("\n")) {
+            if (line.startsWith("event:")) event = line.slice(6).trim();
+            else if (line.startsWith("data:")) dataStr += line.slice(5).trim();
+          }
+          try {
+            handleEvent(event, dataStr ? JSON.parse(dataStr) : {});
+          } catch (parseErr) {
+            console.error("SSE parse hatası:", parseErr);
+          }
+        }
+      }
 
-      setMessages((prev) => [...prev, { role: "agent", text: finalText }]);
+      // "done" olayındaki metin temizlenmiş nihai yanıttır; akan metnin yerine geçer.
+      const resolvedText =
+        finalText && String(finalText).trim().length > 0
+          ? finalText
+          : streamedText.trim() || "Boş yanıt alındı.";
+      upsertAgentMessage(resolvedText);
 
       if (isFromSTT) {
-        await playTTS(finalText);
+        await playTTS(resolvedText);
       }
     } catch (err) {
       console.error("Mesaj gönderme hatası:", err);
-      setMessages((prev) => [
-        ...prev,
-        { role: "agent", text: "İstek gönderilirken hata oluştu." },
-      ]);
+      if (agentMsgAdded) {
+        upsertAgentMessage(streamedText || "İstek gönderilirken hata oluştu.");
+      } else {
+        setMessages((prev) => [
+          ...prev,
+          { role: "agent", text: "İstek gönderilirken hata oluştu." },
+        ]);
+      }
     } finally {
       setIsSending(false);
       setAgentTyping(false);
+      setAgentStatus("");
     }
   };
 
@@ -182,7 +238,7 @@ const ChatWindow = ({ user, messages, setMessages, input, setInput }) => {
       <div className={`chat-messages ${showRecorder ? "blurred" : ""}`}>
         {messages.map((msg, idx) => (
           <div
-            key={idx}
+            key={msg.id || idx}
             className={`message-row ${msg.role === "user" ? "user" : "agent"}`}
           >
             <div className="message-bubble">{msg.text}</div>
@@ -195,6 +251,7 @@ const ChatWindow = ({ user, messages, setMessages, input, setInput }) => {
               <span className="typing-dot">●</span>
               <span className="typing-dot">●</span>
               <span className="typing-dot">●</span>
+              {agentStatus && <span className="agent-status"> {agentStatus}</span>}
             </div>
           </div>
         )}
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi.responses import StreamingResponse, HTMLResponse, Response
 from pydantic import BaseModel
 import whisper
 import tempfile
@@ -13,8 +13,15 @@ import matplotlib.pyplot as plt
 from collections import Counter
 import json
 import datetime
+import asyncio
+import time
 from memory import memory
-from agent_runner import main
+from memory_store import flush_all, read_memory_state
+from mock_apis import close_connections
+from agent_runner import amain, start_background_summaries
+from streaming import StreamEventHandler
+from tracing import read_traces, summarize
+from metrics import CONTENT_TYPE_LATEST, Counter, Histogram, render_prometheus
 from tools import (
     get_user_info,
     register_user,
@@ -33,7 +40,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-JSON_FILE = ../../agent_memory.json"
+JSON_FILE = memory.save_path
+
+# ----------------- Metrikler -----------------
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP istekleri", ("method", "path", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Uç nokta bazında istek süresi", ("method", "path"))
+TRANSCRIBE_SECONDS = Histogram(
+    "transcription_duration_seconds", "Whisper çözümleme süresi",
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300),
+)
+TRANSCRIBE_AUDIO_SECONDS = Histogram(
+    "transcription_audio_seconds", "Çözümlenen ses kaydının uzunluğu",
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300, 600),
+)
+# süre / ses uzunluğu; 1'in altı gerçek zamandan hızlı demektir
+TRANSCRIBE_REALTIME_FACTOR = Histogram(
+    "transcription_realtime_factor", "Çözümleme süresinin ses uzunluğuna oranı",
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 5),
+)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # SSE yanıtlarında süre ilk bayta kadardır; akışın tamamı için /api/traces'e bakın
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Etiket olarak ham URL yerine route şablonu: /api/user-info/{user_id}
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, path=path)
+        HTTP_REQUESTS.inc(method=request.method, path=path, status=status)
+
+
+@app.on_event("startup")
+def start_memory_summaries():
+    # Uzun oturumların arka plan özeti yalnız serviste çalışır (AGENT_MEMORY_SUMMARIES=0 kapatır)
+    start_background_summaries()
+
+
+@app.on_event("shutdown")
+def flush_memory():
+    # Geciktirilmiş bellek yazımlarını kapanmadan önce diske yaz
+    flush_all()
+    close_connections()
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(content=render_prometheus(), media_type=CONTENT_TYPE_LATEST)
 
 # ----------------- Pydantic Modeller -----------------
 class TextRequest(BaseModel):
@@ -81,6 +140,7 @@ def login(req: LoginRequest):
 
     # Oturumu kaydet (TC üzerinden erişim yapacak)
     memory.set_authenticated_user(tc, user_id)
+    memory.end_turn(tc)
 
     return {
         "success": True,
@@ -96,14 +156,44 @@ def register(req: RegisterRequest):
     return {"success": True, "user": result["data"]}
 
 @app.post("/api/message", response_model=MessageResponse)
-def message(req: MessageRequest):
-    out = main(req.user_id, req.message)
+async def message(req: MessageRequest):
+    out = await amain(req.user_id, req.message)
     # main() eski dict döndürüyorsa bile normalize edelim:
     if out.get("success"):
         return MessageResponse(success=True, response=out.get("response", ""))
     else:
         return MessageResponse(success=False, error=out.get("message", out.get("error", "Bilinmeyen hata")))
 
+# create_task yalnızca zayıf referans tutar; akış bitene kadar görevleri burada saklıyoruz
+_STREAM_TASKS = set()
+
+@app.post("/api/message/stream")
+async def message_stream(req: MessageRequest):
+    """
+    /api/message'ın SSE sürümü: supervisor kararı, araç başlangıç/bitiş olayları ve
+    nihai yanıt parçaları üretildikçe gönderilir; son olay "done" amain() sonucunu taşır.
+    """
+    handler = StreamEventHandler(loop=asyncio.get_running_loop())
+
+    async def run():
+        try:
+            out = await amain(req.user_id, req.message, event_handler=handler)
+        except Exception as e:
+            out = {"success": False, "error": f"Agent hatası: {e}"}
+        if out.get("success"):
+            handler.finish({"success": True, "response": out.get("response", "")})
+        else:
+            handler.finish({"success": False, "error": out.get("message", out.get("error", "Bilinmeyen hata"))})
+
+    task = asyncio.create_task(run())
+    _STREAM_TASKS.add(task)
+    task.add_done_callback(_STREAM_TASKS.discard)
+    return StreamingResponse(
+        handler.aiter_sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/user-info/{user_id}")
 def user_info(user_id: str):
     result = get_user_info(user_id)
@@ -118,12 +208,32 @@ def outstanding_balance(user_id: str):
         return {"success": False, "message": result.get("error", "Bilinmeyen hata")}
     return {"success": True, "balance_info": result["data"]}
 
+@app.get("/api/traces")
+def traces(limit: int = 50, user_id: str = None, min_duration_ms: float = None, summary: bool = False):
+    """
+    Son turların izleri (tracing.TRACE_PATH). summary=true ise izler yerine span adı başına
+    adet / ortalama / p95 süre ve tur süresindeki pay döner.
+    """
+    limit = max(1, min(limit, 1000))
+    records = read_traces(limit=limit, user_id=user_id, min_duration_ms=min_duration_ms)
+    if summary:
+        return {"success": True, "count": len(records), "summary": summarize(records)}
+    return {"success": True, "count": len(records), "traces": records}
+
 @app.post("/transcribe")
 async def transcribe_audio(file: UploadFile = File(...)):
     with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
         shutil.copyfileobj(file.file, tmp)
         tmp_path = tmp.name
-    result = model.transcribe(tmp_path, language="tr")
+    audio = whisper.load_audio(tmp_path)
+    start = time.perf_counter()
+    result = model.transcribe(audio, language="tr")
+    elapsed = time.perf_counter() - start
+    audio_seconds = len(audio) / whisper.audio.SAMPLE_RATE
+    TRANSCRIBE_SECONDS.observe(elapsed)
+    TRANSCRIBE_AUDIO_SECONDS.observe(audio_seconds)
+    if audio_seconds > 0:
+        TRANSCRIBE_REALTIME_FACTOR.observe(elapsed / audio_seconds)
     return {"text": result["text"]}
 
 @app.post("/api/text-to-speech")
@@ -151,11 +261,8 @@ def load_agent_data():
       {timestamp, user_id, role, message, type, tool, status}
     ]
     """
-    if not os.path.exists(JSON_FILE):
-        return []
-
-    with open(JSON_FILE, "r", encoding="utf-8") as f:
-        raw = json.load(f)
+    # Snapshot tek başına eski kalabilir; günlükteki son değişiklikler de uygulanır
+    raw = read_memory_state(JSON_FILE, memory.max_turns)
 
     interactions = raw.get("interactions", {})
     flat = []
@@ -0,0 +1,70 @@
+"""
+Mesaj başına ajan kurulum maliyetini ölçer.
+
+Eski akış: her mesajda build_agent(prefix_extra=SYSTEM_PROMPT_TR)
+Yeni akış: get_agent() ile süreç genelinde önbelleğe alınmış ajan
+
+Kullanım:
+    python benchmarks/bench_agent_setup.py --messages 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.agents import initialize_agent, AgentType  # noqa: E402
+
+import agent_runner  # noqa: E402
+
+
+def _measure(fn, n: int):
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label: str, timings, prompt_chars: int):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<32} ort={statistics.mean(timings):8.3f} ms | "
+          f"p95={p95:8.3f} ms | prompt={prompt_chars} karakter")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200, help="Simüle edilen mesaj sayısı")
+    args = parser.parse_args()
+
+    # Eski akış: SYSTEM_PROMPT_TR önekte iki kez yer alıyordu ve ajan her mesajda yeniden kuruluyordu.
+    legacy_prefix = agent_runner.SYSTEM_PROMPT_TR.strip() + "\n" + agent_runner.SYSTEM_PROMPT_TR.strip()
+
+    def legacy():
+        return initialize_agent(
+            tools=agent_runner.get_tools(),
+            llm=agent_runner.llm,
+            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+            verbose=True,
+            memory=agent_runner.memory,
+            early_stopping_method="generate",
+            max_iterations=4,
+            agent_kwargs={"prefix": agent_runner._safe_template(legacy_prefix)},
+            handle_parsing_errors=True,
+        )
+
+    legacy_chars = len(legacy().agent.llm_chain.prompt.template)
+
+    agent_runner.clear_agent_cache()
+    cached_chars = len(agent_runner.get_agent().agent.llm_chain.prompt.template)
+
+    _report("build_agent() her mesajda", _measure(legacy, args.messages), legacy_chars)
+    _report("get_agent() önbellekli", _measure(agent_runner.get_agent, args.messages), cached_chars)
+
+
+if __name__ == "__main__":
+    main()
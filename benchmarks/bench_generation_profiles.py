@@ -0,0 +1,92 @@
+"""
+Düşünmeli (varsayılan qwen3) ve profilli (düşünmesiz + stop + num_predict) üretimi canlı Ollama'da karşılaştırır.
+
+Her profil için scenarios.json'daki ilk N cümleyle gerçek supervisor / ajan ilk adım promptları üretilir.
+Çağrı başına ortalama üretilen token, <think> token'ı ve süre raporlanır.
+--write-baseline ile düşünmeli ölçümler generation_baseline.json'a yazılır; llm_profiles
+bu değerlere göre istek başına tasarruf tahmini loglar.
+
+Kullanım (Ollama çalışır durumda olmalı):
+    python benchmarks/bench_generation_profiles.py --samples 10 --write-baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.llms import Ollama  # noqa: E402
+
+import agent_runner  # noqa: E402
+import llm_profiles  # noqa: E402
+import summarizer  # noqa: E402
+
+MODEL = "qwen3:32B"
+BASE_URL = "http://localhost:11434"
+
+
+def _prompts(profile: str, utterances):
+    if profile == "supervisor":
+        return [agent_runner.SUPERVISOR_PROMPT.format(
+            current_task="fatura_bilgisi", suspended_task="", pending_params="[\"month\"]", user_message=u
+        ) for u in utterances]
+    if profile == "summary":
+        return [summarizer.SUMMARY_PROMPT.format(previous="(yok)", turns=f"Human: {u}\nAi: Tabii, hemen bakıyorum.")
+                for u in utterances]
+    prompt = agent_runner.get_agent().agent.llm_chain.prompt
+    return [prompt.format(input=f"[user_id:user000] {u}", agent_scratchpad="") for u in utterances]
+
+
+def _run(client, prompts, stop):
+    generated, think, elapsed = [], [], []
+    for prompt in prompts:
+        start = time.perf_counter()
+        result = client.generate([prompt], stop=stop)
+        elapsed.append(time.perf_counter() - start)
+        gen = result.generations[0][0]
+        count = int((gen.generation_info or {}).get("eval_count") or 0)
+        generated.append(count)
+        think.append(round(count * llm_profiles._think_share(gen.text)))
+    return {
+        "generated_tokens": statistics.mean(generated),
+        "think_tokens": statistics.mean(think),
+        "seconds": statistics.mean(elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--file", default="scenarios.json")
+    parser.add_argument("--write-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        utterances = [sc["user_utterance"] for sc in json.load(f)[:args.samples]]
+
+    # Ajan promptu zaten "\nObservation:" ile kesilir; karşılaştırma adil olsun
+    agent_stop = {"supervisor": None, "agent_step": ["\nObservation:"], "summary": None}
+    baseline = {}
+    for profile in llm_profiles.GENERATION_PROFILES:
+        prompts = _prompts(profile, utterances)
+        thinking = Ollama(model=MODEL, base_url=BASE_URL, temperature=0.0)
+        profiled = llm_profiles.make_llm(profile, model=MODEL, base_url=BASE_URL, temperature=0.0)
+        before = _run(thinking, prompts, agent_stop[profile])
+        after = _run(profiled, prompts, agent_stop[profile])
+        baseline[profile] = before
+        print(f"{profile:<12} düşünmeli: {before['generated_tokens']:7.1f} tok "
+              f"(think {before['think_tokens']:7.1f}) {before['seconds']:6.2f} s | "
+              f"profilli: {after['generated_tokens']:7.1f} tok (think {after['think_tokens']:5.1f}) "
+              f"{after['seconds']:6.2f} s")
+
+    if args.write_baseline:
+        with open(llm_profiles.BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"📄 Temel değerler -> {llm_profiles.BASELINE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+AgentMemory dayanıklılık modlarının (sync / batched / async) istek gecikmesine etkisi.
+
+Her "istek", bir turun bellek değişikliklerini taklit eder (2 etkileşim, 4 context yazımı, 1 araç çıktısı)
+ve main()'deki gibi memory.end_turn() ile biter. --threads eşzamanlı işçi rastgele kullanıcılarla
+istek gönderir; istek başına süre ölçülüp mod ve arka uç (günlük / SQLite, fsync açık/kapalı)
+başına ortalama, p50 ve p99 raporlanır.
+
+Kullanım:
+    python benchmarks/bench_memory_durability.py --requests 2000 --threads 8 --fsync
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import memory_store  # noqa: E402
+from memory import AgentMemory  # noqa: E402
+
+
+def _request(memory: AgentMemory, user_id: str, i: int):
+    memory.add_interaction(user_id, role="human", message=f"Faturam ne kadar? ({i})")
+    memory.set_context(user_id, "current_task", "fatura_bilgisi")
+    memory.set_context(user_id, "pending_params", ["month"])
+    memory.add_interaction(user_id, role="ai", message="Faturanız 250 TL.", type="tool",
+                           metadata={"tool": "get_bill_info"})
+    memory.add_tool_output(user_id, "get_bill_info", {"amount": 250, "month": "2025-08"})
+    memory.set_last_successful_action(user_id, "get_bill_info")
+    memory.set_context(user_id, "pending_params", [])
+    memory.end_turn(user_id)
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run(backend: str, durability: str, fsync: bool, args):
+    workdir = tempfile.mkdtemp(prefix="bench_durability_")
+    try:
+        path = os.path.join(workdir, "agent_memory.db" if backend == "sqlite" else "agent_memory.json")
+        memory_store.get_store(path, fsync=fsync)
+        memory = AgentMemory(save_path=path, durability=durability)
+        latencies = []
+        lock = threading.Lock()
+        per_thread = args.requests // args.threads
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local = []
+            for i in range(per_thread):
+                user_id = f"user{rng.randrange(args.users):05d}"
+                start = time.perf_counter()
+                _request(memory, user_id, i)
+                local.append((time.perf_counter() - start) * 1000)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        memory.save()
+        label = f"{backend}{' +fsync' if fsync else ''}"
+        print(f"{label:<14} {durability:<8} ort {statistics.mean(latencies):7.3f} ms  "
+              f"p50 {_percentile(latencies, 0.50):7.3f} ms  p99 {_percentile(latencies, 0.99):7.3f} ms  "
+              f"{len(latencies) / elapsed:8.0f} istek/s")
+        if memory._buffer is not None:
+            memory._buffer.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--fsync", action="store_true", help="fsync açık ölçümleri de ekle")
+    args = parser.parse_args()
+
+    for backend in ("journal", "sqlite"):
+        for fsync in ([False, True] if args.fsync else [False]):
+            for durability in memory_store.DURABILITY_MODES:
+                run(backend, durability, fsync, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+AgentMemory yazma/yükleme maliyeti: eski tam dosya yeniden yazımı ile günlük (journal) + sıkıştırma.
+
+Her kullanıcı sayısı için sentetik bir agent_memory.json üretilir (kullanıcı başına --turns etkileşim
+ve küçük bir context). Ölçülenler:
+  - eski: her değişiklikte tüm durumun indent=2 ile yeniden yazılması (eski AgentMemory.save())
+  - yeni: AgentMemory.set_context / add_interaction ile günlüğe tek satır ekleme
+  - yükleme: eski tam JSON ayrıştırma ile ilk açılış (tek seferlik snapshot içe aktarımı) ve tembel açılış
+  - sıkıştırma: günlüğün snapshot'a yazılması
+
+Kullanım:
+    python benchmarks/bench_memory_journal.py --users 10000 100000
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory import AgentMemory  # noqa: E402
+
+MAX_TURNS = 20
+
+
+def _synthetic_state(users: int, turns: int):
+    interactions, context = {}, {}
+    for i in range(users):
+        uid = f"user{i:06d}"
+        interactions[uid] = [
+            {"role": "human" if t % 2 == 0 else "ai", "message": f"Mesaj {t}: faturam ne kadar?", "type": "message"}
+            for t in range(turns)
+        ]
+        context[uid] = {"current_task": "fatura_bilgisi", "last_action": "get_bill_info", "plan_version": 1}
+    return {"interactions": interactions, "context": context}
+
+
+def _legacy_save(path: str, interactions, context):
+    data = {
+        "interactions": {uid: list(deque(m, maxlen=MAX_TURNS)) for uid, m in interactions.items()},
+        "context": dict(context),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _legacy_load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.loads(f.read().strip())
+    interactions = defaultdict(
+        lambda: deque(maxlen=MAX_TURNS),
+        {uid: deque(m, maxlen=MAX_TURNS) for uid, m in data.get("interactions", {}).items()},
+    )
+    return interactions, defaultdict(dict, data.get("context", {}))
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def _timed(fn, repeat):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run(users: int, turns: int, writes: int, legacy_writes: int):
+    workdir = tempfile.mkdtemp(prefix="bench_memory_")
+    try:
+        path = os.path.join(workdir, "agent_memory.json")
+        state = _synthetic_state(users, turns)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        size_mb = os.path.getsize(path) / 1e6
+
+        start = time.perf_counter()
+        interactions, context = _legacy_load(path)
+        legacy_load_ms = (time.perf_counter() - start) * 1000
+
+        def legacy_write(i):
+            context[f"user{i % users:06d}"]["last_action"] = f"tool_{i}"
+            _legacy_save(path, interactions, context)
+
+        legacy = _timed(legacy_write, legacy_writes)
+
+        start = time.perf_counter()
+        memory = AgentMemory(save_path=path, max_turns=MAX_TURNS)
+        first_load_ms = (time.perf_counter() - start) * 1000
+
+        def journal_write(i):
+            uid = f"user{i % users:06d}"
+            if i % 2:
+                memory.add_interaction(uid, role="human", message=f"yeni mesaj {i}")
+            else:
+                memory.set_context(uid, "last_action", f"tool_{i}")
+
+        journal = _timed(journal_write, writes)
+
+        start = time.perf_counter()
+        replayed = AgentMemory(save_path=path, max_turns=MAX_TURNS)
+        replay_load_ms = (time.perf_counter() - start) * 1000
+        assert replayed.get_context("user000000", "last_action") == memory.get_context("user000000", "last_action")
+
+        start = time.perf_counter()
+        memory.save()
+        compact_ms = (time.perf_counter() - start) * 1000
+
+        print(f"\n=== {users} kullanıcı x {turns} etkileşim ({size_mb:.1f} MB) ===")
+        print(f"Yazma  eski (tam dosya)   : ort {statistics.mean(legacy):9.2f} ms  p99 {_percentile(legacy, 0.99):9.2f} ms"
+              f"  ({legacy_writes} yazma)")
+        print(f"Yazma  yeni (günlük)      : ort {statistics.mean(journal):9.3f} ms  p99 {_percentile(journal, 0.99):9.3f} ms"
+              f"  ({writes} yazma)")
+        print(f"Yükleme eski              : {legacy_load_ms:9.1f} ms")
+        print(f"Yükleme yeni (içe aktarma): {first_load_ms:9.1f} ms")
+        print(f"Yükleme yeni (tembel)     : {replay_load_ms:9.1f} ms")
+        print(f"Sıkıştırma                : {compact_ms:9.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--legacy-writes", type=int, default=5)
+    args = parser.parse_args()
+    for users in args.users:
+        run(users, args.turns, args.writes, args.legacy_writes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Geçmiş sorguları: eski doğrusal tarama ile _HistoryIndex (araç / tür / sözcük indeksleri).
+
+Her pencere boyutu (--sizes, max_turns) için tek kullanıcının penceresi gerçekçi mesajlarla doldurulur
+(araç çağrıları, ara sıra tool_error). Ardından get_interactions_by_tool, has_used_tool,
+find_keywords_in_history, get_recent_errors ve get_last_tool_error için çağrı başına süre raporlanır:
+  - eski  : sürüm öncesi uygulama (kullanıcı kilidi altında deque taranır, mesajlar her anahtar kelime
+            için yeniden lower() edilir)
+  - yeni  : AgentMemory metotları (indeks kuruluyken)
+Ayrıca indeksin bir kez kurulma süresi (oturum yüklendikten sonraki ilk sorgu) ve add_interaction'a
+eklediği maliyet (indeksli / indekssiz) verilir.
+
+Kullanım:
+    python benchmarks/bench_memory_lookup.py --sizes 20 1000 10000 --repeat 200
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory import AgentMemory  # noqa: E402
+
+USER = "user000"
+TOOLS = ["get_bill_info", "get_campaigns", "get_package_information", "pay_bill", "get_line_status"]
+KEYWORDS = ["fatura", "ödeme", "iptal", "kampanya"]
+MESSAGES = [
+    "Geçen ayki faturam neden bu kadar yüksek geldi?",
+    "Paketimi değiştirmek istiyorum, hangi kampanyalar var?",
+    "Hattımda internet yok, arıza mı var?",
+    "Borcumu kredi kartıyla ödemek istiyorum.",
+    "Aboneliğimi iptal etmek istiyorum.",
+]
+
+
+def _fill(memory: AgentMemory, n: int, rng: random.Random):
+    for i in range(n):
+        memory.add_interaction(USER, role="human", message=f"{rng.choice(MESSAGES)} (#{i})")
+        tool = rng.choice(TOOLS)
+        if rng.random() < 0.05:
+            memory.add_interaction(USER, role="ai", message=f"{tool} başarısız: zaman aşımı (#{i})",
+                                   type="tool_error", metadata={"tool": tool})
+        else:
+            memory.add_interaction(USER, role="ai", message=f"{tool} sonucu: kayıt bulundu (#{i})",
+                                   type="tool", metadata={"tool": tool})
+
+
+def _legacy(memory: AgentMemory):
+    def by_tool(tool_name):
+        with memory._user(USER, create=False) as s:
+            return [entry for entry in s.history if entry.get("metadata", {}).get("tool") == tool_name]
+
+    def keywords(kws):
+        with memory._user(USER, create=False) as s:
+            return [kw for i in s.history for kw in kws if kw.lower() in i["message"].lower()]
+
+    def errors(n=3):
+        with memory._user(USER, create=False) as s:
+            return [i["message"] for i in reversed(s.history) if i.get("type") == "tool_error"][:n]
+
+    def last_error():
+        with memory._user(USER, create=False) as s:
+            for i in reversed(s.history):
+                if i.get("type") == "tool_error":
+                    return i["message"]
+        return ""
+
+    return {
+        "get_interactions_by_tool": lambda: by_tool("pay_bill"),
+        "has_used_tool": lambda: any(by_tool("get_campaigns")),
+        "find_keywords_in_history": lambda: keywords(KEYWORDS),
+        "get_recent_errors": errors,
+        "get_last_tool_error": last_error,
+    }
+
+
+def _new(memory: AgentMemory):
+    return {
+        "get_interactions_by_tool": lambda: memory.get_interactions_by_tool(USER, "pay_bill"),
+        "has_used_tool": lambda: memory.has_used_tool(USER, "get_campaigns"),
+        "find_keywords_in_history": lambda: memory.find_keywords_in_history(USER, KEYWORDS),
+        "get_recent_errors": lambda: memory.get_recent_errors(USER),
+        "get_last_tool_error": lambda: memory.get_last_tool_error(USER),
+    }
+
+
+def _time(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) * 1e6 / repeat, result
+
+
+def run(size: int, args):
+    workdir = tempfile.mkdtemp(prefix="bench_lookup_")
+    try:
+        memory = AgentMemory(save_path=os.path.join(workdir, "agent_memory.json"), durability="async",
+                             max_turns=size)
+        # Pencere bir kez kaymış olsun: indeks düşen etkileşimleri de işlemiş olur
+        _fill(memory, size // 2 + size // 4, random.Random(size))
+        memory.has_used_tool(USER, "pay_bill")
+        _fill(memory, size // 2, random.Random(size + 1))
+        session = memory._sessions[USER]
+
+        build_us = 0.0
+        for _ in range(args.build_repeat):
+            session.index = None
+            build_us += _time(lambda: memory.has_used_tool(USER, "pay_bill"), 1)[0]
+        build_us /= args.build_repeat
+
+        legacy, new = _legacy(memory), _new(memory)
+        rows = []
+        for name in legacy:
+            old_us, old_result = _time(legacy[name], args.repeat)
+            new_us, new_result = _time(new[name], args.repeat)
+            assert old_result == new_result, name
+            rows.append((name, old_us, new_us))
+
+        add = lambda: memory.add_interaction(USER, role="ai", message="get_bill_info sonucu: kayıt bulundu",  # noqa: E731
+                                             type="tool", metadata={"tool": "get_bill_info"})
+        add_indexed_us, _ = _time(add, args.repeat)
+        session.index = None
+        add_plain_us, _ = _time(add, args.repeat)
+        memory._buffer.close()
+        memory._store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\npencere {size} etkileşim  (indeks kurulumu {build_us:.0f} µs, add_interaction "
+          f"{add_plain_us:.1f} -> {add_indexed_us:.1f} µs)")
+    for name, old_us, new_us in rows:
+        print(f"  {name:<26} eski {old_us:10.1f} µs   yeni {new_us:8.1f} µs   x{old_us / new_us:7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--build-repeat", type=int, default=5)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args)
+
+
+if __name__ == "__main__":
+    main()
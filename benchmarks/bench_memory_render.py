@@ -0,0 +1,93 @@
+"""
+load_memory_variables maliyeti ve prompt boyutu: eski tam yeniden biçimlendirme ile önbellekli + bütçeli hal.
+
+Tek bir uzun oturum simüle edilir: her tur uzun kullanıcı/araç mesajları, büyük araç çıktıları ve
+düzenli aralıklarla askıya alınan niyetler (suspended_intents sınırsız büyür). Belirli turlarda:
+  - eski : her çağrıda geçmiş satırları f-string ile, ajan durumu json.dumps(indent=2) ile baştan
+           üretilir ve boyut sınırı yoktur
+  - yeni : AgentMemory.load_memory_variables (satır önbelleği, durum metni önbelleği, token bütçesi)
+için çağrı başına süre ve tahmini token sayısı (memory.estimate_tokens) raporlanır. "soğuk" sütunu her
+çağrıdan önce context'e yazılmış (durum önbelleği geçersiz) haldir; gerçek turlar çoğunlukla böyledir.
+
+Kullanım:
+    python benchmarks/bench_memory_render.py --turns 5 20 50 200 --history-tokens 1500 --state-tokens 600
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory import AgentMemory, estimate_tokens  # noqa: E402
+
+USER = "user000"
+
+
+def _legacy_variables(memory: AgentMemory, user_id: str):
+    recent = memory.get_raw_interactions(user_id, memory.max_turns)
+    history = "\n".join([f"{item['role'].capitalize()}: {item['message']}" for item in recent])
+    state = json.dumps(memory.get_agent_state(user_id), ensure_ascii=False, indent=2)
+    return {"chat_history": history, "agent_state": state}
+
+
+def _turn(memory: AgentMemory, t: int):
+    memory.add_interaction(USER, role="human", message=f"Tur {t}: geçen ayki faturamda {t * 10} TL fark var, "
+                                                       "neden bu kadar yüksek geldi, kampanyam bitti mi?")
+    memory.set_tool_chain(USER, ["get_bill_info", "get_campaigns", "pay_bill"])
+    memory.set_current_focus(USER, f"fatura_itirazi_{t}")
+    output = {"amount": 250 + t, "items": [{"name": f"Ek paket {i}", "price": 10 + i} for i in range(8)]}
+    memory.add_tool_output(USER, "get_bill_info", output)
+    memory.add_interaction(USER, role="ai", message=f"Faturanız {250 + t} TL. Kalemler: " + json.dumps(output),
+                           type="tool", metadata={"tool": "get_bill_info"})
+    if t % 3 == 0:
+        memory.suspend_current_intent(USER)
+    memory.set_last_successful_action(USER, "get_bill_info")
+
+
+def _time(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) * 1e6 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, nargs="+", default=[5, 20, 50, 200])
+    parser.add_argument("--history-tokens", type=int, default=1500)
+    parser.add_argument("--state-tokens", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_render_")
+    try:
+        memory = AgentMemory(save_path=os.path.join(workdir, "agent_memory.json"), durability="async",
+                             history_token_budget=args.history_tokens, state_token_budget=args.state_tokens)
+        print(f"{'tur':>5} | {'eski token':>10} {'eski µs':>9} | {'yeni token':>10} {'yeni µs':>9} "
+              f"{'soğuk µs':>9} {'(geçmiş/durum)':>15}")
+        done = 0
+        for target in sorted(args.turns):
+            while done < target:
+                _turn(memory, done)
+                done += 1
+            inputs = {"user_id": USER}
+            legacy_us, legacy = _time(lambda: _legacy_variables(memory, USER), args.repeat)
+            new_us, new = _time(lambda: memory.load_memory_variables(inputs), args.repeat)
+            write_us, _ = _time(lambda: memory.set_context(USER, "tick", 0), args.repeat)
+            cold_us, _ = _time(lambda: (memory.set_context(USER, "tick", 0), memory.load_memory_variables(inputs)),
+                               args.repeat)
+            legacy_tokens = sum(estimate_tokens(v) for v in legacy.values())
+            history_tokens, state_tokens = (estimate_tokens(new[k]) for k in ("chat_history", "agent_state"))
+            print(f"{target:5d} | {legacy_tokens:10d} {legacy_us:9.1f} | {history_tokens + state_tokens:10d} "
+                  f"{new_us:9.1f} {cold_us - write_us:9.1f} {f'{history_tokens}/{state_tokens}':>15}")
+        memory._buffer.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
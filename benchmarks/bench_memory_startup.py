@@ -0,0 +1,137 @@
+"""
+Süreç açılışında bellek yükleme maliyeti: eski tam yükleme ile kullanıcı başına tembel yükleme.
+
+Her kullanıcı sayısı için sentetik bir agent_memory.json üretilir (bench_memory_journal ile aynı biçim)
+ve her senaryo ayrı bir alt süreçte ölçülür; böylece en yüksek RSS senaryolar arasında karışmaz:
+  - eski       : memory.py, agent_runner.py ve tools.py'nin her biri tüm dosyayı deque'lere ayrıştırır (3x)
+  - ilk açılış : tek paylaşılan örnek; eski tek parça JSON bir kez snapshot'a aktarılır
+  - json       : sonraki açılışlar; yalnız snapshot indeksi (.idx) ve günlük okunur
+  - sqlite     : aynı veri SQLite deposunda (AGENT_MEMORY_PATH=*.db)
+Açılıştan sonra --sample rastgele kullanıcının ilk erişimi (depodan yükleme) ayrıca ölçülür.
+memory modülü içe aktarılınca paylaşılan örneği açtığından alt süreçlere yol ortam değişkeniyle verilir.
+
+Kullanım:
+    python benchmarks/bench_memory_startup.py --users 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MAX_TURNS = 20
+
+
+def _write_synthetic(path: str, users: int, turns: int):
+    messages = [
+        {"role": "human" if t % 2 == 0 else "ai", "message": f"Mesaj {t}: faturam ne kadar?", "type": "message"}
+        for t in range(turns)
+    ]
+    context = {"current_task": "fatura_bilgisi", "last_action": "get_bill_info", "plan_version": 1}
+    state = {
+        "interactions": {f"user{i:06d}": messages for i in range(users)},
+        "context": {f"user{i:06d}": context for i in range(users)},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(state, ensure_ascii=False))
+
+
+def _legacy_load(path: str):
+    """Eski AgentMemory.load(): tüm dosya ayrıştırılır, her kullanıcı deque'ye çevrilir."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.loads(f.read().strip())
+    interactions = defaultdict(
+        lambda: deque(maxlen=MAX_TURNS),
+        {uid: deque(m, maxlen=MAX_TURNS) for uid, m in data.get("interactions", {}).items()},
+    )
+    return interactions, defaultdict(dict, data.get("context", {}))
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(mode: str, path: str, users: int, sample: int):
+    """Alt süreç: açılışı ölçer ve sonucu tek satır JSON olarak basar."""
+    import langchain_core.memory  # noqa: F401  (her iki senaryoda da aynı taban RSS)
+    import memory_store  # noqa: F401
+
+    base_rss = _rss_mb()
+    start = time.perf_counter()
+    if mode == "legacy":
+        instances = [_legacy_load(path) for _ in range(3)]
+        open_ms = (time.perf_counter() - start) * 1000
+        first_access_ms = 0.0
+        assert len(instances[0][0]) == users
+    else:
+        from memory import memory  # AGENT_MEMORY_PATH = path (bkz. _spawn)
+
+        open_ms = (time.perf_counter() - start) * 1000
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for _ in range(sample):
+            uid = f"user{rng.randrange(users):06d}"
+            assert memory.get_context(uid, "current_task") == "fatura_bilgisi"
+        first_access_ms = (time.perf_counter() - start) * 1000 / sample
+    print(json.dumps({"open_ms": open_ms, "first_access_ms": first_access_ms,
+                      "rss_mb": _rss_mb(), "base_rss_mb": base_rss}))
+
+
+def _spawn(mode: str, path: str, users: int, sample: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--path", path,
+         "--users", str(users), "--sample", str(sample)],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+        env={**os.environ, "AGENT_MEMORY_PATH": path, "AGENT_MEMORY_DURABILITY": "sync"},
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(users: int, turns: int, sample: int):
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        path = os.path.join(workdir, "agent_memory.json")
+        _write_synthetic(path, users, turns)
+        size_mb = os.path.getsize(path) / 1e6
+        db_path = os.path.join(workdir, "agent_memory.db")
+
+        print(f"\n=== {users} kullanıcı x {turns} etkileşim ({size_mb:.1f} MB) ===")
+        print(f"{'senaryo':<12} {'açılış':>10} {'ilk erişim':>12} {'RSS':>9} {'RSS artışı':>11}")
+        for label, mode, p in (("eski (3x)", "legacy", path), ("ilk açılış", "lazy", path),
+                               ("json", "lazy", path), ("sqlite", "lazy", db_path)):
+            if p == db_path and not os.path.exists(db_path):
+                subprocess.run([sys.executable, "memory_store.py", "--src", path, "--dst", db_path],
+                               cwd=ROOT, check=True, capture_output=True)
+            r = _spawn(mode, p, users, sample)
+            print(f"{label:<12} {r['open_ms']:8.1f} ms {r['first_access_ms']:9.3f} ms "
+                  f"{r['rss_mb']:6.0f} MB {r['rss_mb'] - r['base_rss_mb']:8.0f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=200, help="İlk erişimi ölçülecek kullanıcı sayısı")
+    parser.add_argument("--child", choices=["legacy", "lazy"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.child, args.path, args.users[0], args.sample)
+        return
+    for users in args.users:
+        run(users, args.turns, args.sample)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Arka plan konuşma özetinin uzun oturumlarda prompt boyutuna ve tur gecikmesine etkisi.
+
+Konu değiştiren (askıya alma / sürdürme) uzun bir çağrı merkezi oturumu iki kez oynatılır: özetsiz ve
+BackgroundSummarizer bağlıyken. Her turda load_memory_variables çağrılır ve ajanın gerçek ReAct promptu
+(agent_runner.get_agent(): sistem promptu, araç açıklamaları, geçmiş, ajan durumu, mesaj) bu değişkenlerle
+biçimlendirilir. Ajan LLM'i prompt tokenı başına --prefill-ms kadar bekleyen bir uyku ile taklit edilir
+(Ollama'da prompt işleme süresi prompt boyutuyla doğrusal büyür), ardından turun bellek yazımları ve
+end_turn yapılır. Özetleyici de sahte: --summary-latency bekler ve katlanan insan mesajlarından kısaltılmış
+bir özet döner; istek yolunu beklemediği görülsün diye gerçek LLM kadar yavaş tutulabilir.
+
+Raporlanan: --checkpoints turlarındaki (son 3 turun ortalaması) ajanın ilk adım prompt tokenı, tur gecikmesi
+ve bunun LLM taklidi dışındaki kısmı (bellek işlemleri).
+Varsayılan pencere (20 etkileşim) ve geçmiş bütçesi zaten sınır koyar; --max-turns 100 --history-tokens 0
+özetin geçmiş büyümesini tek başına nasıl sınırladığını gösterir.
+
+Kullanım:
+    python benchmarks/bench_memory_summary.py --checkpoints 5 20 50 --prefill-ms 0.5 --summary-latency 1.5
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent_runner  # noqa: E402
+from memory import AgentMemory, estimate_tokens  # noqa: E402
+from summarizer import BackgroundSummarizer  # noqa: E402
+
+USER = "user000"
+TOPICS = [
+    ("fatura_bilgisi", "Bu ayki faturam neden {n} TL geldi, geçen ay daha azdı?"),
+    ("paket_degisikligi", "Paketimi {n} GB internetli pakete geçirmek istiyorum, fiyatı nedir?"),
+    ("kampanya_bilgisi", "{n}. yıl sadakat kampanyasından yararlanabilir miyim?"),
+    ("ariza_kaydi", "Evdeki internet {n} gündür kesik, arıza kaydı açar mısınız?"),
+]
+
+
+def _fake_summarizer(latency: float, max_chars: int):
+    def summarize(previous, entries):
+        time.sleep(latency)
+        points = [e["message"][:70] for e in entries if e["role"] == "human"]
+        text = "; ".join(filter(None, [previous] + points))
+        return text[-max_chars:]
+    return summarize
+
+
+def _turn(memory: AgentMemory, prompt, t: int, prefill_ms: float):
+    topic, template = TOPICS[(t // 3) % len(TOPICS)]
+    message = template.format(n=t + 10)
+    start = time.perf_counter()
+    variables = memory.load_memory_variables({"user_id": USER})
+    tokens = estimate_tokens(prompt.format(input=f"[user_id:{USER}] {message}", agent_scratchpad="", **variables))
+    llm_seconds = tokens * prefill_ms / 1000
+    time.sleep(llm_seconds)
+    memory.add_interaction(USER, role="human", message=message)
+    if t % 3 == 0 and t:
+        # Konu değişimi: önceki görev askıya alınır, iki konu sonra geri dönülür
+        memory.suspend_current_intent(USER)
+    if t % 6 == 5:
+        memory.resume_last_suspended(USER)
+    memory.set_context(USER, "current_task", topic)
+    memory.set_tool_chain(USER, ["get_user_info", f"get_{topic}"])
+    output = {"topic": topic, "turn": t, "detail": "Kayıt bulundu, işlem adımları iletildi.", "amount": 100 + t}
+    memory.add_tool_output(USER, f"get_{topic}", output)
+    memory.add_interaction(USER, role="ai", type="tool", metadata={"tool": f"get_{topic}"},
+                           message=f"{topic} için kontrol ettim: {output['detail']} Tutar {output['amount']} TL. "
+                                   "Başka bir konuda yardımcı olabilir miyim?")
+    memory.set_last_successful_action(USER, f"get_{topic}")
+    memory.end_turn(USER)
+    elapsed = time.perf_counter() - start
+    return tokens, elapsed * 1000, (elapsed - llm_seconds) * 1000
+
+
+def run(summaries: bool, args):
+    workdir = tempfile.mkdtemp(prefix="bench_summary_")
+    summarizer = None
+    try:
+        memory = AgentMemory(save_path=os.path.join(workdir, "agent_memory.json"), durability="async",
+                             history_token_budget=args.history_tokens, max_turns=args.max_turns)
+        if summaries:
+            summarizer = BackgroundSummarizer(_fake_summarizer(args.summary_latency, args.summary_chars))
+            memory.attach_summarizer(summarizer)
+        prompt = agent_runner.get_agent().agent.llm_chain.prompt
+        results = {}
+        for t in range(1, max(args.checkpoints) + 1):
+            results[t] = _turn(memory, prompt, t - 1, args.prefill_ms)
+        summary = memory.get_context(USER, "conversation_summary") or {}
+        memory._buffer.close()
+        return results, len(summary.get("text", ""))
+    finally:
+        if summarizer is not None:
+            summarizer.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--prefill-ms", type=float, default=0.5, help="Prompt tokenı başına LLM prompt işleme süresi")
+    parser.add_argument("--summary-latency", type=float, default=1.5, help="Sahte özet LLM'inin süresi (sn)")
+    parser.add_argument("--summary-chars", type=int, default=600, help="Özetin en fazla uzunluğu (num_predict karşılığı)")
+    parser.add_argument("--history-tokens", type=int, default=1500, help="Geçmiş token bütçesi (0 = sınırsız)")
+    parser.add_argument("--max-turns", type=int, default=20, help="Bellekteki etkileşim penceresi")
+    args = parser.parse_args()
+
+    plain, _ = run(False, args)
+    summarized, summary_chars = run(True, args)
+    print(f"{'tur':>4} | {'özetsiz token':>13} {'gecikme':>9} {'bellek':>8} | "
+          f"{'özetli token':>12} {'gecikme':>9} {'bellek':>8}")
+    for t in sorted(args.checkpoints):
+        a, b = (
+            [sum(col) / len(col) for col in zip(*(results[i] for i in range(max(1, t - 2), t + 1)))]
+            for results in (plain, summarized)
+        )
+        print(f"{t:4d} | {a[0]:13.0f} {a[1]:7.1f}ms {a[2]:6.2f}ms | {b[0]:12.0f} {b[1]:7.1f}ms {b[2]:6.2f}ms")
+    print(f"Son özet: {summary_chars} karakter")
+
+
+if __name__ == "__main__":
+    main()
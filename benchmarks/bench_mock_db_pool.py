@@ -0,0 +1,122 @@
+"""
+Araç çağrısı verimi: sorgu başına sqlite3.connect (eski) ile havuzlanmış, ayarlı bağlantılar (yeni).
+
+alfai.db geçici bir kopyaya alınır ve tools.py'deki araç fonksiyonları (mock_apis üzerinden) --threads
+kadar thread'le çağrılır. Karışım gerçek turlardaki gibi çoğunlukla okumadır: kullanıcı / paket / hat
+durumu / bakiye / fatura / kampanya sorguları (bazıları iki sorgu, iki bağlantı) ve geri bildirim kaydı
+(okuma + yazım). Destek talebi araçları dışarıda: alfai.db'deki support_tickets tablosunda service_type
+sütunu yok. Her mod için:
+  - eski : get_connection = sqlite3.connect(DB_PATH, factory=TracedConnection), dosya rollback
+           günlüğünde (journal_mode=DELETE, depodaki hali)
+  - yeni : mock_apis.get_connection (havuz, WAL, synchronous=NORMAL, mmap, cache_size, ifade önbelleği)
+saniyedeki araç çağrısı ve çağrı gecikmesi (p50 / p99) raporlanır.
+
+Kullanım:
+    python benchmarks/bench_mock_db_pool.py --threads 1 8 64 --calls 4000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mock_apis  # noqa: E402
+import tools  # noqa: E402
+from tracing import TracedConnection  # noqa: E402
+
+USERS = ["user123", "user456", "user000", "user001"]
+
+
+def _legacy_connection():
+    return sqlite3.connect(mock_apis.DB_PATH, factory=TracedConnection)
+
+
+def _call(rng: random.Random):
+    user_id = rng.choice(USERS)
+    op = rng.random()
+    if op < 0.2:
+        return tools.get_user_info(user_id)
+    if op < 0.35:
+        return tools.get_package_information(user_id)
+    if op < 0.5:
+        return tools.get_outstanding_balance(user_id)
+    if op < 0.65:
+        return tools.get_bill_info(user_id, "2025-07")
+    if op < 0.75:
+        return tools.get_line_status(user_id)
+    if op < 0.85:
+        return tools.get_available_packages(user_id)
+    if op < 0.93:
+        return tools.get_campaigns(user_id)
+    return tools.submit_feedback(user_id, "Çağrı merkezi çok hızlı yanıt verdi, teşekkürler.", rng.randint(1, 5))
+
+
+def run(mode: str, threads: int, args):
+    workdir = tempfile.mkdtemp(prefix="bench_db_pool_")
+    original = mock_apis.get_connection
+    try:
+        path = os.path.join(workdir, "alfai.db")
+        shutil.copy(os.path.join(ROOT, "alfai.db"), path)
+        mock_apis.DB_PATH = path
+        if mode == "eski":
+            with sqlite3.connect(path) as conn:
+                conn.execute("PRAGMA journal_mode=DELETE")
+            mock_apis.get_connection = tools.get_connection = _legacy_connection
+        latencies, errors = [], []
+        lock = threading.Lock()
+        per_thread = args.calls // threads
+
+        def worker(k: int):
+            rng = random.Random(k)
+            local = []
+            for _ in range(per_thread):
+                start = time.perf_counter()
+                try:
+                    _call(rng)
+                except Exception as e:
+                    with lock:
+                        errors.append(repr(e))
+                local.append((time.perf_counter() - start) * 1000)
+            with lock:
+                latencies.extend(local)
+
+        pool = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+        start = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        print(f"{mode:<5} {threads:3d} thread  {len(latencies) / elapsed:8.0f} çağrı/s  "
+              f"p50 {statistics.median(latencies):6.2f} ms  p99 {latencies[int(len(latencies) * 0.99)]:7.2f} ms  "
+              f"hata {len(errors)}")
+        for err in sorted(set(errors))[:3]:
+            print(f"   {err}")
+    finally:
+        mock_apis.get_connection = tools.get_connection = original
+        mock_apis.close_connections()
+        mock_apis.DB_PATH = "alfai.db"
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--calls", type=int, default=4000, help="Mod ve thread sayısı başına toplam araç çağrısı")
+    args = parser.parse_args()
+    for threads in args.threads:
+        for mode in ("eski", "yeni"):
+            run(mode, threads, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Araç alt kümesi seçiminin ajan promptuna etkisini ölçer.
+
+scenarios.json'daki her cümle için ajan promptu iki kez kurulur: tüm araçlarla (eski) ve
+select_tool_names() alt kümesiyle (yeni). Ortalama prompt uzunluğu ve tahmini token sayısı
+(karakter / 4) raporlanır. Ayrıca senaryonun tool_chain_plan'ındaki tüm araçların seçilen
+kümede olup olmadığı (kapsama) ölçülür. --cv ile niyet modeli her katmanda diğer katmanlarla eğitilir;
+böylece kapsama eğitim verisini ezberlemeden ölçülür.
+
+Kullanım:
+    python benchmarks/bench_tool_selection.py --cv 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent_runner  # noqa: E402
+from intent_classifier import IntentClassifier, load_training_data  # noqa: E402
+
+CHARS_PER_TOKEN = 4
+
+
+def _prompt_chars(tool_names, utterance: str) -> int:
+    prompt = agent_runner.get_agent(tool_names=tool_names).agent.llm_chain.prompt
+    return len(prompt.format(input=f"[user_id:user000] {utterance}", agent_scratchpad=""))
+
+
+def _evaluate(scenarios):
+    registered = {t.name for t in agent_runner.get_tools()}
+    before, after, sizes, covered = [], [], [], 0
+    for sc in scenarios:
+        utterance = sc["user_utterance"]
+        # general_question gibi kayıtlı olmayan "araçlar" ajan promptunda yer almaz
+        chain = {step["tool"] for step in sc.get("tool_chain_plan", []) if step.get("tool") in registered}
+        prediction = agent_runner.classify_intent(utterance)
+        selected = agent_runner.select_tool_names(utterance, prediction)
+        before.append(_prompt_chars(None, utterance))
+        after.append(_prompt_chars(selected, utterance))
+        names = set(selected) if selected else {t.name for t in agent_runner.get_tools()}
+        sizes.append(len(names))
+        covered += chain <= names
+    return before, after, sizes, covered
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default="scenarios.json")
+    parser.add_argument("--cv", type=int, default=0, help="Niyet modeli için katman sayısı (0: kayıtlı model)")
+    args = parser.parse_args()
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        scenarios = [sc for sc in json.load(f) if sc.get("user_utterance")]
+
+    if args.cv:
+        samples, tool_scope = load_training_data(agent_runner.TOOL_TO_INTENT, args.file)
+        texts = {sc["user_utterance"] for sc in scenarios}
+        seeds = [s for s in samples if s[0] not in texts]
+        before, after, sizes, covered = [], [], [], 0
+        for k in range(args.cv):
+            test = [sc for i, sc in enumerate(scenarios) if i % args.cv == k]
+            test_texts = {sc["user_utterance"] for sc in test}
+            train = [s for s in samples if s[0] not in test_texts] + seeds
+            agent_runner._intent_classifier = IntentClassifier.train(train, tool_scope=tool_scope)
+            b, a, s, c = _evaluate(test)
+            before += b
+            after += a
+            sizes += s
+            covered += c
+    else:
+        before, after, sizes, covered = _evaluate(scenarios)
+
+    n = len(scenarios)
+    mean_before, mean_after = statistics.mean(before), statistics.mean(after)
+    print(f"Senaryo sayısı           : {n}")
+    print(f"Tüm araçlar  (önce)      : {mean_before:8.0f} karakter ≈ {mean_before / CHARS_PER_TOKEN:6.0f} token")
+    print(f"Seçili araçlar (sonra)   : {mean_after:8.0f} karakter ≈ {mean_after / CHARS_PER_TOKEN:6.0f} token")
+    print(f"Azalma                   : %{100 * (1 - mean_after / mean_before):.1f}")
+    print(f"Ortalama araç sayısı     : {statistics.mean(sizes):.1f} / {len(agent_runner.get_tools())}")
+    print(f"Plan kapsaması           : {covered}/{n} (%{100 * covered / n:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Eşzamanlı konuşma yükü altında main() (thread havuzu) ile amain() (asyncio) karşılaştırması.
+
+Ollama yerine gecikmesi ayarlanabilen sahte bir LLM kullanılır; böylece ölçülen şey
+modelin hızı değil, aynı anda kaç konuşmanın LLM beklerken ilerleyebildiğidir.
+Senkron yol FastAPI/anyio'nun varsayılan thread limiti (40) ile sınırlanır.
+
+Kullanım:
+    python benchmarks/load_sync_vs_async.py --sessions 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.llms import LLM  # noqa: E402
+
+import agent_runner  # noqa: E402
+
+ANYIO_DEFAULT_THREADS = 40
+MESSAGE = "Kampanyalar hakkında bilgi almak istiyorum, ne önerirsiniz?"
+USERS = ["user123", "user456", "user000", "user001"]
+
+
+class SlowLLM(LLM):
+    """Her çağrıda `latency` saniye bekleyip sabit bir ReAct yanıtı döner; eşzamanlı çağrı tepe değerini tutar."""
+    latency: float = 0.5
+    response: str = "Final Answer: Size uygun kampanyaları listeleyebilirim."
+    in_flight: int = 0
+    peak: int = 0
+    lock: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _exit(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        self._enter()
+        try:
+            time.sleep(self.latency)
+        finally:
+            self._exit()
+        return self.response
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self._exit()
+        return self.response
+
+
+def _install(latency: float) -> SlowLLM:
+    fake = SlowLLM(latency=latency)
+    agent_runner.llm = fake
+    agent_runner.policy_llm = fake
+    agent_runner.clear_agent_cache()
+    return fake
+
+
+def run_sync(sessions: int, latency: float):
+    fake = _install(latency)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=ANYIO_DEFAULT_THREADS) as pool:
+        results = list(pool.map(lambda i: agent_runner.main(USERS[i % len(USERS)], MESSAGE), range(sessions)))
+    return time.perf_counter() - start, fake.peak, results
+
+
+def run_async(sessions: int, latency: float):
+    fake = _install(latency)
+
+    async def _all():
+        return await asyncio.gather(*(agent_runner.amain(USERS[i % len(USERS)], MESSAGE) for i in range(sessions)))
+
+    start = time.perf_counter()
+    results = asyncio.run(_all())
+    return time.perf_counter() - start, fake.peak, results
+
+
+def _report(label: str, elapsed: float, peak: int, results, sessions: int):
+    ok = sum(1 for r in results if r.get("success"))
+    print(f"{label:<22} süre={elapsed:7.2f} s | eşzamanlı LLM tepe={peak:4d} | "
+          f"oturum/s={sessions / elapsed:7.1f} | başarılı={ok}/{sessions}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="Sahte LLM gecikmesi (saniye)")
+    args = parser.parse_args()
+
+    # Ölçüme disk yazımı karışmasın
+    object.__setattr__(agent_runner.memory, "save", lambda *a, **k: None)
+
+    _report("senkron (40 thread)", *run_sync(args.sessions, args.latency), args.sessions)
+    _report("asenkron (asyncio)", *run_async(args.sessions, args.latency), args.sessions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Çalışan API'nin /metrics çıktısını yerelde kazır ve Prometheus metin biçimine uygunluğunu denetler.
+
+Her metrik için HELP/TYPE satırı, örnek satırlarının sayısal değeri ve histogramlarda kovaların
+kümülatif olması ile +Inf kovasının _count'a eşitliği kontrol edilir. Sonunda metrik bazında
+örnek sayısı yazdırılır; --show ile seçilen metriklerin satırları da basılır.
+
+Kullanım (uvicorn api:app çalışır durumda olmalı):
+    python benchmarks/scrape_metrics.py --url http://localhost:8000/metrics --show tool_calls_total
+"""
+import argparse
+import re
+import sys
+import urllib.request
+from collections import defaultdict
+
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$')
+LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def _base_name(name: str, types: dict) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and types.get(name[: -len(suffix)]) == "histogram":
+            return name[: -len(suffix)]
+    return name
+
+
+def validate(text: str):
+    errors = []
+    types, helps = {}, set()
+    samples = defaultdict(list)
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        if line.startswith("# HELP "):
+            helps.add(line.split()[2])
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(maxsplit=3)
+            types[name] = kind
+            continue
+        if line.startswith("#"):
+            continue
+        match = SAMPLE_RE.match(line)
+        if not match:
+            errors.append(f"{lineno}: biçim hatası: {line}")
+            continue
+        name, labels, value = match.groups()
+        try:
+            float(value)
+        except ValueError:
+            errors.append(f"{lineno}: sayısal olmayan değer: {line}")
+            continue
+        base = _base_name(name, types)
+        if base not in types or base not in helps:
+            errors.append(f"{lineno}: {base} için HELP/TYPE yok")
+        samples[base].append((name, labels or "", float(value)))
+
+    for base, rows in samples.items():
+        if types.get(base) != "histogram":
+            continue
+        series = defaultdict(list)
+        counts = {}
+        for name, labels, value in rows:
+            parsed = dict(LABEL_RE.findall(labels))
+            le = parsed.pop("le", None)
+            key = tuple(sorted(parsed.items()))
+            if name.endswith("_bucket"):
+                series[key].append((le, value))
+            elif name.endswith("_count"):
+                counts[key] = value
+        for key, buckets in series.items():
+            values = [v for _, v in buckets]
+            if values != sorted(values):
+                errors.append(f"{base}{dict(key)}: kovalar kümülatif değil")
+            if buckets[-1][0] != "+Inf":
+                errors.append(f"{base}{dict(key)}: son kova +Inf değil")
+            elif counts.get(key) != buckets[-1][1]:
+                errors.append(f"{base}{dict(key)}: +Inf kovası _count ile eşleşmiyor")
+    return types, samples, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000/metrics")
+    parser.add_argument("--show", nargs="*", default=[], help="Satırları basılacak metrik adları")
+    args = parser.parse_args()
+
+    with urllib.request.urlopen(args.url, timeout=10) as resp:
+        content_type = resp.headers.get("Content-Type", "")
+        text = resp.read().decode("utf-8")
+
+    types, samples, errors = validate(text)
+    print(f"Content-Type: {content_type}")
+    for name, kind in types.items():
+        print(f"  {name:<40} {kind:<10} {len(samples.get(name, [])):5d} örnek")
+        if name in args.show:
+            for sample_name, labels, value in samples.get(name, []):
+                print(f"      {sample_name}{labels} {value:g}")
+    if errors:
+        print(f"❌ {len(errors)} hata:")
+        for err in errors:
+            print(f"   {err}")
+        sys.exit(1)
+    print(f"✅ {len(types)} metrik geçerli.")
+
+
+if __name__ == "__main__":
+    main()
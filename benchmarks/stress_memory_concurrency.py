@@ -0,0 +1,184 @@
+"""
+AgentMemory eşzamanlılık stres testi: yüzlerce simüle kullanıcı, çok sayıda thread.
+
+Her kullanıcı --turns tur konuşur. Bir turda main() akışındaki bellek işlemleri yapılır (etkileşim
+ekleme, context / araç zinciri / araç çıktısı yazımı, askıya alma-sürdürme, load_memory_variables,
+end_turn). Kullanıcılar ortak bir kuyruktan alınır: aynı kullanıcının turları sırayla ama farklı
+thread'lerde çalışır, farklı kullanıcılar eşzamanlıdır. --max-sessions küçük tutularak tahliye +
+yeniden yükleme de sürekli tetiklenir. Aynı anda:
+  - bir thread save() (flush + sıkıştırma) ve /metrics'teki memory_resident_bytes ölçümünü döndürür,
+  - "sıcak" kullanıcı aşamasında tüm thread'ler aynı kullanıcıya yazar.
+
+Sonunda bellek kaydedilir, aynı depodan yeni bir AgentMemory açılır ve her kullanıcının son turu,
+pencere uzunluğu ve araç çıktıları doğrulanır. Hata ya da uyuşmazlık varsa çıkış kodu 1'dir.
+
+Kullanım:
+    python benchmarks/stress_memory_concurrency.py --users 300 --threads 1 64 --turns 30
+"""
+import argparse
+import os
+import queue
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory import AgentMemory  # noqa: E402
+
+MAX_TURNS = 20
+
+
+def _turn(memory: AgentMemory, user_id: str, t: int):
+    memory.add_interaction(user_id, role="human", message=f"{user_id} mesaj {t}")
+    memory.load_memory_variables({"user_id": user_id})
+    memory.set_context(user_id, "turn", t)
+    memory.set_tool_chain(user_id, ["get_bill_info", "pay_bill"])
+    memory.get_next_tool(user_id)
+    memory.add_tool_output(user_id, "get_bill_info", {"turn": t})
+    if t % 7 == 3:
+        memory.suspend_current_intent(user_id)
+    elif t % 7 == 4:
+        memory.resume_last_suspended(user_id)
+    memory.find_keywords_in_history(user_id, ["fatura", "mesaj"])
+    memory.add_interaction(user_id, role="ai", message=f"{user_id} yanıt {t}", type="tool",
+                           metadata={"tool": "get_bill_info"})
+    memory.set_last_successful_action(user_id, "get_bill_info")
+    memory.end_turn(user_id)
+
+
+def _verify(path: str, durability: str, users, turns: int, hot_writes) -> list:
+    fresh = AgentMemory(save_path=path, durability=durability, max_turns=MAX_TURNS)
+    problems = []
+    for user_id in users:
+        history = fresh.get_raw_interactions(user_id, MAX_TURNS)
+        outputs = fresh.get_context_tool_outputs(user_id)
+        if fresh.get_context(user_id, "turn") != turns - 1:
+            problems.append(f"{user_id}: turn={fresh.get_context(user_id, 'turn')}")
+        if len(history) != min(2 * turns, MAX_TURNS) or history[-1]["message"] != f"{user_id} yanıt {turns - 1}":
+            problems.append(f"{user_id}: pencere {len(history)} / {history[-1:]}")
+        if not outputs or outputs[-1]["output"] != {"turn": turns - 1}:
+            problems.append(f"{user_id}: araç çıktısı {outputs[-1:]}")
+    for key, value in hot_writes.items():
+        if fresh.get_context("hot-user", key) != value:
+            problems.append(f"hot-user {key}: {fresh.get_context('hot-user', key)} != {value}")
+    if len(fresh.get_raw_interactions("hot-user", MAX_TURNS)) != MAX_TURNS:
+        problems.append("hot-user: pencere dolu değil")
+    return problems
+
+
+def run(backend: str, durability: str, threads: int, args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="stress_memory_")
+    try:
+        path = os.path.join(workdir, "agent_memory.db" if backend == "sqlite" else "agent_memory.json")
+        memory = AgentMemory(save_path=path, durability=durability, max_turns=MAX_TURNS,
+                             max_sessions=args.max_sessions)
+        users = [f"user{i:04d}" for i in range(args.users)]
+        pending = queue.Queue()
+        for user_id in users:
+            pending.put((user_id, 0))
+        latencies, errors = [], []
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def worker():
+            local = []
+            while True:
+                try:
+                    user_id, t = pending.get_nowait()
+                except queue.Empty:
+                    break
+                start = time.perf_counter()
+                try:
+                    _turn(memory, user_id, t)
+                except Exception:
+                    with lock:
+                        errors.append(traceback.format_exc())
+                local.append((time.perf_counter() - start) * 1000)
+                if t + 1 < args.turns:
+                    pending.put((user_id, t + 1))
+            with lock:
+                latencies.extend(local)
+
+        def background():
+            while not done.is_set():
+                try:
+                    memory.save()
+                    memory.resident_bytes()
+                except Exception:
+                    with lock:
+                        errors.append(traceback.format_exc())
+                time.sleep(0.05)
+
+        hot_writes = {}
+
+        def hot_worker(k: int):
+            try:
+                for i in range(args.hot_writes):
+                    memory.add_interaction("hot-user", role="human", message=f"sıcak {k}-{i}")
+                    memory.set_context("hot-user", f"w{k}", i)
+                    # Anahtar ekleyip silmek: yazım sırasında dict boyutu değişirse serileştirme bozulur
+                    memory.set_pending_intent("hot-user", {"k": k, "i": i})
+                    memory.clear_pending_intent("hot-user")
+                    memory.add_tool_output("hot-user", "t", {"k": k, "i": i})
+                with lock:
+                    hot_writes[f"w{k}"] = args.hot_writes - 1
+            except Exception:
+                with lock:
+                    errors.append(traceback.format_exc())
+
+        bg = threading.Thread(target=background, daemon=True)
+        bg.start()
+        start = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        pool += [threading.Thread(target=hot_worker, args=(k,)) for k in range(min(threads, 16))]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        bg.join()
+        memory.save()
+        if memory._buffer is not None:
+            memory._buffer.close()
+
+        problems = _verify(path, durability, users, args.turns, hot_writes)
+        label = f"{backend}/{durability}"
+        print(f"{label:<15} {threads:3d} thread  {len(latencies) / elapsed:8.0f} tur/s  "
+              f"p50 {statistics.median(latencies):6.2f} ms  p99 {sorted(latencies)[int(len(latencies) * 0.99)]:7.2f} ms  "
+              f"hata {len(errors)}  uyuşmazlık {len(problems)}")
+        for err in errors[:3]:
+            print(err)
+        for problem in problems[:10]:
+            print(f"   {problem}")
+        return not errors and not problems
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--max-sessions", type=int, default=100, help="Tahliyeyi tetiklemek için küçük tutulur")
+    parser.add_argument("--hot-writes", type=int, default=200, help="Sıcak kullanıcıya thread başına yazım")
+    parser.add_argument("--durability", nargs="+", default=["sync", "batched", "async"])
+    args = parser.parse_args()
+
+    ok = True
+    for backend in ("journal", "sqlite"):
+        for durability in args.durability:
+            for threads in args.threads:
+                ok = run(backend, durability, threads, args) and ok
+    print("✅ tutarlı" if ok else "❌ hata var")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
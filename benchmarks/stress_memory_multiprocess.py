@@ -0,0 +1,123 @@
+"""
+Çok süreçli (uvicorn --workers N benzeri) bellek paylaşımı testi.
+
+Her işçi ayrı bir süreçtir ve api.py gibi memory modülünün paylaşılan örneğini kullanır; hepsi aynı
+SQLite deposunu (AGENT_MEMORY_PATH=*.db) açar. İki aşama çalışır:
+  - yazım   : işçiler ortak --users kullanıcıya rastgele set_context(kendi anahtarı) / add_interaction /
+              add_tool_output yapar. Sonda her kullanıcının context'inde her işçinin son yazdığı değer
+              bulunmalıdır; başka sürecin eski kopyasıyla üzerine yazılan anahtar "kayıp yazım"dır.
+  - giriş   : her işçi kendi session anahtarlarıyla /api/login'deki gibi set_authenticated_user yapar,
+              ardından tüm işçiler birbirinin girişini okur; sonra herkes yeniden giriş yapar (farklı
+              user_id) ve diğerlerinin yeni değeri görmesi beklenir (eski önbellek = bayat okuma).
+--no-shared ile AGENT_MEMORY_SHARED=0 (süreç başına yetkili önbellek) davranışı karşılaştırılabilir.
+Sonda depo yeni bir örnekle açılıp doğrulanır; kayıp ya da bayat okuma varsa çıkış kodu 1'dir.
+
+Kullanım:
+    python benchmarks/stress_memory_multiprocess.py --workers 1 4 8 --users 50 --ops 2000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _worker(k: int, workers: int, args, barrier, results):
+    from memory import MEMORY_SESSION_REFRESHES, MEMORY_VERSION_CONFLICTS, memory
+
+    rng = random.Random(k)
+    users = [f"user{i:03d}" for i in range(args.users)]
+    last = {}
+    barrier.wait()
+    start = time.perf_counter()
+    for i in range(args.ops):
+        user_id = rng.choice(users)
+        op = rng.random()
+        if op < 0.6:
+            memory.set_context(user_id, f"w{k}", i)
+            last[user_id] = i
+        elif op < 0.8:
+            memory.add_interaction(user_id, role="human", message=f"w{k} mesaj {i}")
+        else:
+            memory.add_tool_output(user_id, "get_bill_info", {"w": k, "i": i})
+        memory.end_turn(user_id)
+    elapsed = time.perf_counter() - start
+
+    # Giriş görünürlüğü: her işçi kendi anahtarlarıyla giriş yapar, diğerleri okur
+    stale = 0
+    for rnd in ("v1", "v2"):
+        for j in range(args.logins):
+            memory.set_authenticated_user(f"tc{k}-{j}", f"u{k}-{j}-{rnd}")
+            memory.end_turn(f"tc{k}-{j}")
+        barrier.wait()
+        for other in range(workers):
+            for j in range(args.logins):
+                if memory.get_authenticated_user(f"tc{other}-{j}") != f"u{other}-{j}-{rnd}":
+                    stale += 1
+        barrier.wait()
+    results.put({"k": k, "elapsed": elapsed, "last": last, "stale": stale,
+                 "conflicts": MEMORY_VERSION_CONFLICTS.value(), "refreshes": MEMORY_SESSION_REFRESHES.value()})
+
+
+def run(workers: int, shared: bool, args) -> bool:
+    workdir = tempfile.mkdtemp(prefix="stress_mp_")
+    try:
+        path = os.path.join(workdir, "agent_memory.db")
+        # spawn: alt süreçler memory'yi bu ortamla sıfırdan içe aktarır (uvicorn işçileri gibi)
+        os.environ.update(AGENT_MEMORY_PATH=path, AGENT_MEMORY_DURABILITY="sync",
+                          AGENT_MEMORY_SHARED="1" if shared else "0")
+        mp = multiprocessing.get_context("spawn")
+        barrier, results = mp.Barrier(workers), mp.Queue()
+        procs = [mp.Process(target=_worker, args=(k, workers, args, barrier, results)) for k in range(workers)]
+        for p in procs:
+            p.start()
+        out = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+        from memory import AgentMemory
+
+        fresh = AgentMemory(save_path=path, durability="sync", shared=shared)
+        lost = sum(
+            1 for r in out for user_id, value in r["last"].items()
+            if fresh.get_context(user_id, f"w{r['k']}") != value
+        )
+        writes = sum(len(r["last"]) for r in out)
+        ops = workers * args.ops
+        elapsed = max(r["elapsed"] for r in out)
+        stale = sum(r["stale"] for r in out)
+        label = "paylaşımlı" if shared else "süreç-yerel"
+        print(f"{label:<12} {workers:2d} işçi  {ops / elapsed:8.0f} işlem/s  kayıp yazım {lost:4d}/{writes:<4d}  "
+              f"bayat giriş okuması {stale:4d}  çakışma {sum(r['conflicts'] for r in out):6.0f}  "
+              f"yenileme {sum(r['refreshes'] for r in out):6.0f}")
+        return not lost and not stale
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--users", type=int, default=50, help="Tüm işçilerin paylaştığı kullanıcı sayısı")
+    parser.add_argument("--ops", type=int, default=2000, help="İşçi başına bellek işlemi")
+    parser.add_argument("--logins", type=int, default=20, help="İşçi başına giriş (session anahtarı)")
+    parser.add_argument("--no-shared", action="store_true", help="Karşılaştırma: AGENT_MEMORY_SHARED=0")
+    args = parser.parse_args()
+
+    ok = True
+    for shared in ([True, False] if args.no_shared else [True]):
+        for workers in args.workers:
+            passed = run(workers, shared, args)
+            ok = ok and (passed or not shared)
+    print("✅ tutarlı" if ok else "❌ hata var")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Eşzamanlı konuşmalarda kullanıcı bağlamının sızmadığını doğrulayan stres testi.
+
+Sahte LLM araç girdisinde user_id vermez; call_tool_function kimliği istek bağlamından
+(current_user_id) doldurmak zorunda kalır. "whoami" aracı aldığı kimliği döndürür ve LLM bunu
+nihai yanıta yazar. Her yanıtın, isteği yapan kullanıcının kimliğini taşıması beklenir.
+whoami gerçek araçlar gibi tool_registry'ye kaydedilir ve mesaja göre seçilir; tüm araçlarla yeniden
+deneme (agent_tool_fallback_total) da raporlanır.
+Rastgele gecikmeler istekleri iç içe geçirir; hem thread havuzu (main) hem asyncio (amain) denenir.
+
+Kullanım:
+    python benchmarks/stress_user_context.py --requests 400 --threads 32
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.tools import StructuredTool  # noqa: E402
+from langchain_core.language_models.llms import LLM  # noqa: E402
+
+import agent_runner  # noqa: E402
+from tool_registry import UserId, tool_registry  # noqa: E402
+
+MESSAGE = "Kampanyalar hakkında bilgi almak istiyorum, ne önerirsiniz?"
+USERS = ["user123", "user456", "user000", "user001"]
+_OBSERVATION_RE = re.compile(r"Observation: uid=(\S+)")
+
+
+def whoami(user_id: str):
+    time.sleep(random.uniform(0, 0.005))
+    return f"uid={user_id}"
+
+
+class WhoAmILLM(LLM):
+    """İlk adımda whoami'yi user_id'siz çağırır, gözlemi gördüğünde onu nihai yanıt olarak döner."""
+    max_delay: float = 0.01
+
+    @property
+    def _llm_type(self) -> str:
+        return "whoami-fake"
+
+    def _respond(self, prompt: str) -> str:
+        observed = _OBSERVATION_RE.findall(prompt)
+        if observed:
+            return f"Final Answer: uid={observed[-1]}"
+        return "Action: whoami\nAction Input: {}"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        time.sleep(random.uniform(0, self.max_delay))
+        return self._respond(prompt)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        await asyncio.sleep(random.uniform(0, self.max_delay))
+        return self._respond(prompt)
+
+
+def _install():
+    probe = StructuredTool.from_function(
+        name="whoami",
+        description="Kampanyalar hakkında bilgi almak isteyen kullanıcının kimliğini döndürür (test aracı).",
+        func=whoami,
+        args_schema=UserId,
+    )
+    tool_registry[:] = [t for t in tool_registry if t.name != "whoami"] + [probe]
+    fake = WhoAmILLM()
+    agent_runner.llm = fake
+    agent_runner.policy_llm = fake
+    agent_runner.clear_agent_cache()
+    # Disk yazımı testin konusu değil
+    object.__setattr__(agent_runner.memory, "save", lambda *a, **k: None)
+
+
+def _retries() -> float:
+    return sum(value for _, value in agent_runner.AGENT_FALLBACK.samples())
+
+
+def _check(label: str, pairs, elapsed: float, retries: float):
+    leaks = [(uid, out) for uid, out in pairs if out.get("response") != f"uid={uid}"]
+    status = "OK" if not leaks else "SIZINTI"
+    print(f"{label:<10} istek={len(pairs):5d} | süre={elapsed:6.2f} s | hatalı={len(leaks):4d} | "
+          f"yeniden deneme={retries:4.0f} | {status}")
+    for uid, out in leaks[:5]:
+        print(f"    beklenen uid={uid}, gelen: {out}")
+    return not leaks
+
+
+def run_threads(n: int, threads: int) -> bool:
+    users = [USERS[i % len(USERS)] for i in range(n)]
+    start, retries = time.perf_counter(), _retries()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outs = list(pool.map(lambda uid: agent_runner.main(uid, MESSAGE), users))
+    return _check("thread", list(zip(users, outs)), time.perf_counter() - start, _retries() - retries)
+
+
+def run_async(n: int) -> bool:
+    users = [USERS[i % len(USERS)] for i in range(n)]
+
+    async def _all():
+        return await asyncio.gather(*(agent_runner.amain(uid, MESSAGE) for uid in users))
+
+    start, retries = time.perf_counter(), _retries()
+    outs = asyncio.run(_all())
+    return _check("asyncio", list(zip(users, outs)), time.perf_counter() - start, _retries() - retries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    _install()
+    ok = run_threads(args.requests, args.threads)
+    ok = run_async(args.requests) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
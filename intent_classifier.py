@@ -0,0 +1,272 @@
+"""
+scenarios.json üzerinden eğitilen hafif, CPU-only niyet sınıflandırıcı.
+
+Özellikler: kelime sınırlı karakter n-gramları (3-5) + kelime unigramları, TF-IDF ağırlıklı.
+Model: sınıf merkezleri (nearest centroid) ve kosinüs benzerliği; güven skoru softmax ile hesaplanır.
+Ağ erişimi veya ek bağımlılık gerektirmez, tahmin süresi milisaniyenin altındadır.
+
+Eğitim (modeli diske yazan tek yer burasıdır):
+    python intent_classifier.py --file scenarios.json --seeds intent_seeds.json --out intent_model.json
+"""
+import argparse
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MODEL_VERSION = 1
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Yollar çalışma dizinine değil modüle göredir
+DEFAULT_MODEL_PATH = os.environ.get("INTENT_MODEL_PATH", os.path.join(_HERE, "intent_model.json"))
+DEFAULT_SCENARIO_FILE = os.path.join(_HERE, "scenarios.json")
+DEFAULT_SEED_FILE = os.path.join(_HERE, "intent_seeds.json")
+
+_TAG_RE = re.compile(r"\[user_id:[^\]]*\]")
+_NON_WORD_RE = re.compile(r"[^0-9a-z]+")
+# Türkçe büyük/küçük harf ve aksan katlama: "Faturamı" / "faturami" aynı özelliklere düşsün
+_TR_FOLD = str.maketrans({
+    "I": "ı", "İ": "i",
+})
+_ASCII_FOLD = str.maketrans({
+    "ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u", "â": "a", "î": "i", "û": "u",
+})
+
+
+def normalize_text(text: str) -> str:
+    text = _TAG_RE.sub(" ", text or "")
+    text = text.translate(_TR_FOLD).lower().translate(_ASCII_FOLD)
+    return _NON_WORD_RE.sub(" ", text).strip()
+
+
+def extract_features(text: str, ngram_range: Tuple[int, int] = (3, 5)) -> Counter:
+    feats: Counter = Counter()
+    lo, hi = ngram_range
+    for word in normalize_text(text).split():
+        feats["w:" + word] += 1
+        padded = f" {word} "
+        for n in range(lo, hi + 1):
+            for i in range(len(padded) - n + 1):
+                feats[padded[i:i + n]] += 1
+    return feats
+
+
+def _l2_normalize(vec: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    if not norm:
+        return vec
+    return {k: v / norm for k, v in vec.items()}
+
+
+class IntentClassifier:
+    def __init__(self, labels: List[str], idf: Dict[str, float], centroids: List[Dict[str, float]],
+                 tool_scope: Optional[Dict[str, List[str]]] = None, temperature: float = 0.05,
+                 ngram_range: Tuple[int, int] = (3, 5)):
+        self.labels = labels
+        self.idf = idf
+        self.centroids = centroids
+        self.tool_scope = tool_scope or {}
+        self.temperature = temperature
+        self.ngram_range = tuple(ngram_range)
+        # Özellik -> [(sınıf indeksi, ağırlık)] ; tahminde yalnızca sorgudaki özellikler gezilir
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for idx, centroid in enumerate(centroids):
+            for feat, weight in centroid.items():
+                self._postings[feat].append((idx, weight))
+
+    # --- Eğitim ---------------------------------------------------------------
+    @classmethod
+    def train(cls, samples: Iterable[Tuple[str, str]], tool_scope: Optional[Dict[str, List[str]]] = None,
+              temperature: float = 0.05, ngram_range: Tuple[int, int] = (3, 5)) -> "IntentClassifier":
+        samples = [(text, label) for text, label in samples if text and label]
+        if not samples:
+            raise ValueError("Eğitim için örnek bulunamadı.")
+
+        docs = [(extract_features(text, ngram_range), label) for text, label in samples]
+        df: Counter = Counter()
+        for feats, _ in docs:
+            df.update(feats.keys())
+        n_docs = len(docs)
+        idf = {feat: math.log((n_docs + 1) / (count + 1)) + 1.0 for feat, count in df.items()}
+
+        sums: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for feats, label in docs:
+            vec = _l2_normalize({f: (1.0 + math.log(c)) * idf[f] for f, c in feats.items()})
+            for f, v in vec.items():
+                sums[label][f] += v
+
+        labels = sorted(sums)
+        centroids = [_l2_normalize(dict(sums[label])) for label in labels]
+        return cls(labels, idf, centroids, tool_scope=tool_scope, temperature=temperature, ngram_range=ngram_range)
+
+    # --- Tahmin ---------------------------------------------------------------
+    def _vectorize(self, text: str) -> Dict[str, float]:
+        feats = extract_features(text, self.ngram_range)
+        return _l2_normalize({f: (1.0 + math.log(c)) * self.idf[f] for f, c in feats.items() if f in self.idf})
+
+    def scores(self, text: str) -> List[Tuple[str, float]]:
+        sims = [0.0] * len(self.labels)
+        for feat, weight in self._vectorize(text).items():
+            for idx, cw in self._postings.get(feat, ()):
+                sims[idx] += weight * cw
+        return sorted(zip(self.labels, sims), key=lambda x: x[1], reverse=True)
+
+    def probabilities(self, text: str) -> List[Tuple[str, float]]:
+        """Softmax ile olasılığa çevrilmiş, azalan sıralı (intent, p) listesi; eşleşme yoksa boş."""
+        ranked = self.scores(text)
+        if not ranked or ranked[0][1] <= 0.0:
+            return []
+        top = ranked[0][1]
+        exps = [math.exp((sim - top) / self.temperature) for _, sim in ranked]
+        total = sum(exps)
+        return [(label, e / total) for (label, _), e in zip(ranked, exps)]
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        (intent, confidence) döner. Hiçbir özellik eşleşmezse ("", 0.0).
+        """
+        probs = self.probabilities(text)
+        return probs[0] if probs else ("", 0.0)
+
+    def tools_for(self, intent: str) -> List[str]:
+        return list(self.tool_scope.get(intent, []))
+
+    # --- Kalıcılık -------------------------------------------------------------
+    def to_dict(self) -> dict:
+        return {
+            "version": MODEL_VERSION,
+            "labels": self.labels,
+            "idf": self.idf,
+            "centroids": self.centroids,
+            "tool_scope": self.tool_scope,
+            "temperature": self.temperature,
+            "ngram_range": list(self.ngram_range),
+        }
+
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "IntentClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_VERSION:
+            raise ValueError(f"Desteklenmeyen model sürümü: {data.get('version')}")
+        return cls(
+            data["labels"], data["idf"], data["centroids"],
+            tool_scope=data.get("tool_scope"),
+            temperature=data.get("temperature", 0.05),
+            ngram_range=tuple(data.get("ngram_range", (3, 5))),
+        )
+
+
+def load_training_data(tool_to_intent: Dict[str, str], scenario_file: str = DEFAULT_SCENARIO_FILE,
+                       seed_file: Optional[str] = DEFAULT_SEED_FILE):
+    """
+    Senaryolardan (metin, intent) örnekleri ve intent -> araç kapsamı çıkarır.
+    Senaryonun etiketi, tool_chain_plan'daki son aracın intent_to_tool üzerindeki karşılığıdır.
+    """
+    samples: List[Tuple[str, str]] = []
+    tool_scope: Dict[str, List[str]] = defaultdict(list)
+
+    def _add_scope(intent: str, tool_names: Iterable[str]):
+        for name in tool_names:
+            if name not in tool_scope[intent]:
+                tool_scope[intent].append(name)
+
+    with open(scenario_file, "r", encoding="utf-8") as f:
+        scenarios = json.load(f)
+    for sc in scenarios:
+        chain = [step.get("tool") for step in sc.get("tool_chain_plan", []) if step.get("tool")]
+        intent = tool_to_intent.get(chain[-1]) if chain else None
+        if not intent:
+            continue
+        samples.append((sc.get("user_utterance", ""), intent))
+        _add_scope(intent, chain)
+
+    if seed_file and os.path.exists(seed_file):
+        with open(seed_file, "r", encoding="utf-8") as f:
+            seeds = json.load(f)
+        intent_to_tool_name = {intent: tool for tool, intent in tool_to_intent.items()}
+        for intent, utterances in seeds.items():
+            samples.extend((u, intent) for u in utterances)
+            if intent in intent_to_tool_name:
+                _add_scope(intent, [intent_to_tool_name[intent]])
+
+    return samples, dict(tool_scope)
+
+
+def load_or_train(tool_to_intent: Dict[str, str], model_path: str = DEFAULT_MODEL_PATH,
+                  scenario_file: str = DEFAULT_SCENARIO_FILE, seed_file: Optional[str] = DEFAULT_SEED_FILE) -> IntentClassifier:
+    """
+    model_path'teki modeli yükler; yoksa veya okunamazsa bellekte eğitir.
+    Diske yazmaz: kalıcı model yalnızca `python intent_classifier.py` ile üretilir.
+    """
+    if os.path.exists(model_path):
+        try:
+            return IntentClassifier.load(model_path)
+        except (ValueError, KeyError, json.JSONDecodeError) as e:
+            print(f"[WARN] Niyet modeli okunamadı ({e}); bellekte yeniden eğitiliyor.")
+    else:
+        print(f"[WARN] Niyet modeli yok ({model_path}); bellekte eğitiliyor. Kalıcı model: python intent_classifier.py")
+    samples, tool_scope = load_training_data(tool_to_intent, scenario_file, seed_file)
+    return IntentClassifier.train(samples, tool_scope=tool_scope)
+
+
+def _cross_validate(samples: List[Tuple[str, str]], tool_scope, folds: int = 5) -> List[Tuple[float, bool]]:
+    """Her örnek için, onu görmeden eğitilen modelin (güven, doğru mu) sonucunu döner."""
+    held_out = []
+    for k in range(folds):
+        train = [s for i, s in enumerate(samples) if i % folds != k]
+        test = [s for i, s in enumerate(samples) if i % folds == k]
+        model = IntentClassifier.train(train, tool_scope=tool_scope)
+        for text, label in test:
+            intent, confidence = model.predict(text)
+            held_out.append((confidence, intent == label))
+    return held_out
+
+
+def calibrate_threshold(held_out: List[Tuple[float, bool]], target_precision: float = 0.95,
+                        min_support: int = 5) -> Optional[float]:
+    """
+    Güveni eşiği aşan tahminlerin en az target_precision kadarının doğru olduğu en düşük eşik.
+    En az min_support tahmin kapsanmalı; böyle bir eşik yoksa None (tahminlere güvenilmez).
+    """
+    threshold, correct = None, 0
+    for n, (confidence, ok) in enumerate(sorted(held_out, key=lambda x: x[0], reverse=True), 1):
+        correct += ok
+        if n >= min_support and correct / n >= target_precision:
+            threshold = confidence
+    return threshold
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Niyet sınıflandırıcıyı eğitir.")
+    parser.add_argument("--file", default=DEFAULT_SCENARIO_FILE, help="Senaryo JSON dosyası")
+    parser.add_argument("--seeds", default=DEFAULT_SEED_FILE, help="Ek etiketli cümleler (intent -> liste)")
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH, help="Model çıktı dosyası")
+    parser.add_argument("--cv", type=int, default=5, help="Çapraz doğrulama katman sayısı (0: kapalı)")
+    parser.add_argument("--target-precision", type=float, default=0.95,
+                        help="Güven eşiği kalibrasyonu: eşiği aşan tahminlerde istenen doğruluk")
+    args = parser.parse_args()
+
+    from agent_runner import TOOL_TO_INTENT
+
+    samples, tool_scope = load_training_data(TOOL_TO_INTENT, args.file, args.seeds)
+    model = IntentClassifier.train(samples, tool_scope=tool_scope)
+    model.save(args.out)
+    print(f"📄 {len(samples)} örnek, {len(model.labels)} niyet -> {args.out}")
+    if args.cv:
+        held_out = _cross_validate(samples, tool_scope, args.cv)
+        print(f"Çapraz doğrulama doğruluğu ({args.cv} katman): {sum(ok for _, ok in held_out) / len(held_out):.3f}")
+        for threshold in (0.5, 0.8, 0.9, 0.95, 0.98, 0.99):
+            covered = [ok for confidence, ok in held_out if confidence >= threshold]
+            precision = f"{sum(covered) / len(covered):.3f}" if covered else "-"
+            print(f"  güven >= {threshold:<5} kapsama {len(covered):4d}/{len(held_out)}  doğruluk {precision}")
+        calibrated = calibrate_threshold(held_out, args.target_precision)
+        print(f"Doğruluk >= {args.target_precision} için eşik: "
+              f"{'yok' if calibrated is None else f'{calibrated:.4f}'} (agent_runner.INTENT_CONFIDENCE_THRESHOLD)")
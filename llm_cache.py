@@ -0,0 +1,141 @@
+"""
+Diskte kalıcı LLM tamamlama önbelleği (SQLite).
+
+İstemciler temperature=0.0 ile çalıştığı için aynı model + üretim parametreleri + prompt her zaman
+aynı çıktıyı verir. Anahtar bu üçlünün SHA-256 özetidir. Kayıtlar TTL süresince geçerlidir;
+kayıt sayısı max_entries'i aşarsa en uzun süredir kullanılmayanlar (LRU) silinir.
+
+Profil bazında açılıp kapatılır (llm_profiles.GENERATION_PROFILES[...]["cache"]); yazma işlemi
+yapan akışlarda completion_cache_disabled() bloğu içinde hiç kullanılmaz.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import Counter
+
+DEFAULT_CACHE_PATH = "llm_cache.db"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+LLM_CACHE = Counter(
+    "llm_cache_total",
+    "LLM tamamlama önbelleği sonuçları (hit, miss, expired, evicted, bypass)",
+    ("profile", "outcome"),
+)
+
+_CACHE_DISABLED: ContextVar[bool] = ContextVar("completion_cache_disabled", default=False)
+
+
+@contextmanager
+def completion_cache_disabled():
+    """Blok içindeki LLM çağrıları önbellekten okumaz ve önbelleğe yazmaz."""
+    token = _CACHE_DISABLED.set(True)
+    try:
+        yield
+    finally:
+        _CACHE_DISABLED.reset(token)
+
+
+def cache_disabled() -> bool:
+    return _CACHE_DISABLED.get()
+
+
+def cache_key(params: Dict[str, Any], prompt: str) -> str:
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CompletionCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, info TEXT,"
+            " created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions(last_used)")
+
+    def get(self, key: str, profile: str = "") -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(text, generation_info) ya da None döner."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, info, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                LLM_CACHE.inc(profile=profile, outcome="miss")
+                return None
+            text, info, created = row
+            if now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                LLM_CACHE.inc(profile=profile, outcome="expired")
+                return None
+            self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+        LLM_CACHE.inc(profile=profile, outcome="hit")
+        return text, json.loads(info) if info else {}
+
+    def put(self, key: str, text: str, info: Optional[Dict[str, Any]] = None, profile: str = ""):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, text, info, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, text, json.dumps(info or {}, default=str), now, now),
+            )
+            evicted = self._evict(now)
+        if evicted:
+            LLM_CACHE.inc(evicted, profile=profile, outcome="evicted")
+
+    def _evict(self, now: float) -> int:
+        expired = self._conn.execute(
+            "DELETE FROM completions WHERE created < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return expired
+        self._conn.execute(
+            "DELETE FROM completions WHERE key IN (SELECT key FROM completions ORDER BY last_used LIMIT ?)",
+            (overflow,),
+        )
+        return expired + overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CompletionCache()
+    return _cache
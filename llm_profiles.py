@@ -0,0 +1,280 @@
+"""
+Çağrı türüne göre Ollama üretim profilleri ve token muhasebesi.
+
+qwen3 varsayılan olarak yanıttan önce <think> bloğu üretir; bu metin _strip_think() ile zaten
+atıldığı için üretilmesi boşa harcanan süredir. Profiller:
+    supervisor  -> JSON karar (şemaya bağlı, bkz. agent_runner.SupervisorDecision); kısa, düşünmesiz
+    agent_step  -> ReAct adımı (Thought/Action/Action Input) ya da Final Answer; düşünmesiz,
+                   uydurulan Observation/Question satırlarından önce kesilir
+    summary     -> eski turların kısa özeti (bkz. summarizer.py); arka planda, düşünmesiz
+
+Düşünme kapatma qwen3'ün "/no_think" anahtarıyla yapılır (Ollama /api/generate'in top-level
+think parametresi langchain_community istemcisinden geçmiyor).
+
+Profilde "cache" açıksa tamamlamalar llm_cache.CompletionCache'e yazılır/okunur; anahtar model,
+üretim parametreleri ve (düşünme anahtarı eklenmiş) prompttan oluşur.
+
+Kazanılan token tahmini, benchmarks/bench_generation_profiles.py --write-baseline ile canlı modelde
+ölçülen "düşünmeli" temel değerlere (generation_baseline.json) göre hesaplanır; dosya yoksa
+yalnızca üretilen token sayıları loglanır.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from langchain_community.llms import Ollama
+from langchain_core.outputs import Generation, LLMResult
+
+from llm_cache import cache_disabled, cache_key, get_completion_cache
+from metrics import Counter, Histogram
+from tracing import set_attrs, span
+
+NO_THINK_SWITCH = "/no_think"
+BASELINE_PATH = "generation_baseline.json"
+
+GENERATION_PROFILES: Dict[str, Dict[str, Any]] = {
+    "supervisor": {
+        "no_think": True,
+        "num_predict": 96,
+        "stop": [],
+        # Aynı durum + mesaj kullanıcılar arasında sık tekrarlanıyor
+        "cache": True,
+    },
+    "agent_step": {
+        "no_think": True,
+        "num_predict": 384,
+        # Ajan zaten "\nObservation:" ile keser; model Final Answer'dan sonra yeni soru uydurmasın
+        "stop": ["\nObservation:", "\nQuestion:"],
+        "cache": True,
+    },
+    "summary": {
+        "no_think": True,
+        "num_predict": 256,
+        "stop": [],
+        # Özetlenen turlar konuşmaya özgü; önbellek isabet etmez
+        "cache": False,
+    },
+}
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Profil ve model bazında LLM token sayıları (prompt, generated, think, saved, cached)",
+    ("profile", "model", "kind"),
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Profil ve model bazında LLM çağrı süresi (önbellek isabetleri dahil)",
+    ("profile", "model"),
+)
+
+_THINK_RE = re.compile(r"<think>(.*?)(?:</think>|$)", re.DOTALL | re.IGNORECASE)
+
+
+def _load_baseline(path: str = BASELINE_PATH) -> Dict[str, float]:
+    """profil -> düşünmeli modda çağrı başına ortalama <think> token sayısı."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {name: float(v.get("think_tokens", 0.0)) for name, v in data.items()}
+    except (ValueError, AttributeError, OSError) as e:
+        print(f"[WARN] Üretim temel değerleri okunamadı ({e}).")
+        return {}
+
+
+THINK_BASELINE = _load_baseline()
+
+
+class TokenUsage:
+    """Bir isteğin (main/amain turu) tüm LLM çağrılarının toplamı."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.generated_tokens = 0
+        self.think_tokens = 0
+        self.saved_tokens = 0.0
+        self.truncated = 0
+        self._lock = threading.Lock()
+
+    def add(self, prompt_tokens: int, generated: int, think: int, saved: float, truncated: bool):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.generated_tokens += generated
+            self.think_tokens += think
+            self.saved_tokens += saved
+            self.truncated += int(truncated)
+
+    def as_attrs(self) -> Dict[str, Any]:
+        """İz (tracing) öznitelikleri."""
+        return {
+            "llm_calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "generated_tokens": self.generated_tokens,
+            "think_tokens": self.think_tokens,
+        }
+
+    def summary(self) -> str:
+        saved = f"{self.saved_tokens:.0f}" if THINK_BASELINE else "?"
+        return (f"çağrı={self.calls} prompt={self.prompt_tokens} üretilen={self.generated_tokens} "
+                f"think={self.think_tokens} kesilen={self.truncated} tasarruf≈{saved}")
+
+
+_TOKEN_USAGE: ContextVar[Optional[TokenUsage]] = ContextVar("token_usage", default=None)
+
+
+@contextmanager
+def track_token_usage():
+    usage = TokenUsage()
+    token = _TOKEN_USAGE.set(usage)
+    try:
+        yield usage
+    finally:
+        _TOKEN_USAGE.reset(token)
+
+
+def _think_share(text: str) -> float:
+    """Çıktıdaki <think> içeriğinin karakter oranı; eval_count'u bölüştürmek için kullanılır.
+    Düşünmesiz modda gelen boş "<think></think>" bloğu sayılmaz."""
+    if not text:
+        return 0.0
+    think_chars = sum(len(m.group(1).strip()) for m in _THINK_RE.finditer(text))
+    return think_chars / len(text)
+
+
+class ProfiledOllama(Ollama):
+    """
+    Profil ayarlarını (düşünmesiz mod, ek stop dizileri) her çağrıya uygulayan Ollama istemcisi.
+    num_predict profil tarafından make_llm() içinde ayarlanır.
+    """
+    profile: str = "agent_step"
+
+    @property
+    def _profile(self) -> Dict[str, Any]:
+        return GENERATION_PROFILES[self.profile]
+
+    def _prepare(self, prompts: List[str], stop: Optional[List[str]]):
+        if self._profile["no_think"]:
+            prompts = [f"{NO_THINK_SWITCH}\n{p}" for p in prompts]
+        merged = list(stop or [])
+        merged += [s for s in self._profile["stop"] if s not in merged]
+        return prompts, merged or None
+
+    def _record(self, result):
+        baseline = THINK_BASELINE.get(self.profile)
+        usage = _TOKEN_USAGE.get()
+        for gens in result.generations:
+            gen = gens[0]
+            info = gen.generation_info or {}
+            if info.get("cache_hit"):
+                LLM_TOKENS.inc(int(info.get("eval_count") or 0), profile=self.profile, model=self.model, kind="cached")
+                set_attrs(cache_hit=True)
+                continue
+            generated = int(info.get("eval_count") or 0)
+            prompt_tokens = int(info.get("prompt_eval_count") or 0)
+            think = round(generated * _think_share(gen.text))
+            saved = max(0.0, baseline - think) if baseline is not None else 0.0
+            truncated = info.get("done_reason") == "length"
+
+            LLM_TOKENS.inc(prompt_tokens, profile=self.profile, model=self.model, kind="prompt")
+            LLM_TOKENS.inc(generated, profile=self.profile, model=self.model, kind="generated")
+            LLM_TOKENS.inc(think, profile=self.profile, model=self.model, kind="think")
+            LLM_TOKENS.inc(saved, profile=self.profile, model=self.model, kind="saved")
+            if usage is not None:
+                usage.add(prompt_tokens, generated, think, saved, truncated)
+            set_attrs(prompt_tokens=prompt_tokens, generated_tokens=generated, think_tokens=think,
+                      truncated=truncated)
+
+    # --- Tamamlama önbelleği ---
+    def _use_cache(self, images) -> bool:
+        if images or not self._profile.get("cache") or cache_disabled():
+            return False
+        return True
+
+    def _cache_params(self, stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "profile": self.profile,
+            "temperature": self.temperature,
+            "num_predict": self.num_predict,
+            "stop": stop,
+            "format": kwargs.get("format", self.format),
+            "options": {k: v for k, v in kwargs.items() if k != "format"},
+        }
+
+    @staticmethod
+    def _cached_generation(hit) -> Generation:
+        text, info = hit
+        return Generation(text=text, generation_info={**info, "cache_hit": True})
+
+    def _generate(self, prompts, stop=None, images=None, run_manager=None, **kwargs):
+        with span(f"llm.{self.profile}", model=self.model), LLM_LATENCY.time(profile=self.profile, model=self.model):
+            return self._generate_profiled(prompts, stop, images, run_manager, **kwargs)
+
+    async def _agenerate(self, prompts, stop=None, images=None, run_manager=None, **kwargs):
+        with span(f"llm.{self.profile}", model=self.model), LLM_LATENCY.time(profile=self.profile, model=self.model):
+            return await self._agenerate_profiled(prompts, stop, images, run_manager, **kwargs)
+
+    def _generate_profiled(self, prompts, stop, images, run_manager, **kwargs):
+        prompts, stop = self._prepare(prompts, stop)
+        if not self._use_cache(images):
+            result = super()._generate(prompts, stop=stop, images=images, run_manager=run_manager, **kwargs)
+            self._record(result)
+            return result
+
+        cache = get_completion_cache()
+        params = self._cache_params(stop, kwargs)
+        generations = []
+        for prompt in prompts:
+            key = cache_key(params, prompt)
+            hit = cache.get(key, self.profile)
+            if hit is not None:
+                gen = self._cached_generation(hit)
+                if run_manager:
+                    run_manager.on_llm_new_token(gen.text, verbose=self.verbose)
+            else:
+                gen = super()._generate([prompt], stop=stop, run_manager=run_manager, **kwargs).generations[0][0]
+                cache.put(key, gen.text, gen.generation_info, self.profile)
+            generations.append([gen])
+        result = LLMResult(generations=generations)
+        self._record(result)
+        return result
+
+    async def _agenerate_profiled(self, prompts, stop, images, run_manager, **kwargs):
+        prompts, stop = self._prepare(prompts, stop)
+        if not self._use_cache(images):
+            result = await super()._agenerate(prompts, stop=stop, images=images, run_manager=run_manager, **kwargs)
+            self._record(result)
+            return result
+
+        cache = get_completion_cache()
+        params = self._cache_params(stop, kwargs)
+        generations = []
+        for prompt in prompts:
+            key = cache_key(params, prompt)
+            hit = await asyncio.to_thread(cache.get, key, self.profile)
+            if hit is not None:
+                gen = self._cached_generation(hit)
+                if run_manager:
+                    await run_manager.on_llm_new_token(gen.text, verbose=self.verbose)
+            else:
+                result = await super()._agenerate([prompt], stop=stop, run_manager=run_manager, **kwargs)
+                gen = result.generations[0][0]
+                await asyncio.to_thread(cache.put, key, gen.text, gen.generation_info, self.profile)
+            generations.append([gen])
+        result = LLMResult(generations=generations)
+        self._record(result)
+        return result
+
+
+def make_llm(profile: str, **ollama_kwargs) -> ProfiledOllama:
+    """Profilin num_predict sınırıyla bir ProfiledOllama oluşturur."""
+    settings = GENERATION_PROFILES[profile]
+    return ProfiledOllama(profile=profile, num_predict=settings["num_predict"], **ollama_kwargs)
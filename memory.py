@@ -1,23 +1,335 @@
+import bisect
+import functools
+import itertools
 import json
 import os
-from collections import defaultdict, deque
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
 from langchain_core.memory import BaseMemory
-from pydantic import Field
-
-
+from pydantic import Field, PrivateAttr
+
+from memory_store import (
+    DEFAULT_FLUSH_INTERVAL,
+    DEFAULT_FLUSH_THRESHOLD,
+    DURABILITY_MODES,
+    MemoryStore,
+    MultiprocessMemoryStore,
+    VersionConflict,
+    WriteBehindBuffer,
+    get_store,
+)
+from metrics import Counter, Gauge, Histogram
+
+# .json -> snapshot + günlük, .db/.sqlite -> SQLite (bkz. memory_store.get_store)
+DEFAULT_MEMORY_PATH = os.environ.get("AGENT_MEMORY_PATH", "agent_memory.json")
+# Birden çok süreç (uvicorn --workers N) aynı SQLite deposunu paylaşır: depo yetkili kopyadır, her erişimde
+# kullanıcının sürümü kontrol edilir ve yazımlar iyimser sürümlemeyle yapılır (yalnız sync ile)
+DEFAULT_SHARED = os.environ.get("AGENT_MEMORY_SHARED", "0").lower() in ("1", "true", "yes")
+# sync / batched / async (bkz. memory_store.DURABILITY_MODES)
+DEFAULT_DURABILITY = os.environ.get("AGENT_MEMORY_DURABILITY", "sync" if DEFAULT_SHARED else "batched")
+# Bellekte tutulan en fazla oturum (LRU) ve boşta kalan oturumun atılma süresi (TTL, saniye)
+DEFAULT_MAX_SESSIONS = int(os.environ.get("AGENT_MEMORY_MAX_SESSIONS", "10000"))
+DEFAULT_SESSION_TTL = float(os.environ.get("AGENT_MEMORY_SESSION_TTL", "1800"))
+DEFAULT_MAX_TOOL_OUTPUTS = 10
+# load_memory_variables'ın prompta koyduğu geçmiş ve ajan durumu için token bütçeleri (0 = sınırsız)
+DEFAULT_HISTORY_TOKEN_BUDGET = int(os.environ.get("AGENT_MEMORY_HISTORY_TOKENS", "1500"))
+DEFAULT_STATE_TOKEN_BUDGET = int(os.environ.get("AGENT_MEMORY_STATE_TOKENS", "600"))
+# Özetlenmemiş geçmiş bu kadar tokenı aşınca tur sonunda arka plan özeti istenir (bkz. summarizer.py);
+# en yeni DEFAULT_SUMMARY_KEEP_RECENT etkileşim özete katılmaz, prompta olduğu gibi girer
+DEFAULT_SUMMARY_TRIGGER_TOKENS = int(os.environ.get("AGENT_MEMORY_SUMMARY_TOKENS", "400"))
+DEFAULT_SUMMARY_KEEP_RECENT = 6
+# Süreçte modelin tokenizer'ı yok (Ollama); Türkçe metinde token başına ~3 karakter temkinli bir tahmindir
+CHARS_PER_TOKEN = 3
+# Paylaşımlı modda sürüm çakışmasında işlemin güncel durumla yeniden denenme sayısı
+MAX_CONFLICT_RETRIES = 10
+
+MEMORY_RESIDENT_SESSIONS = Gauge("memory_resident_sessions", "Bellekte tutulan kullanıcı oturumu sayısı")
+MEMORY_RESIDENT_BYTES = Gauge(
+    "memory_resident_bytes",
+    "Bellekteki oturumların yaklaşık boyutu (sys.getsizeof ile iç içe toplam)",
+)
+MEMORY_SESSION_EVICTIONS = Counter(
+    "memory_session_evictions_total", "Bellekten depoya bırakılan oturumlar", ("reason",)
+)
+MEMORY_SESSION_LOADS = Counter("memory_session_loads_total", "Depodan yeniden yüklenen oturumlar")
+MEMORY_SESSION_REFRESHES = Counter(
+    "memory_session_refreshes_total", "Başka süreç değiştirdiği için depodan yenilenen oturumlar (paylaşımlı mod)"
+)
+MEMORY_PROMPT_TOKENS = Histogram(
+    "memory_prompt_tokens",
+    "load_memory_variables'ın prompta koyduğu tahmini token sayısı (bütçeye göre kırpılmış)",
+    ("part",),
+    buckets=(50, 100, 250, 500, 1000, 1500, 2500, 5000, 10000),
+)
+MEMORY_VERSION_CONFLICTS = Counter(
+    "memory_version_conflicts_total", "Yazımda sürüm çakışması nedeniyle yeniden denenen işlemler (paylaşımlı mod)"
+)
+
+
+def _deep_size(obj) -> int:
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, deque)):
+        size += sum(_deep_size(item) for item in obj)
+    return size
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _entry_seqs(history) -> List[int]:
+    """
+    Penceredeki etkileşimlerin kullanıcı başına artan sıra numaraları (entry["seq"]). Numarasız eski
+    kayıtlar yalnız pencerenin başında olabilir; ilk numaralı kayıttan geriye doğru numaralanır, böylece
+    pencere kaysa da yeniden yüklense de aynı numarayı alırlar.
+    """
+    seqs = [entry.get("seq") for entry in history]
+    known = next((i for i, seq in enumerate(seqs) if seq is not None), None)
+    first = 0 if known is None else seqs[known] - known
+    return [first + i if seq is None else seq for i, seq in enumerate(seqs)]
+
+
+def _next_seq(history) -> int:
+    if not history:
+        return 0
+    last = history[-1].get("seq")
+    return (last if last is not None else _entry_seqs(history)[-1]) + 1
+
+
+def _render_line(entry: Dict[str, Any]) -> tuple:
+    """Geçmiş satırı ve tahmini token sayısı; oturumda önbelleklenir (bkz. _Session.rendered)."""
+    line = f"{entry['role'].capitalize()}: {entry['message']}"
+    return line, estimate_tokens(line) + 1  # +1: satır sonu
+
+
+def _fit_lines(lines, max_tokens: Optional[int]) -> str:
+    """En yeni satırlardan başlayarak bütçeye sığanları kronolojik sırayla birleştirir."""
+    if not max_tokens:
+        return "\n".join(line for line, _ in lines)
+    picked, used = [], 0
+    for line, tokens in reversed(lines):
+        if used + tokens > max_tokens:
+            if not picked:
+                # En yeni satır tek başına sığmıyorsa kesilmiş hali verilir
+                picked.append(line[:max_tokens * CHARS_PER_TOKEN - 1] + "…")
+            break
+        picked.append(line)
+        used += tokens
+    return "\n".join(reversed(picked))
+
+
+# Ajan durumu bütçeye bu öncelik sırasıyla doldurulur; listelerde en yeni öğeler önce alınır
+_STATE_PRIORITY = (
+    "current_intent", "current_focus", "pending_intent", "pending_tool_chain",
+    "last_action", "suspended_intents", "tool_outputs", "completed_intents",
+)
+
+
+def _dump_state(state: Dict[str, Any]) -> str:
+    return json.dumps(state, ensure_ascii=False, indent=2, default=str)
+
+
+def _fit_state(state: Dict[str, Any], max_tokens: Optional[int]) -> str:
+    """
+    Ajan durumunu max_tokens'a sığdırır. Alanlar önem sırasıyla, liste öğeleri en yeniden eskiye doğru
+    eklenir ve bütçe dolunca durulur; maliyet durumun toplam boyutuna değil bütçeye bağlıdır. Boyutlar
+    indent=2 çıktısındaki karşılıklarıyla (girinti dahil) hesaplanır, sonuç tek seferde serileştirilir.
+    """
+    if not max_tokens:
+        return _dump_state(state)
+    room = max_tokens * CHARS_PER_TOKEN - 4  # "{\n" ve "\n}"
+    packed = {}
+    for key in sorted(state, key=lambda k: _STATE_PRIORITY.index(k) if k in _STATE_PRIORITY else len(_STATE_PRIORITY)):
+        value = state[key]
+        # Üst düzey alan satırı: '  "anahtar": <değer>,\n' (değerin sonraki satırları 2 boşluk girintili)
+        text = json.dumps([] if isinstance(value, list) else value, ensure_ascii=False, indent=2, default=str)
+        cost = len(key) + 8 + len(text) + 2 * text.count("\n")
+        if cost > room:
+            continue
+        room -= cost
+        if isinstance(value, list):
+            kept = []
+            for item in reversed(value):
+                # Liste öğesi 4 boşluk girintili, ardından ",\n"; ilk öğe "[]" yerine "[\n ... \n  ]" getirir
+                text = json.dumps(item, ensure_ascii=False, indent=2, default=str)
+                cost = len(text) + 4 * (text.count("\n") + 1) + 2 + (0 if kept else 4)
+                if cost > room:
+                    break
+                room -= cost
+                kept.append(item)
+            value = kept[::-1]
+        packed[key] = value
+    return _dump_state({key: packed[key] for key in state if key in packed})
+
+
+def _optimistic(method):
+    """
+    Paylaşımlı modda yazım, okunan sürümden sonra başka bir süreç kullanıcıyı değiştirdiyse VersionConflict
+    ile reddedilir; işlem güncel durumla baştan çalıştırılır. Her metot kullanıcıya en fazla bir yazım
+    yapar, bu yüzden yeniden çalıştırmak güvenlidir.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        for attempt in range(MAX_CONFLICT_RETRIES):
+            try:
+                return method(self, *args, **kwargs)
+            except VersionConflict:
+                MEMORY_VERSION_CONFLICTS.inc()
+                if attempt == MAX_CONFLICT_RETRIES - 1:
+                    raise
+    return wrapper
+
+
+class _HistoryIndex:
+    """
+    Etkileşim penceresi üzerinde ikincil indeksler: araç adı (metadata.tool) ve etkileşim türü ->
+    etkileşimler, küçük harfli sözcük -> etkileşimlerin mutlak konumları (history[i]'nin konumu base + i).
+    Hepsi pencere sırasıyla tutulur; pencere dolunca düşen en eski etkileşim listelerin başından çıkarılır.
+    """
+
+    __slots__ = ("base", "by_tool", "by_type", "tokens", "matches")
+
+    # Anahtar kelime -> onu içeren sözcükler önbelleğinde tutulan en fazla anahtar kelime
+    MAX_KEYWORDS = 64
+
+    def __init__(self, history: deque):
+        self.base = 0
+        self.by_tool: Dict[str, deque] = {}
+        self.by_type: Dict[Any, deque] = {}
+        self.tokens: Dict[str, deque] = {}
+        # Anahtar kelime -> onu alt dizgi olarak içeren sözcükler; yeni sözcük eklendikçe güncellenir
+        self.matches: Dict[str, set] = {}
+        for pos, entry in enumerate(history):
+            self._add(pos, entry)
+
+    @staticmethod
+    def _keys(entry: Dict[str, Any]):
+        return (entry.get("metadata", {}).get("tool"), entry.get("type"),
+                set(entry["message"].lower().split()))
+
+    def _add(self, pos: int, entry: Dict[str, Any]):
+        tool, kind, words = self._keys(entry)
+        if tool is not None:
+            self.by_tool.setdefault(tool, deque()).append(entry)
+        self.by_type.setdefault(kind, deque()).append(entry)
+        for word in words:
+            positions = self.tokens.get(word)
+            if positions is None:
+                positions = self.tokens[word] = deque()
+                for keyword, words_with in self.matches.items():
+                    if keyword in word:
+                        words_with.add(word)
+            positions.append(pos)
+
+    def _remove_oldest(self, entry: Dict[str, Any]):
+        tool, kind, words = self._keys(entry)
+        for index, keys in ((self.by_tool, () if tool is None else (tool,)), (self.by_type, (kind,)),
+                            (self.tokens, words)):
+            for key in keys:
+                items = index[key]
+                items.popleft()
+                if not items:
+                    del index[key]
+                    if index is self.tokens:
+                        for words_with in self.matches.values():
+                            words_with.discard(key)
+        self.base += 1
+
+    def append(self, history: deque, entry: Dict[str, Any]):
+        """history.append(entry)'den hemen önce çağrılır."""
+        pos = self.base + len(history)
+        if len(history) == history.maxlen:
+            self._remove_oldest(history[0])
+        self._add(pos, entry)
+
+    def keyword_positions(self, history: deque, keyword: str) -> set:
+        """Mesajında keyword'ü (büyük/küçük harf duyarsız, alt dizgi) geçiren etkileşimlerin konumları."""
+        keyword = keyword.lower()
+        if keyword.split() != [keyword]:
+            # Boşluk içeren anahtar kelime sözcük sınırını aşabilir: pencere taranır
+            return {pos for pos, entry in enumerate(history, self.base) if keyword in entry["message"].lower()}
+        words_with = self.matches.get(keyword)
+        if words_with is None:
+            if len(self.matches) >= self.MAX_KEYWORDS:
+                self.matches.clear()
+            words_with = self.matches[keyword] = {word for word in self.tokens if keyword in word}
+        positions = set()
+        for word in words_with:
+            positions.update(self.tokens[word])
+        return positions
+
+
+class _Session:
+    """Bellekteki bir kullanıcı: etkileşim penceresi, context ve yalnız bu kullanıcıya ait kilit."""
+
+    __slots__ = ("history", "context", "lock", "last_access", "holders", "evicted", "version", "rendered", "state_text",
+                 "index")
+
+    def __init__(self, history: deque, context: dict, version: Optional[int] = None):
+        self.history = history
+        self.context = context
+        # Paylaşımlı modda depodaki sürüm; None ise bir sonraki erişimde yenilenir
+        self.version = version
+        # Biçimlendirilmiş geçmiş satırları (history ile paralel) ve (bütçe, ajan durumu metni) önbelleği;
+        # None ise ilk kullanımda üretilir. add_interaction satırı ekler, context yazımı durumu geçersiz kılar.
+        self.rendered: Optional[deque] = None
+        self.state_text: Optional[tuple] = None
+        # Araç / tür / sözcük indeksleri (bkz. _HistoryIndex); rendered gibi ilk sorguda kurulur
+        self.index: Optional[_HistoryIndex] = None
+        # Yeniden girişli: ör. suspend_current_intent içinden get_recent_interactions
+        self.lock = threading.RLock()
+        self.last_access = time.monotonic()
+        # Kilidi tutan with-blok sayısı; tahliye kullanımdaki oturumu atlar
+        self.holders = 0
+        self.evicted = False
 
 
 class AgentMemory(BaseMemory):
     max_turns: int = Field(default=20)
-    save_path: str = Field(default="agent_memory.json")
-    interactions: Dict[str, deque] = Field(default_factory=lambda: defaultdict(lambda: deque(maxlen=20)))
-    context: Dict[str, dict] = Field(default_factory=lambda: defaultdict(dict))
+    save_path: str = Field(default=DEFAULT_MEMORY_PATH)
+    durability: str = Field(default=DEFAULT_DURABILITY)
+    flush_interval: float = Field(default=DEFAULT_FLUSH_INTERVAL)
+    flush_threshold: int = Field(default=DEFAULT_FLUSH_THRESHOLD)
+    max_sessions: int = Field(default=DEFAULT_MAX_SESSIONS)
+    session_ttl: float = Field(default=DEFAULT_SESSION_TTL)
+    max_tool_outputs: int = Field(default=DEFAULT_MAX_TOOL_OUTPUTS)
+    shared: bool = Field(default=DEFAULT_SHARED)
+    history_token_budget: int = Field(default=DEFAULT_HISTORY_TOKEN_BUDGET)
+    state_token_budget: int = Field(default=DEFAULT_STATE_TOKEN_BUDGET)
+    summary_trigger_tokens: int = Field(default=DEFAULT_SUMMARY_TRIGGER_TOKENS)
+    summary_keep_recent: int = Field(default=DEFAULT_SUMMARY_KEEP_RECENT)
+    # Kalıcılık arka ucu save_path uzantısına göre seçilir (bkz. memory_store)
+    _store: MemoryStore = PrivateAttr()
+    _buffer: Optional[WriteBehindBuffer] = PrivateAttr(default=None)
+    # summarizer.BackgroundSummarizer; bağlıysa end_turn uzun geçmişleri özet kuyruğuna ekler
+    _summarizer: Any = PrivateAttr(default=None)
+    # Yalnız bellekteki (yakın zamanda erişilen) oturumlar; sıra LRU sırasıdır (baştaki en eski).
+    # _sessions_lock yalnız bu sözlüğe erişimi korur; kullanıcı verisi oturumun kendi kilidiyle korunur.
+    _sessions: "OrderedDict[str, _Session]" = PrivateAttr(default_factory=OrderedDict)
+    _sessions_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
 
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"durability {DURABILITY_MODES} içinden olmalı, gelen: {self.durability!r}")
+        self._store = get_store(self.save_path, self.max_turns)
+        if self.shared:
+            if not isinstance(self._store, MultiprocessMemoryStore):
+                raise ValueError(f"Paylaşımlı bellek çok süreçli bir depo gerektirir (*.db), gelen: {self.save_path!r}")
+            if self.durability != "sync":
+                raise ValueError("Paylaşımlı bellekte yazımlar ertelenemez; durability='sync' olmalı")
+        if self.durability != "sync":
+            self._buffer = WriteBehindBuffer(self._store, self.flush_interval, self.flush_threshold)
         self.load()
+        _memories[id(self)] = self
 
 
     # Zorunlu property
@@ -27,9 +339,12 @@ class AgentMemory(BaseMemory):
         return ["chat_history", "agent_state"]
 
     def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Ajan promptundaki {chat_history} ve {agent_state} (bkz. agent_runner.AGENT_SUFFIX); token bütçeleriyle kırpılır."""
         user_id = inputs.get("user_id", "default")
-        history_str = self.get_recent_interactions(user_id, n=self.max_turns)
-        agent_state = self.format_agent_state(user_id)
+        history_str = self.format_history(user_id, max_tokens=self.history_token_budget)
+        agent_state = self.format_agent_state(user_id, max_tokens=self.state_token_budget)
+        MEMORY_PROMPT_TOKENS.observe(estimate_tokens(history_str), part="history")
+        MEMORY_PROMPT_TOKENS.observe(estimate_tokens(agent_state), part="agent_state")
         return {"chat_history": history_str, "agent_state": agent_state}
 
     
@@ -66,17 +381,165 @@ class AgentMemory(BaseMemory):
             else:
                 self.add_interaction(user_id, role="ai", message=ai_message)
 
-        # Durumu dosyaya yaz
-        self.save()
+        # add_interaction / add_tool_output değişiklikleri zaten günlüğe yazdı
 
 
     def clear(self) -> None:
-        self.interactions.clear()
-        self.context.clear()
-        self.save()
+        self._drop_sessions()
+        if self._buffer is not None:
+            self._buffer.discard()
+        self._store.clear()
+    # ------------------------
+    # Oturumlar: bellekte tutma, kilitleme, tahliye ve yeniden yükleme
+    # ------------------------
+    def _session(self, user_id: str, create: bool = True) -> Optional[_Session]:
+        """
+        Kullanıcının bellekteki oturumu. Bellekte yoksa depodan yüklenir; depoda da yoksa create=True ise
+        boş oturum açılır, create=False ise None döner (okumalar kayıt oluşturmaz). Disk okuması
+        _sessions_lock dışında yapılır; başka kullanıcıların erişimini bekletmez.
+        """
+        now = time.monotonic()
+        with self._sessions_lock:
+            session = self._sessions.get(user_id)
+            if session is not None:
+                session.last_access = now
+                self._sessions.move_to_end(user_id)
+                return session
+        # Tahliye edilmiş ama henüz yazılmamış değişiklikler varsa önce onlar depoya gitsin
+        if self._buffer is not None:
+            self._buffer.flush([user_id])
+        version = None
+        if self.shared:
+            version, loaded = self._store.load_user_versioned(user_id)
+        else:
+            loaded = self._store.load_user(user_id)
+        if loaded is None and not create:
+            return None
+        if loaded is not None:
+            MEMORY_SESSION_LOADS.inc()
+        with self._sessions_lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                history, ctx = loaded or (deque(maxlen=self.max_turns), {})
+                if "tool_outputs" in ctx:
+                    del ctx["tool_outputs"][:-self.max_tool_outputs]
+                session = self._sessions[user_id] = _Session(history, ctx, version)
+            session.last_access = now
+            self._sessions.move_to_end(user_id)
+            evicted = self._pop_idle_sessions(now)
+        self._persist_evicted(evicted)
+        return session
+
+    @contextmanager
+    def _user(self, user_id: str, create: bool = True):
+        """
+        Kullanıcının oturumunu kendi kilidi altında verir (create=False ve kullanıcı yoksa None).
+        Farklı kullanıcılar birbirini beklemez. Kilit tutulurken başka bir kullanıcıya erişilmez:
+        yazım tamponu anlık görüntü alırken kullanıcı kilidini bekler.
+        """
+        while True:
+            session = self._session(user_id, create)
+            if session is None:
+                yield None
+                return
+            with session.lock:
+                if session.evicted:
+                    # Kilidi beklerken tahliye edildi; depodan yeniden yüklenir
+                    continue
+                if self.shared and not session.holders:
+                    # Yalnız en dıştaki blokta: iç içe çağrı, dıştaki işlemin okuduğu durumu değiştirmesin
+                    self._refresh(user_id, session)
+                session.holders += 1
+                try:
+                    yield session
+                finally:
+                    session.holders -= 1
+                return
+
+    def _refresh(self, user_id: str, session: _Session):
+        """(Kullanıcı kilidi altında) başka bir süreç kullanıcıyı değiştirdiyse oturumu depodan yeniler."""
+        if self._store.user_version(user_id) == session.version:
+            return
+        version, loaded = self._store.load_user_versioned(user_id)
+        history, ctx = loaded or (deque(maxlen=self.max_turns), {})
+        if "tool_outputs" in ctx:
+            del ctx["tool_outputs"][:-self.max_tool_outputs]
+        session.history, session.context, session.version = history, ctx, version
+        session.rendered = session.state_text = session.index = None
+        MEMORY_SESSION_REFRESHES.inc()
+
+    def _commit(self, user_id: str, session: _Session, entries: List[Dict[str, Any]], context=None):
+        """(Paylaşımlı mod, kullanıcı kilidi altında) oturumun okunduğu sürüme koşullu yazım."""
+        try:
+            session.version = self._store.commit_user(user_id, entries, context, session.version or 0)
+        except VersionConflict:
+            # Bellekteki kopya eskidi (ve yarım değişiklik içeriyor); sonraki erişim depodan yeniler
+            session.version = None
+            raise
+
+    def _pop_idle_sessions(self, now: float) -> List[str]:
+        """(_sessions_lock altında) TTL'i dolan ve max_sessions üstündeki en eski oturumları bellekten çıkarır."""
+        candidates = []
+        excess = len(self._sessions) - self.max_sessions
+        for user_id, session in self._sessions.items():
+            if now - session.last_access > self.session_ttl:
+                reason = "ttl"
+            elif excess > 0:
+                reason = "lru"
+            else:
+                break
+            # Kullanımdaki oturum atlanır (kilidi başkasında ya da bu thread'in with-bloğunda)
+            if not session.lock.acquire(blocking=False):
+                continue
+            if session.holders:
+                session.lock.release()
+                continue
+            candidates.append((user_id, session, reason))
+            excess -= 1
+        for user_id, session, reason in candidates:
+            session.evicted = True
+            del self._sessions[user_id]
+            session.lock.release()
+            MEMORY_SESSION_EVICTIONS.inc(reason=reason)
+        return [user_id for user_id, _, _ in candidates]
+
+    def _persist_evicted(self, user_ids: List[str]):
+        """Tahliye edilen oturumların bekleyen yazımları; depo yetkili kopya olur."""
+        if user_ids and self._buffer is not None:
+            self._buffer.flush(user_ids)
+
+    def _drop_sessions(self):
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.evicted = True
+            self._sessions.clear()
+
+    def evict_idle_sessions(self) -> int:
+        """TTL'i dolan oturumları bellekten atar; atılan oturum sayısını döner."""
+        with self._sessions_lock:
+            evicted = self._pop_idle_sessions(time.monotonic())
+        self._persist_evicted(evicted)
+        return len(evicted)
+
+    def resident_sessions(self) -> int:
+        return len(self._sessions)
+
+    def resident_bytes(self) -> int:
+        with self._sessions_lock:
+            sessions = list(self._sessions.values())
+        total = 0
+        for session in sessions:
+            with session.lock:
+                total += _deep_size(session.history) + _deep_size(session.context) + _deep_size(session.rendered)
+                if session.index is not None:
+                    # by_tool / by_type history'deki kayıtları paylaşır; yalnız sözcük indeksi ek yer tutar
+                    total += _deep_size(session.index.tokens)
+        return total
+
     # ------------------------
     # Senin mevcut metodların (hiçbirini silmedim)
     # ------------------------
+    @_optimistic
     def add_interaction(self, user_id: str, role: str, message: str, type="message", metadata=None):
         entry = {
             "role": role,
@@ -85,238 +548,405 @@ class AgentMemory(BaseMemory):
         }
         if metadata:
             entry["metadata"] = metadata
-        self.interactions[user_id].append(entry)
-        self.save()
+        with self._user(user_id) as s:
+            # Kullanıcı başına artan sıra numarası; özetin nereye kadar kapsadığını gösterir
+            entry["seq"] = _next_seq(s.history)
+            if s.index is not None:
+                s.index.append(s.history, entry)
+            s.history.append(entry)
+            if s.rendered is not None:
+                s.rendered.append(_render_line(entry))
+            # Kilit içinde: günlükteki sıra penceredeki sırayla aynı kalır
+            if self.shared:
+                self._commit(user_id, s, [entry])
+            elif self._buffer is not None:
+                self._buffer.add_interaction(user_id, entry)
+            else:
+                self._store.append_interaction(user_id, entry)
+
+    def get_recent_interactions(self, user_id: str, n=5, max_tokens: Optional[int] = None):
+        """Son n etkileşim "Rol: mesaj" satırları olarak; max_tokens verilirse en yenilerden bütçeye sığanlar."""
+        with self._user(user_id, create=False) as s:
+            if s is None:
+                return ""
+            lines = list(self._rendered(s))[-n:]
+        return _fit_lines(lines, max_tokens)
+
+    def _rendered(self, session: _Session) -> deque:
+        if session.rendered is None:
+            session.rendered = deque((_render_line(e) for e in session.history), maxlen=self.max_turns)
+        return session.rendered
+
+    def _index(self, session: _Session) -> _HistoryIndex:
+        if session.index is None:
+            session.index = _HistoryIndex(session.history)
+        return session.index
 
-    def get_recent_interactions(self, user_id: str, n=5):
-        recent = list(self.interactions[user_id])[-n:]
-        return "\n".join([f"{item['role'].capitalize()}: {item['message']}" for item in recent])
+    # ------------------------
+    # Konuşma özeti: eski turlar arka planda özetlenir (bkz. summarizer.py)
+    # ------------------------
+    def attach_summarizer(self, summarizer):
+        self._summarizer = summarizer
+
+    def _uncovered_start(self, session: _Session) -> int:
+        """
+        (Kullanıcı kilidi altında) penceredeki ilk özetlenmemiş etkileşimin indeksi: özet, sıra numarası
+        summary["seq"]'e kadar olan etkileşimleri kapsar. Numarasız (eski biçim) özet hiçbirini kapsamaz.
+        """
+        summary = session.context.get("conversation_summary")
+        covered = summary.get("seq") if isinstance(summary, dict) else None
+        if covered is None:
+            return 0
+        return bisect.bisect_right(_entry_seqs(session.history), covered)
+
+    def format_history(self, user_id: str, max_tokens: Optional[int] = None) -> str:
+        """
+        Prompt geçmişi: özet varsa "Özet: ..." satırı ve özetten sonraki etkileşimler, yoksa penceredeki
+        etkileşimler; max_tokens verilirse en yenilerden bütçeye sığanlar.
+        """
+        with self._user(user_id, create=False) as s:
+            if s is None:
+                return ""
+            lines = list(self._rendered(s))
+            summary = s.context.get("conversation_summary")
+            text = summary.get("text") if isinstance(summary, dict) else None
+            if text:
+                lines = lines[self._uncovered_start(s):]
+        if not text:
+            return _fit_lines(lines, max_tokens)
+        header = f"Özet: {text}"
+        if max_tokens:
+            max_tokens = max(1, max_tokens - estimate_tokens(header) - 1)
+        body = _fit_lines(lines, max_tokens)
+        return f"{header}\n{body}" if body else header
+
+    def needs_summary(self, user_id: str) -> bool:
+        """Özetlenmemiş geçmiş summary_trigger_tokens'ı aştı ve katlanacak eski etkileşim var mı?"""
+        with self._user(user_id, create=False) as s:
+            if s is None:
+                return False
+            rest = list(self._rendered(s))[self._uncovered_start(s):]
+            return len(rest) > self.summary_keep_recent and sum(t for _, t in rest) > self.summary_trigger_tokens
+
+    def summarize_user(self, user_id: str, summarize) -> bool:
+        """
+        (Arka plan thread'i) en yeni summary_keep_recent hariç özetlenmemiş etkileşimleri önceki özetle
+        birlikte summarize(önceki, etkileşimler) ile katlar. LLM çağrısı kullanıcı kilidi dışında yapılır;
+        bu arada yeni turlar eklenebilir, özet yalnız katlanan etkileşimleri kapsar.
+        """
+        with self._user(user_id, create=False) as s:
+            if s is None:
+                return False
+            start = self._uncovered_start(s)
+            history = list(s.history)
+            fold_end = len(history) - self.summary_keep_recent
+            if fold_end <= start:
+                return False
+            fold = history[start:fold_end]
+            covered = _entry_seqs(history)[fold_end - 1]
+            previous = s.context.get("conversation_summary") or {}
+        text = summarize(previous.get("text", ""), fold)
+        if not text:
+            return False
+        return self._apply_summary(user_id, text, covered, previous.get("seq"))
+
+    @_optimistic
+    def _apply_summary(self, user_id: str, text: str, covered: int, previous_covered: Optional[int]) -> bool:
+        with self._user(user_id, create=False) as s:
+            current = (s.context.get("conversation_summary") or {}) if s else None
+            # Özet üretilirken başka bir özet yazıldıysa (ya da context temizlendiyse) bu sonuç eskidir
+            if current is None or current.get("seq") != previous_covered:
+                return False
+            s.context["conversation_summary"] = {"text": text, "seq": covered}
+            self._save_user(user_id, s)
+            return True
 
     def get_interactions_by_tool(self, user_id: str, tool_name: str) -> List[Dict[str, Any]]:
-        return [entry for entry in self.interactions[user_id] if entry.get("metadata", {}).get("tool") == tool_name]
+        with self._user(user_id, create=False) as s:
+            if s is None:
+                return []
+            return list(self._index(s).by_tool.get(tool_name, ()))
 
     def has_used_tool(self, user_id: str, tool_name: str) -> bool:
-        return any(self.get_interactions_by_tool(user_id, tool_name))
+        with self._user(user_id, create=False) as s:
+            return s is not None and tool_name in self._index(s).by_tool
 
+    @_optimistic
     def set_context(self, user_id: str, key: str, value):
-        self.context[user_id][key] = value
-        self.save()
+        with self._user(user_id) as s:
+            s.context[key] = value
+            self._save_user(user_id, s)
 
     def get_context(self, user_id: str, key: str, default=None):
-        return self.context[user_id].get(key, default)
+        with self._user(user_id, create=False) as s:
+            return s.context.get(key, default) if s else default
 
+    @_optimistic
     def clear_context(self, user_id: str):
-        self.context[user_id].clear()
-        self.save()
+        with self._user(user_id) as s:
+            s.context.clear()
+            self._save_user(user_id, s)
     
+    @_optimistic
     def clear_intent(self, user_id: str):
-        self.context[user_id]["current_intent"] = None
-        self.context[user_id]["suspended_intents"] = []
-        self.save()
+        with self._user(user_id) as s:
+            s.context["current_intent"] = None
+            s.context["suspended_intents"] = []
+            self._save_user(user_id, s)
 
+    @_optimistic
     def set_last_successful_action(self, user_id: str, action_name: str):
-        self.context[user_id]["last_action"] = action_name
-        self.save()
+        with self._user(user_id) as s:
+            s.context["last_action"] = action_name
+            self._save_user(user_id, s)
 
     def get_last_successful_action(self, user_id: str) -> str:
-        return self.context[user_id].get("last_action", "")
+        return self.get_context(user_id, "last_action", "")
     
+    @_optimistic
     def consume_last_successful_action(self, user_id: str) -> str:
-        action = self.context[user_id].get("last_action", "")
-        if "last_action" in self.context[user_id]:
-            del self.context[user_id]["last_action"]
-            self.save()
-        return action
+        with self._user(user_id, create=False) as s:
+            if s is None or "last_action" not in s.context:
+                return ""
+            action = s.context.pop("last_action")
+            self._save_user(user_id, s)
+            return action
 
     def get_raw_interactions(self, user_id: str, n=10):
-        return list(self.interactions[user_id])[-n:]
+        with self._user(user_id, create=False) as s:
+            return list(s.history)[-n:] if s else []
 
     def full_state(self, user_id: str):
-        return {
-            "recent_interactions": list(self.interactions[user_id]),
-            "context": self.context[user_id]
-        }
+        with self._user(user_id, create=False) as s:
+            return {
+                "recent_interactions": list(s.history) if s else [],
+                "context": dict(s.context) if s else {}
+            }
+
+    def _save_user(self, user_id: str, session: _Session):
+        """
+        (Kullanıcı kilidi altında) context'i kaydeder (sync) ya da kirli işaretler. Geciktirilmiş yazımda
+        tampon, yazım anında context'in kopyasını aynı kilit altında alır: yarım kalmış değişiklik yazılmaz.
+        """
+        session.state_text = None
+        if self.shared:
+            self._commit(user_id, session, [], session.context)
+        elif self._buffer is not None:
+            self._buffer.mark_context(user_id, session.context, session.lock)
+        else:
+            self._store.put_context(user_id, session.context)
+
+    def flush(self, user_id: Optional[str] = None):
+        """Bekleyen yazımları diske yazar (user_id verilirse yalnız o kullanıcınınkileri)."""
+        if self._buffer is not None:
+            self._buffer.flush(None if user_id is None else [user_id])
+
+    def end_turn(self, user_id: str):
+        """
+        Tur sonu: batched modda kullanıcının değişiklikleri yanıt dönmeden kalıcı olur; geçmiş uzadıysa
+        özet kuyruğa eklenir (beklenmez); boştaki oturumlar atılır.
+        """
+        if self.durability == "batched":
+            self.flush(user_id)
+        if self._summarizer is not None and self.needs_summary(user_id):
+            self._summarizer.schedule(self, user_id)
+        self.evict_idle_sessions()
 
     def save(self):
-        data = {
-            "interactions": {
-                uid: list(deque(messages, maxlen=self.max_turns))
-                for uid, messages in self.interactions.items()
-            },
-            "context": dict(self.context)
-        }
-        with open(self.save_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """Bekleyenleri yazar ve depoyu sıkıştırır (günlük -> snapshot, SQLite'ta WAL checkpoint)."""
+        self.flush()
+        self._store.compact(wait=True)
 
     def load(self):
-        if os.path.exists(self.save_path):
-            try:
-                with open(self.save_path, "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                    if not content:
-                        raise ValueError("Empty file")
-                    data = json.loads(content)
-                    self.interactions = defaultdict(
-                        lambda: deque(maxlen=self.max_turns),
-                        {
-                            uid: deque(messages, maxlen=self.max_turns)
-                            for uid, messages in data.get("interactions", {}).items()
-                        }
-                    )
-                    self.context = defaultdict(dict, data.get("context", {}))
-            except (json.JSONDecodeError, ValueError):
-                print(f"[WARN] Memory file '{self.save_path}' is empty or corrupted. Reinitializing.")
-                self.interactions = defaultdict(lambda: deque(maxlen=self.max_turns))
-                self.context = defaultdict(dict)
+        """Bellekteki oturumları bırakır; kullanıcı verisi ilk erişimde depodan (load_user) okunur."""
+        self.flush()
+        self._drop_sessions()
 
+    @_optimistic
     def set_tool_chain(self, user_id: str, tool_chain: list):
-        self.context[user_id]["pending_tool_chain"] = tool_chain
-        self.save()
+        with self._user(user_id) as s:
+            s.context["pending_tool_chain"] = tool_chain
+            self._save_user(user_id, s)
 
+    @_optimistic
     def get_next_tool(self, user_id: str):
-        chain = self.context[user_id].get("pending_tool_chain", [])
-        if chain:
-            next_tool = chain.pop(0)
-            self.context[user_id]["pending_tool_chain"] = chain
-            self.save()
-            return next_tool
-        return None
+        with self._user(user_id, create=False) as s:
+            chain = s.context.get("pending_tool_chain", []) if s else []
+            if chain:
+                next_tool = chain.pop(0)
+                s.context["pending_tool_chain"] = chain
+                self._save_user(user_id, s)
+                return next_tool
+            return None
 
     def has_pending_tools(self, user_id: str):
-        return bool(self.context[user_id].get("pending_tool_chain"))
+        return bool(self.get_context(user_id, "pending_tool_chain"))
 
+    @_optimistic
     def clear_tool_chain(self, user_id: str):
-        if "pending_tool_chain" in self.context[user_id]:
-            del self.context[user_id]["pending_tool_chain"]
-            self.save()
+        with self._user(user_id, create=False) as s:
+            if s is not None and "pending_tool_chain" in s.context:
+                del s.context["pending_tool_chain"]
+                self._save_user(user_id, s)
 
+    @_optimistic
     def set_plan_info(self, user_id: str, plan_id: str, version: int):
-        self.context[user_id]["plan_id"] = plan_id
-        self.context[user_id]["plan_version"] = version
-        self.save()
+        with self._user(user_id) as s:
+            s.context["plan_id"] = plan_id
+            s.context["plan_version"] = version
+            self._save_user(user_id, s)
 
     def get_plan_info(self, user_id: str):
-        return {
-            "plan_id": self.context[user_id].get("plan_id"),
-            "plan_version": self.context[user_id].get("plan_version"),
-        }
+        with self._user(user_id, create=False) as s:
+            ctx = s.context if s else {}
+            return {
+                "plan_id": ctx.get("plan_id"),
+                "plan_version": ctx.get("plan_version"),
+            }
 
+    @_optimistic
     def add_tool_output(self, user_id: str, tool_name: str, output: dict):
-        self.context[user_id].setdefault("tool_outputs", []).append({
-            "tool": tool_name,
-            "output": output
-        })
-        self.save()
+        with self._user(user_id) as s:
+            outputs = s.context.setdefault("tool_outputs", [])
+            outputs.append({
+                "tool": tool_name,
+                "output": output
+            })
+            # Halka tampon: yalnız son max_tool_outputs çıktı tutulur
+            del outputs[:-self.max_tool_outputs]
+            self._save_user(user_id, s)
 
     def get_context_tool_outputs(self, user_id: str):
-        return self.context[user_id].get("tool_outputs", [])
+        with self._user(user_id, create=False) as s:
+            return list(s.context.get("tool_outputs", [])) if s else []
 
     def has_suspended_chains(self, user_id: str) -> bool:
         return self.has_pending_tools(user_id)
 
     def find_keywords_in_history(self, user_id: str, keywords: List[str]) -> List[str]:
-        matched = []
-        for interaction in self.interactions[user_id]:
-            for keyword in keywords:
-                if keyword.lower() in interaction["message"].lower():
-                    matched.append(keyword)
-        return matched
+        """Her etkileşimde geçen anahtar kelimeler, etkileşim sırasıyla (bir kelime birden çok kez dönebilir)."""
+        with self._user(user_id, create=False) as s:
+            if s is None:
+                return []
+            index = self._index(s)
+            hits = [(pos, k) for k, keyword in enumerate(keywords)
+                    for pos in index.keyword_positions(s.history, keyword)]
+        return [keywords[k] for _, k in sorted(hits)]
     
     def get_recent_errors(self, user_id: str, n=3) -> List[str]:
-        errors = [
-            i["message"] for i in reversed(self.interactions[user_id])
-            if i.get("type") == "tool_error"
-        ]
-        return errors[:n]
+        with self._user(user_id, create=False) as s:
+            if s is None:
+                return []
+            errors = reversed(self._index(s).by_type.get("tool_error", ()))
+            return [entry["message"] for entry in itertools.islice(errors, n)]
 
     def get_last_tool_error(self, user_id: str) -> str:
-        for i in reversed(self.interactions[user_id]):
-            if i.get("type") == "tool_error":
-                return i["message"]
-        return ""
+        errors = self.get_recent_errors(user_id, 1)
+        return errors[0] if errors else ""
     
     def get_tool_outputs(self, user_id: str) -> List[str]:
-        return [
-            i["message"]
-            for i in self.interactions[user_id]
-            if i.get("type") in ["tool", "tool_error"]
-        ]
-
+        with self._user(user_id, create=False) as s:
+            return [
+                i["message"]
+                for i in (s.history if s else ())
+                if i.get("type") in ["tool", "tool_error"]
+            ]
+
+    @_optimistic
     def set_current_focus(self, user_id: str, focus: str):
-        self.context[user_id]["current_focus"] = focus
-        self.save()
+        with self._user(user_id) as s:
+            s.context["current_focus"] = focus
+            self._save_user(user_id, s)
 
     def get_current_focus(self, user_id: str):
-        return self.context[user_id].get("current_focus", None)
+        return self.get_context(user_id, "current_focus", None)
     
+    @_optimistic
     def suspend_current_intent(self, user_id: str):
-        suspended = {
-            "tool_chain": self.context[user_id].get("pending_tool_chain", []),
-            "focus": self.context[user_id].get("current_focus"),
-            "message": self.get_recent_interactions(user_id, 1),
-        }
-        if not suspended["tool_chain"]:
-            print(f"[WARN] Tool chain bulunamadı, boş suspend ediliyor: {suspended}")
+        with self._user(user_id) as s:
+            suspended = {
+                "tool_chain": s.context.get("pending_tool_chain", []),
+                "focus": s.context.get("current_focus"),
+                "message": self.get_recent_interactions(user_id, 1),
+            }
+            if not suspended["tool_chain"]:
+                print(f"[WARN] Tool chain bulunamadı, boş suspend ediliyor: {suspended}")
         
-        self.context[user_id].setdefault("suspended_intents", []).append(suspended)
-        self.context[user_id]["pending_tool_chain"] = []
-        self.context[user_id]["current_focus"] = None
-        self.save()
+            s.context.setdefault("suspended_intents", []).append(suspended)
+            s.context["pending_tool_chain"] = []
+            s.context["current_focus"] = None
+            self._save_user(user_id, s)
 
+    @_optimistic
     def set_pending_intent(self, user_id, pending: dict):
-        self.context.setdefault(user_id, {})
-        self.context[user_id]["pending_intent"] = pending
+        with self._user(user_id) as s:
+            s.context["pending_intent"] = pending
+            # Eskiden bir sonraki tam save() ile diske giderdi; günlükte kaybolmasın
+            self._save_user(user_id, s)
 
     def get_pending_intent(self, user_id):
-        return self.context.get(user_id, {}).get("pending_intent")
+        return self.get_context(user_id, "pending_intent")
 
+    @_optimistic
     def clear_pending_intent(self, user_id):
-        if user_id in self.context and "pending_intent" in self.context[user_id]:
-            self.context[user_id].pop("pending_intent", None)
+        with self._user(user_id, create=False) as s:
+            if s is not None and "pending_intent" in s.context:
+                s.context.pop("pending_intent", None)
+                self._save_user(user_id, s)
 
+    @_optimistic
     def resume_last_suspended(self, user_id: str):
-        suspended_stack = self.context[user_id].get("suspended_intents", [])
-        if suspended_stack:
-            last = suspended_stack.pop()
-            self.context[user_id]["pending_tool_chain"] = last.get("tool_chain", [])
-            self.context[user_id]["current_focus"] = last.get("focus", None)
-            # güncellenmiş stack'i geri yaz
-            self.context[user_id]["suspended_intents"] = suspended_stack
-            self.save()
-            return {
-                "tool_chain": last.get("tool_chain", []),
-                "message": last.get("message", "Önceki görev devam ediyor."),
-                "missing_parameters": [],
-            }
-        return None
+        with self._user(user_id, create=False) as s:
+            suspended_stack = s.context.get("suspended_intents", []) if s else []
+            if suspended_stack:
+                last = suspended_stack.pop()
+                s.context["pending_tool_chain"] = last.get("tool_chain", [])
+                s.context["current_focus"] = last.get("focus", None)
+                # güncellenmiş stack'i geri yaz
+                s.context["suspended_intents"] = suspended_stack
+                self._save_user(user_id, s)
+                return {
+                    "tool_chain": last.get("tool_chain", []),
+                    "message": last.get("message", "Önceki görev devam ediyor."),
+                    "missing_parameters": [],
+                }
+            return None
 
     
     def get_agent_state(self, user_id: str) -> dict:
-        ctx = self.context.get(user_id, {})
-        state = {
-            "current_intent": ctx.get("current_intent"),
-            "current_focus": ctx.get("current_focus"),
-            "pending_intent": ctx.get("pending_intent"),
-            "pending_tool_chain": ctx.get("pending_tool_chain", []),
-            "suspended_intents": ctx.get("suspended_intents", []),
-            "completed_intents": ctx.get("completed_intents", []),
-            "last_action": ctx.get("last_action"),
-            "tool_outputs": ctx.get("tool_outputs", [])[-5:],  # son 5 tool çıktısı
-        }
+        with self._user(user_id, create=False) as s:
+            ctx = s.context if s else {}
+            state = {
+                "current_intent": ctx.get("current_intent"),
+                "current_focus": ctx.get("current_focus"),
+                "pending_intent": ctx.get("pending_intent"),
+                "pending_tool_chain": list(ctx.get("pending_tool_chain", [])),
+                "suspended_intents": list(ctx.get("suspended_intents", [])),
+                "completed_intents": list(ctx.get("completed_intents", [])),
+                "last_action": ctx.get("last_action"),
+                "tool_outputs": ctx.get("tool_outputs", [])[-5:],  # son 5 tool çıktısı
+            }
         return state
 
-    def format_agent_state(self, user_id: str) -> str:
-        try:
-            return json.dumps(self.get_agent_state(user_id), ensure_ascii=False, indent=2)
-        except Exception:
-            return str(self.get_agent_state(user_id))
+    def format_agent_state(self, user_id: str, max_tokens: Optional[int] = None) -> str:
+        """
+        get_agent_state'in JSON hali; max_tokens verilirse _STATE_PRIORITY sırasına göre kırpılır. Metin context
+        değişene kadar (_save_user) oturumda önbelleklenir.
+        """
+        # İç içe değerler de tutarlı serileştirilsin diye kullanıcı kilidi altında
+        with self._user(user_id, create=False) as s:
+            if s is not None and s.state_text is not None and s.state_text[0] == max_tokens:
+                return s.state_text[1]
+            text = _fit_state(self.get_agent_state(user_id), max_tokens)
+            if s is not None:
+                s.state_text = (max_tokens, text)
+            return text
         
     def set_authenticated_user(self, session_key: str, user_id: str):
         """
         Belirli bir session_key (TC veya kullanıcı adı) için doğrulanmış user_id kaydeder.
         """
         self.set_context(session_key, "authenticated_user_id", user_id)
-        self.save()
 
     def get_authenticated_user(self, session_key: str) -> Optional[str]:
         """
@@ -324,15 +954,22 @@ class AgentMemory(BaseMemory):
         """
         return self.get_context(session_key, "authenticated_user_id")
 
+    @_optimistic
     def clear_authenticated_user(self, session_key: str):
         """
         Session key için giriş bilgisini temizler.
         """
-        ctx = self.context.get(session_key, {})
-        if "authenticated_user_id" in ctx:
-            del ctx["authenticated_user_id"]
-            self.save()
+        with self._user(session_key, create=False) as s:
+            if s is not None and "authenticated_user_id" in s.context:
+                del s.context["authenticated_user_id"]
+                self._save_user(session_key, s)
 
     
 
+_memories: "weakref.WeakValueDictionary[int, AgentMemory]" = weakref.WeakValueDictionary()
+MEMORY_RESIDENT_SESSIONS.set_function(lambda: sum(m.resident_sessions() for m in list(_memories.values())))
+MEMORY_RESIDENT_BYTES.set_function(lambda: sum(m.resident_bytes() for m in list(_memories.values())))
+
+# Süreçteki tek örnek: api, agent_runner ve tools bunu paylaşır. Açılış yalnız depoyu açar
+# (JSON'da snapshot indeksi, SQLite'ta bağlantı); kullanıcı verisi ilk erişimde okunur.
 memory = AgentMemory()
\ No newline at end of file
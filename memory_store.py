@@ -0,0 +1,1002 @@
+"""
+AgentMemory için kalıcı depolama arka uçları. get_store() dosya uzantısına göre seçer:
+  - *.json            -> JournalStore: kullanıcı başına satırlı snapshot + yalnızca-ekleme günlüğü (journal)
+  - *.db / *.sqlite*  -> SQLiteMemoryStore: indeksli etkileşim tablosu + anahtarlı context tablosu
+
+Her iki arka uç da load_user() ile tek kullanıcının penceresini, diğer kullanıcıları okumadan döner;
+AgentMemory boşta kalan oturumları bellekten atıp gerektiğinde buradan yeniden yükler.
+
+JournalStore: her değişiklik `<save_path>.journal` dosyasına tek satırlık bir işlem olarak eklenir; yazma maliyeti
+toplam kullanıcı sayısından bağımsızdır. Günlük compact_every kayda ulaşınca arka planda sıkıştırılır:
+günlük `.journal.old`'a döndürülür, eski snapshot satır satır akıtılıp `.old`'da kaydı olan kullanıcılar
+güncellenerek yeni snapshot geçici dosyaya yazılır ve os.replace ile atomik olarak yerine konur. Her kaydın
+artan bir seq'i vardır; snapshot son uyguladığı seq'i tutar, böylece sıkıştırma yarıda kalsa da kayıtlar
+iki kez uygulanmaz.
+
+Günlük satırları:
+    {"seq": 1, "op": "add", "u": "user000", "e": {"role": "human", "message": "...", "type": "message"}}
+    {"seq": 2, "op": "ctx", "u": "user000", "v": {...kullanıcının tüm context'i...}}
+    {"seq": 3, "op": "clear"}
+
+Snapshot satırları (`<save_path>.snapshot`, ilk satır başlık):
+    {"format": 1, "seq": 3}
+    "user000"\t{"i": [...son max_turns etkileşim...], "c": {...context...}}
+
+Çok süreçli kullanım (uvicorn --workers N) yalnız MultiprocessMemoryStore'u uygulayan SQLiteMemoryStore ile
+desteklenir: her yazım kullanıcının sürümünü (user_versions) artırır; commit_user() beklenen sürüm tutmazsa
+VersionConflict fırlatır (iyimser eşzamanlılık). JournalStore tek süreçlidir: günlüğü ve sıkıştırmayı tek
+süreç yönetir.
+"""
+import abc
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import weakref
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import Gauge, Histogram
+from tracing import span
+
+DEFAULT_COMPACT_EVERY = 5000
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+MEMORY_SAVE_SECONDS = Histogram(
+    "memory_save_duration_seconds",
+    "Bellek değişikliğinin diske (günlüğe) yazılma süresi",
+)
+# Çoklu süreçte yazma kilidini bekleme sınırı (saniye); BEGIN IMMEDIATE bu süre boyunca yeniden dener
+SQLITE_BUSY_TIMEOUT = 30.0
+
+MEMORY_COMPACTION_SECONDS = Histogram(
+    "memory_compaction_duration_seconds",
+    "Günlüğün snapshot'a sıkıştırılma süresi",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+SNAPSHOT_FORMAT = 1
+
+
+def _user_line(user_id: str, history, context: Dict[str, Any]) -> bytes:
+    """Snapshot satırı: <json user_id> TAB <json {"i": son etkileşimler, "c": context}>."""
+    return (
+        json.dumps(user_id, ensure_ascii=False) + "\t"
+        + json.dumps({"i": list(history), "c": context}, ensure_ascii=False, default=str) + "\n"
+    ).encode("utf-8")
+
+
+def _user_key(line: bytes) -> str:
+    return json.loads(line.split(b"\t", 1)[0])
+
+
+def _user_payload(line: bytes) -> Dict[str, Any]:
+    return json.loads(line.split(b"\t", 1)[1])
+
+
+def _iter_lines(path: str):
+    """Dosyanın (ofset, satır) çiftlerini üretir; dosya yoksa boş."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            yield offset, line
+            offset += len(line)
+
+
+def _read_at(f, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    return f.read(length)
+
+
+def _truncate_torn_tail(path: str):
+    """Çökmeden kalan yarım son satırı keser; yoksa sonraki ilk kayıt ona yapışıp kaybolur."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                end = pos - step + newline + 1
+                break
+            pos -= step
+        else:
+            end = 0
+        if end != size:
+            f.truncate(end)
+
+
+def read_memory_state(path: str, max_turns: int = 20) -> Dict[str, Any]:
+    """Deponun güncel durumunu düz listeler olarak okur (ör. /api/agent-plots)."""
+    interactions, context = get_store(path, max_turns).load()
+    return {"interactions": {uid: list(m) for uid, m in interactions.items()}, "context": context}
+
+
+class VersionConflict(Exception):
+    """Kullanıcı, okunduğu sürümden sonra başka bir süreç (ya da bağlantı) tarafından değiştirildi."""
+
+    def __init__(self, user_id: str, expected: int, actual: int):
+        super().__init__(f"{user_id}: beklenen sürüm {expected}, depodaki {actual}")
+        self.user_id = user_id
+        self.expected = expected
+        self.actual = actual
+
+
+class MemoryStore(abc.ABC):
+    """
+    AgentMemory'nin kalıcılık arayüzü. Bellekteki pencere (kullanıcı başına son max_turns etkileşim
+    ve context) yetkili kopyadır; depo her değişikliği kullanıcı başına küçük bir yazma ile saklar.
+    Birden çok sürecin paylaşabildiği depolar ayrıca MultiprocessMemoryStore'u uygular.
+    """
+
+    max_turns: int
+
+    @abc.abstractmethod
+    def load(self) -> Tuple[Dict[str, deque], Dict[str, dict]]:
+        """Tüm kullanıcıların (etkileşimler, context) sözlükleri."""
+
+    @abc.abstractmethod
+    def load_user(self, user_id: str) -> Optional[Tuple[deque, Dict[str, Any]]]:
+        """Kullanıcının (son max_turns etkileşim, context) çifti; depoda hiç kaydı yoksa None."""
+
+    @abc.abstractmethod
+    def append_interaction(self, user_id: str, entry: Dict[str, Any]):
+        """Kullanıcıya tek etkileşim ekler."""
+
+    @abc.abstractmethod
+    def put_context(self, user_id: str, context: Dict[str, Any]):
+        """Kullanıcının context'ini bütünüyle değiştirir."""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Tüm kullanıcıları siler."""
+
+    def write_batch(self, batch: List[Tuple[str, List[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+        """[(user_id, yeni etkileşimler, context ya da None)] toplu yazımı; varsayılan tek tek yazar."""
+        for user_id, entries, context in batch:
+            for entry in entries:
+                self.append_interaction(user_id, entry)
+            if context is not None:
+                self.put_context(user_id, context)
+
+    def compact(self, wait: bool = True):
+        """Depoyu kalıcı/sıkıştırılmış hale getirir; gerekmeyen arka uçlarda bir şey yapmaz."""
+
+    def close(self):
+        pass
+
+
+class MultiprocessMemoryStore(MemoryStore):
+    """
+    Birden çok sürecin aynı dosyayı paylaşabildiği depo. Paylaşımlı bellekte (AgentMemory(shared=True))
+    yetkili kopya depodur: kullanıcı başına sürüm tutulur, yazımlar iyimser sürümlemeyle yapılır.
+    """
+
+    @abc.abstractmethod
+    def user_version(self, user_id: str) -> int:
+        """Kullanıcının depodaki sürümü (hiç yazılmadıysa 0)."""
+
+    @abc.abstractmethod
+    def load_user_versioned(self, user_id: str) -> Tuple[int, Optional[Tuple[deque, Dict[str, Any]]]]:
+        """(sürüm, load_user sonucu); ikisi aynı anlık görüntüden okunur."""
+
+    @abc.abstractmethod
+    def commit_user(self, user_id: str, entries: List[Dict[str, Any]], context: Optional[Dict[str, Any]],
+                    expected_version: int) -> int:
+        """Depodaki sürüm expected_version ise yazar ve yeni sürümü döner; değilse VersionConflict."""
+
+
+class JournalStore(MemoryStore):
+    """
+    Dosyalar (path = save_path, ör. agent_memory.json):
+      <path>.snapshot     : başlık {"format": 1, "seq": N} + kullanıcı başına bir satır (bkz. _user_line)
+      <path>.snapshot.idx : snapshot'taki kullanıcı -> (ofset, uzunluk) indeksi; açılışta tarama yerine okunur
+      <path>.journal      : snapshot'tan sonraki kayıtlar
+      <path>.journal.old  : sıkıştırılmakta olan günlük
+      <path>              : eski tek parça JSON; snapshot yoksa bir kez içe aktarılır, sonra okunmaz
+
+    Bellekte kullanıcı verisi değil yalnız konumlar tutulur: snapshot'ta kullanıcı -> (ofset, uzunluk),
+    günlükte kullanıcı -> son context kaydı ve son max_turns etkileşim kaydı. load_user() yalnız o
+    kullanıcının satırlarını okur. Günlük kayıt konumları (nesil, ofset, uzunluk) biçimindedir; nesil
+    her döndürmede artar, snapshot'a girmiş nesillerin kayıtları yok sayılır.
+    """
+
+    def __init__(self, path: str, max_turns: int = 20, compact_every: int = DEFAULT_COMPACT_EVERY,
+                 fsync: bool = False):
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.index_path = f"{self.snapshot_path}.idx"
+        self.journal_path = f"{path}.journal"
+        self.old_path = f"{self.journal_path}.old"
+        self.max_turns = max_turns
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._pending = 0
+        self._size = 0
+        self._compactor: Optional[threading.Thread] = None
+        self._snapshot_index: Dict[str, Tuple[int, int]] = {}
+        self._snapshot_seq = 0
+        # user_id -> [context kaydı ya da None, deque(etkileşim kayıtları)]
+        self._journal_index: Dict[str, list] = {}
+        self._gen = 1
+        self._snapshot_gen = 0
+        # Son döndürmeden beri clear geldiyse sıkıştırılan snapshot'ın indeksi kurulmaz
+        self._cleared = False
+        self._open()
+
+    # --- Açılış ---
+    def _open(self):
+        with self._compact_lock, self._lock:
+            if not os.path.exists(self.snapshot_path) and os.path.exists(self.path):
+                self._import_legacy()
+            self._scan_snapshot()
+            leftover = os.path.exists(self.old_path)
+            if leftover:
+                # Yarım kalmış sıkıştırma: .old bir önceki nesil, henüz snapshot'ta değil
+                self._snapshot_gen = self._gen - 2
+                self._scan_journal(self.old_path, self._gen - 1)
+            self._cleared = False
+            _truncate_torn_tail(self.journal_path)
+            self._pending = self._scan_journal(self.journal_path, self._gen)
+            self._size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        if leftover or self._pending >= self.compact_every:
+            self.compact(wait=False)
+
+    def _import_legacy(self):
+        """Tek parça agent_memory.json'ı snapshot biçimine çevirir; eski dosyaya dokunmaz."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+            if not content:
+                raise ValueError("Empty file")
+            data = json.loads(content)
+        except (json.JSONDecodeError, ValueError):
+            print(f"[WARN] Memory file '{self.path}' is empty or corrupted. Reinitializing.")
+            return
+        interactions, context = data.get("interactions", {}), data.get("context", {})
+        lines = (
+            (uid, _user_line(uid, interactions.get(uid, [])[-self.max_turns:], context.get(uid, {})))
+            for uid in dict.fromkeys([*interactions, *context])
+        )
+        tmp_path, _ = self._write_snapshot(int(data.get("seq", 0)), lines)
+        self._install_snapshot(tmp_path)
+
+    def _scan_snapshot(self):
+        """Snapshot indeksini .idx'ten okur; yoksa ya da snapshot'la eşleşmiyorsa satırları tarayıp yazar."""
+        self._snapshot_index = {}
+        if not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, "rb") as f:
+            header = f.readline()
+        try:
+            self._snapshot_seq = int(json.loads(header).get("seq", 0))
+        except ValueError:
+            print(f"[WARN] Memory snapshot '{self.snapshot_path}' is corrupted. Reinitializing.")
+            return
+        self._seq = max(self._seq, self._snapshot_seq)
+        size = os.path.getsize(self.snapshot_path)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.loads(f.read())
+            if data.get("seq") == self._snapshot_seq and data.get("size") == size:
+                self._snapshot_index = data["users"]
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        for offset, line in _iter_lines(self.snapshot_path):
+            if offset:
+                self._snapshot_index[_user_key(line)] = (offset, len(line))
+        self._write_index(self._snapshot_seq, size, self._snapshot_index)
+        os.replace(f"{self.index_path}.tmp", self.index_path)
+
+    def _scan_journal(self, path: str, gen: int) -> int:
+        """Günlüğü indeksler; snapshot'tan yeni kayıt sayısını döner."""
+        count = 0
+        for offset, line in _iter_lines(path):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Çökme anında yarım kalmış son satır
+                continue
+            seq = record.get("seq", 0)
+            if seq <= self._snapshot_seq:
+                continue
+            self._seq = max(self._seq, seq)
+            self._index_record(record, (gen, offset, len(line)))
+            count += 1
+        return count
+
+    def _index_record(self, record: Dict[str, Any], ref: Tuple[int, int, int]):
+        op = record.get("op")
+        if op == "clear":
+            self._snapshot_index = {}
+            self._journal_index = {}
+            self._cleared = True
+            return
+        refs = self._journal_index.get(record["u"])
+        if refs is None:
+            refs = self._journal_index[record["u"]] = [None, deque(maxlen=self.max_turns)]
+        if op == "add":
+            refs[1].append(ref)
+        elif op == "ctx":
+            refs[0] = ref
+
+    # --- Okuma ---
+    def _handles(self) -> Dict[Any, Any]:
+        """(Kilit altında) okunacak dosyaları açar: "snapshot" ve günlük nesli -> dosya. Açık tanıtıcı,
+        dosya sonradan döndürülse ya da silinse de açıldığı andaki içeriği okumaya devam eder."""
+        handles = {}
+        for key, path in (("snapshot", self.snapshot_path), (self._gen - 1, self.old_path),
+                          (self._gen, self.journal_path)):
+            if os.path.exists(path):
+                handles[key] = open(path, "rb")
+        return handles
+
+    def _read_user(self, handles, snap, refs, snapshot_gen: int) -> Tuple[deque, Dict[str, Any]]:
+        history, context = deque(maxlen=self.max_turns), {}
+        if snap is not None:
+            payload = _user_payload(_read_at(handles["snapshot"], *snap))
+            history.extend(payload.get("i", []))
+            context = payload.get("c", {})
+        if refs is not None:
+            ctx_ref, adds = refs
+            for gen, offset, length in adds:
+                if gen > snapshot_gen:
+                    history.append(json.loads(_read_at(handles[gen], offset, length))["e"])
+            if ctx_ref is not None and ctx_ref[0] > snapshot_gen:
+                gen, offset, length = ctx_ref
+                context = json.loads(_read_at(handles[gen], offset, length))["v"]
+        return history, context
+
+    def load_user(self, user_id: str) -> Optional[Tuple[deque, Dict[str, Any]]]:
+        with self._lock:
+            snap = self._snapshot_index.get(user_id)
+            refs = self._journal_index.get(user_id)
+            if snap is None and refs is None:
+                return None
+            handles = self._handles()
+            try:
+                return self._read_user(handles, snap, refs, self._snapshot_gen)
+            finally:
+                for f in handles.values():
+                    f.close()
+
+    def load(self) -> Tuple[Dict[str, deque], Dict[str, dict]]:
+        """Tüm kullanıcıları okur (ör. /api/agent-plots, taşıma); yazımları yalnız indeks kopyalanırken bekletir."""
+        with self._lock:
+            snapshot_index = dict(self._snapshot_index)
+            journal_index = {uid: (ctx_ref, tuple(adds)) for uid, (ctx_ref, adds) in self._journal_index.items()}
+            snapshot_gen = self._snapshot_gen
+            handles = self._handles()
+        interactions, context = {}, {}
+        try:
+            for uid in dict.fromkeys([*snapshot_index, *journal_index]):
+                history, ctx = self._read_user(handles, snapshot_index.get(uid), journal_index.get(uid), snapshot_gen)
+                if history:
+                    interactions[uid] = history
+                if ctx:
+                    context[uid] = ctx
+        finally:
+            for f in handles.values():
+                f.close()
+        return interactions, context
+
+    # --- Yazma ---
+    def append_interaction(self, user_id: str, entry: Dict[str, Any]):
+        self._append({"op": "add", "u": user_id, "e": entry})
+
+    def put_context(self, user_id: str, context: Dict[str, Any]):
+        self._append({"op": "ctx", "u": user_id, "v": context})
+
+    def clear(self):
+        self._append({"op": "clear"})
+
+    def write_batch(self, batch: List[Tuple[str, List[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+        records = []
+        for user_id, entries, context in batch:
+            records += [{"op": "add", "u": user_id, "e": entry} for entry in entries]
+            if context is not None:
+                records.append({"op": "ctx", "u": user_id, "v": context})
+        self._append(*records)
+
+    def _append(self, *records: Dict[str, Any]):
+        """Kayıtları tek write + flush (+ fsync) ile ekler ve indekse işler."""
+        if not records:
+            return
+        with span("memory.save", records=len(records)), MEMORY_SAVE_SECONDS.time():
+            with self._lock:
+                stamped, lines = [], []
+                for record in records:
+                    self._seq += 1
+                    record = {"seq": self._seq, **record}
+                    # Serileştirme kilit içinde: kayıt, çağrı anındaki durumu yansıtır
+                    lines.append((json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                    stamped.append(record)
+                if self._file is None:
+                    self._file = open(self.journal_path, "ab")
+                self._file.write(b"".join(lines))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                for record, line in zip(stamped, lines):
+                    self._index_record(record, (self._gen, self._size, len(line)))
+                    self._size += len(line)
+                self._pending += len(records)
+                if self._pending >= self.compact_every and self._rotate():
+                    self._start_compaction()
+
+    # --- Sıkıştırma ---
+    def _rotate(self) -> bool:
+        """(Kilit altında) günlüğü .old'a döndürür; önceki sıkıştırma bitmediyse False."""
+        if os.path.exists(self.old_path) or not self._pending:
+            return False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.journal_path):
+            os.replace(self.journal_path, self.old_path)
+        self._gen += 1
+        self._size = 0
+        self._pending = 0
+        self._cleared = False
+        return True
+
+    def _start_compaction(self) -> threading.Thread:
+        if self._compactor is None or not self._compactor.is_alive():
+            self._compactor = threading.Thread(target=self._compact_old, name="memory-compactor", daemon=True)
+            self._compactor.start()
+        return self._compactor
+
+    def _write_snapshot(self, seq: int, lines) -> Tuple[str, Dict[str, Tuple[int, int]]]:
+        """(user_id, satır) akışını geçici dosyaya yazar; (geçici yol, indeks) döner."""
+        index = {}
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            header = (json.dumps({"format": SNAPSHOT_FORMAT, "seq": seq}) + "\n").encode("utf-8")
+            f.write(header)
+            offset = len(header)
+            for user_id, line in lines:
+                f.write(line)
+                index[user_id] = (offset, len(line))
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._write_index(seq, offset, index)
+        return tmp_path, index
+
+    def _write_index(self, seq: int, size: int, index: Dict[str, Tuple[int, int]]):
+        """Açılışta snapshot'ı taramamak için indeks; snapshot'tan türetilir, fsync gerekmez."""
+        with open(f"{self.index_path}.tmp", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"seq": seq, "size": size, "users": index}, ensure_ascii=False))
+
+    def _install_snapshot(self, tmp_path: str):
+        """Geçici snapshot'ı ve indeksini yerine koyar; indeks eşleşmezse açılışta yeniden taranır."""
+        os.replace(tmp_path, self.snapshot_path)
+        os.replace(f"{self.index_path}.tmp", self.index_path)
+
+    def _merged_lines(self, pending: Dict[str, List[Dict[str, Any]]], keep_snapshot: bool):
+        """Eski snapshot satırlarını akıtır; yalnız .old'da kaydı olan kullanıcılar ayrıştırılıp yeniden yazılır."""
+        if keep_snapshot:
+            for offset, line in _iter_lines(self.snapshot_path):
+                if offset == 0:
+                    continue
+                user_id = _user_key(line)
+                records = pending.pop(user_id, None)
+                yield user_id, (self._merge_user(user_id, _user_payload(line), records) if records else line)
+        for user_id, records in pending.items():
+            yield user_id, self._merge_user(user_id, {}, records)
+
+    def _merge_user(self, user_id: str, payload: Dict[str, Any], records: List[Dict[str, Any]]) -> bytes:
+        history = deque(payload.get("i", []), maxlen=self.max_turns)
+        context = payload.get("c", {})
+        for record in records:
+            if record["op"] == "add":
+                history.append(record["e"])
+            elif record["op"] == "ctx":
+                context = record["v"]
+        return _user_line(user_id, history, context)
+
+    def _compact_old(self):
+        with self._compact_lock:
+            if not os.path.exists(self.old_path):
+                return
+            with MEMORY_COMPACTION_SECONDS.time():
+                seq, keep_snapshot, pending = self._snapshot_seq, True, {}
+                for _, line in _iter_lines(self.old_path):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("seq", 0) <= self._snapshot_seq:
+                        continue
+                    seq = record["seq"]
+                    if record.get("op") == "clear":
+                        keep_snapshot, pending = False, {}
+                    else:
+                        pending.setdefault(record["u"], []).append(record)
+                tmp_path, index = self._write_snapshot(seq, self._merged_lines(pending, keep_snapshot))
+                with self._lock:
+                    self._install_snapshot(tmp_path)
+                    os.remove(self.old_path)
+                    self._snapshot_seq = seq
+                    self._snapshot_gen = self._gen - 1
+                    self._snapshot_index = {} if self._cleared else index
+                    self._prune_journal_index()
+
+    def _prune_journal_index(self):
+        """(Kilit altında) snapshot'a girmiş nesillerin kayıt konumlarını atar."""
+        live = {}
+        for user_id, (ctx_ref, adds) in self._journal_index.items():
+            if ctx_ref is not None and ctx_ref[0] <= self._snapshot_gen:
+                ctx_ref = None
+            adds = deque((ref for ref in adds if ref[0] > self._snapshot_gen), maxlen=self.max_turns)
+            if ctx_ref is not None or adds:
+                live[user_id] = [ctx_ref, adds]
+        self._journal_index = live
+
+    def compact(self, wait: bool = True):
+        """Günlüğü döndürüp snapshot'a sıkıştırır; wait=False ise arka planda çalışır."""
+        while True:
+            with self._lock:
+                rotated = self._rotate()
+                thread = self._start_compaction() if os.path.exists(self.old_path) else None
+            if not wait or thread is None:
+                return
+            thread.join()
+            if rotated:
+                return
+            # Önceki sıkıştırma sürüyordu; bitti, şimdi kalan günlük de sıkıştırılsın
+
+    def close(self):
+        self.compact(wait=True)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_INSERT_INTERACTION = (
+    "INSERT INTO interactions (user_id, role, type, tool, message, metadata, user_seq) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class SQLiteMemoryStore(MultiprocessMemoryStore):
+    """
+    interactions: kullanıcı başına sıralı etkileşimler (tam geçmiş saklanır, yükleme son max_turns'ü alır)
+    context     : (user_id, key) -> JSON değer
+
+    user_versions: kullanıcı başına sürüm; her yazımda aynı işlem içinde artar
+
+    (user_id, seq), (user_id, tool, seq) ve (user_id, type, seq) indeksleri sayesinde kullanıcı bazlı
+    okumalar (load_user, recent_interactions, interactions_by_tool, get_context) nokta sorgularıdır;
+    etkileşim yazmak tek satırlık INSERT'tür. WAL modunda birden çok süreç aynı dosyayı paylaşabilir:
+    okumalar yazanı beklemez, yazımlar BEGIN IMMEDIATE ile sıraya girer.
+    """
+
+    def __init__(self, path: str, max_turns: int = 20, fsync: bool = False):
+        self.path = path
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commit fsync yapmaz (JournalStore(fsync=False) ile aynı garanti); FULL her commit'te fsync
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS interactions (
+                seq INTEGER PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                type TEXT NOT NULL,
+                tool TEXT,
+                message TEXT NOT NULL,
+                metadata TEXT,
+                user_seq INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_interactions_user ON interactions(user_id, seq);
+            CREATE INDEX IF NOT EXISTS idx_interactions_tool ON interactions(user_id, tool, seq);
+            CREATE INDEX IF NOT EXISTS idx_interactions_type ON interactions(user_id, type, seq);
+            CREATE TABLE IF NOT EXISTS context (
+                user_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (user_id, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS user_versions (
+                user_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        # user_seq (etkileşimin kullanıcı başına sıra numarası, entry["seq"]) sonradan eklendi
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(interactions)")}
+        if "user_seq" not in columns:
+            self._conn.execute("ALTER TABLE interactions ADD COLUMN user_seq INTEGER")
+
+    @staticmethod
+    def _entry(row) -> Dict[str, Any]:
+        role, type_, message, metadata, user_seq = row
+        entry = {"role": role, "message": message, "type": type_}
+        if metadata:
+            entry["metadata"] = json.loads(metadata)
+        if user_seq is not None:
+            entry["seq"] = user_seq
+        return entry
+
+    # --- Okuma ---
+    def load(self) -> Tuple[Dict[str, deque], Dict[str, dict]]:
+        with self._lock:
+            users = [r[0] for r in self._conn.execute(
+                "SELECT user_id FROM interactions UNION SELECT user_id FROM context"
+            )]
+        interactions, context = {}, {}
+        for uid in users:
+            history, ctx = self.load_user(uid) or ((), {})
+            if history:
+                interactions[uid] = history
+            if ctx:
+                context[uid] = ctx
+        return interactions, context
+
+    def load_user(self, user_id: str) -> Optional[Tuple[deque, Dict[str, Any]]]:
+        return self.load_user_versioned(user_id)[1]
+
+    def load_user_versioned(self, user_id: str) -> Tuple[int, Optional[Tuple[deque, Dict[str, Any]]]]:
+        # Tek okuma işlemi: başka bir süreç arada yazsa da sürüm, pencere ve context aynı anlık görüntüden gelir
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                version = self._select_version(user_id)
+                rows = self._select_recent(user_id, self.max_turns)
+                context_rows = self._select_context(user_id)
+            finally:
+                self._conn.execute("COMMIT")
+        history = deque((self._entry(r) for r in reversed(rows)), maxlen=self.max_turns)
+        context = {key: json.loads(value) for key, value in context_rows}
+        if not history and not context:
+            return version, None
+        return version, (history, context)
+
+    def _select_version(self, user_id: str) -> int:
+        row = self._conn.execute("SELECT version FROM user_versions WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def _select_recent(self, user_id: str, n: int):
+        return self._conn.execute(
+            "SELECT role, type, message, metadata, user_seq FROM interactions WHERE user_id = ? "
+            "ORDER BY seq DESC LIMIT ?", (user_id, n),
+        ).fetchall()
+
+    def _select_context(self, user_id: str):
+        return self._conn.execute("SELECT key, value FROM context WHERE user_id = ?", (user_id,)).fetchall()
+
+    def user_version(self, user_id: str) -> int:
+        with self._lock:
+            return self._select_version(user_id)
+
+    def recent_interactions(self, user_id: str, n: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._select_recent(user_id, n)
+        return [self._entry(r) for r in reversed(rows)]
+
+    def interactions_by_tool(self, user_id: str, tool_name: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, type, message, metadata, user_seq FROM interactions WHERE user_id = ? AND tool = ? "
+                "ORDER BY seq", (user_id, tool_name),
+            ).fetchall()
+        return [self._entry(r) for r in rows]
+
+    def get_context(self, user_id: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._select_context(user_id)
+        return {key: json.loads(value) for key, value in rows}
+
+    # --- Yazma ---
+    @staticmethod
+    def _interaction_row(user_id: str, entry: Dict[str, Any]) -> Tuple:
+        metadata = entry.get("metadata")
+        return (
+            user_id, entry.get("role", ""), entry.get("type", "message"), (metadata or {}).get("tool"),
+            entry.get("message", ""), json.dumps(metadata, ensure_ascii=False, default=str) if metadata else None,
+            entry.get("seq"),
+        )
+
+    @staticmethod
+    def _context_rows(user_id: str, context: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+        return [(user_id, k, json.dumps(v, ensure_ascii=False, default=str)) for k, v in context.items()]
+
+    def append_interaction(self, user_id: str, entry: Dict[str, Any]):
+        self.write_batch([(user_id, [entry], None)])
+
+    def put_context(self, user_id: str, context: Dict[str, Any]):
+        self.write_batch([(user_id, [], context)])
+
+    def _write_user(self, user_id: str, entries: List[Dict[str, Any]], context: Optional[Dict[str, Any]]):
+        """(Açık işlem içinde) kullanıcının yeni etkileşimlerini / context'ini yazar ve sürümünü artırır."""
+        if entries:
+            self._conn.executemany(_INSERT_INTERACTION, [self._interaction_row(user_id, e) for e in entries])
+        if context is not None:
+            self._conn.execute("DELETE FROM context WHERE user_id = ?", (user_id,))
+            self._conn.executemany(
+                "INSERT INTO context (user_id, key, value) VALUES (?, ?, ?)",
+                self._context_rows(user_id, context),
+            )
+        self._conn.execute(
+            "INSERT INTO user_versions (user_id, version) VALUES (?, 1) "
+            "ON CONFLICT(user_id) DO UPDATE SET version = version + 1",
+            (user_id,),
+        )
+
+    def write_batch(self, batch: List[Tuple[str, List[Dict[str, Any]], Optional[Dict[str, Any]]]]):
+        """Tüm parti tek işlemde (tek commit) yazılır."""
+        with span("memory.save", records=len(batch)), MEMORY_SAVE_SECONDS.time(), self._lock:
+            # IMMEDIATE: yazma kilidi baştan alınır; başka süreç yazıyorsa busy timeout kadar beklenir
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for user_id, entries, context in batch:
+                    self._write_user(user_id, entries, context)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def commit_user(self, user_id: str, entries: List[Dict[str, Any]], context: Optional[Dict[str, Any]],
+                    expected_version: int) -> int:
+        with span("memory.save", records=1), MEMORY_SAVE_SECONDS.time(), self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._select_version(user_id)
+                if version != expected_version:
+                    raise VersionConflict(user_id, expected_version, version)
+                self._write_user(user_id, entries, context)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return version + 1
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM interactions")
+            self._conn.execute("DELETE FROM context")
+            # Sürümler silinmez, artırılır: eski sürümü önbellekte tutan süreçler değişikliği görür
+            self._conn.execute("UPDATE user_versions SET version = version + 1")
+            self._conn.execute("COMMIT")
+
+    def compact(self, wait: bool = True):
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Geciktirilmiş (write-behind) yazım -------------------------------------------
+# sync   : her değişiklik çağıran thread'de hemen yazılır
+# batched: değişiklikler tamponlanır; tur sonunda (AgentMemory.end_turn) kullanıcının kirli durumu
+#          yanıt dönmeden tek partide yazılır, arada arka plan thread'i de boşaltır
+# async  : yalnız arka plan thread'i yazar; çökmede en fazla flush_interval'lik değişiklik kaybolabilir
+DURABILITY_MODES = ("sync", "batched", "async")
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_FLUSH_THRESHOLD = 256
+
+MEMORY_FLUSH_BATCH = Histogram(
+    "memory_flush_batch_users",
+    "Geciktirilmiş bellek yazımında parti başına kullanıcı sayısı",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+MEMORY_DIRTY_USERS = Gauge("memory_dirty_users", "Diske yazılmayı bekleyen (kirli) kullanıcı sayısı")
+
+_buffers: "weakref.WeakSet[WriteBehindBuffer]" = weakref.WeakSet()
+
+
+def _copy_json(value):
+    """JSON benzeri değerin (iç içe dict/list) derin kopyası; diğer değerler paylaşılır."""
+    if isinstance(value, dict):
+        return {k: _copy_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_copy_json(v) for v in value]
+    return value
+
+
+class WriteBehindBuffer:
+    """
+    Değişiklikler kullanıcıyı kirli işaretler; arka plan thread'i kirli kullanıcıları flush_interval'de
+    bir ya da flush_threshold kullanıcıya ulaşınca tek partide (store.write_batch) yazar.
+    Context canlı dict olarak tutulur ve yazım anındaki son haliyle yazılır: aynı kullanıcının
+    ardışık değişiklikleri tek yazıma iner. mark_context'e kullanıcı kilidi verilirse kopya bu kilit
+    altında alınır; böylece başka bir thread'in yarım kalmış değişikliği (ya da serileştirme sırasında
+    değişen dict) diske gitmez.
+    """
+
+    def __init__(self, store: MemoryStore, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 flush_threshold: int = DEFAULT_FLUSH_THRESHOLD):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        # user_id -> (canlı context, kullanıcı kilidi ya da None)
+        self._contexts: Dict[str, Tuple[Dict[str, Any], Any]] = {}
+        self._cond = threading.Condition()
+        # Partiler alındıkları sırayla yazılsın
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="memory-flusher", daemon=True)
+        self._thread.start()
+        _buffers.add(self)
+
+    def dirty_count(self) -> int:
+        with self._cond:
+            return len(self._entries.keys() | self._contexts.keys())
+
+    def add_interaction(self, user_id: str, entry: Dict[str, Any]):
+        with self._cond:
+            self._entries.setdefault(user_id, []).append(entry)
+            self._wake_if_full()
+
+    def mark_context(self, user_id: str, context: Dict[str, Any], lock=None):
+        with self._cond:
+            self._contexts[user_id] = (context, lock)
+            self._wake_if_full()
+
+    def _wake_if_full(self):
+        if len(self._entries) + len(self._contexts) >= self.flush_threshold:
+            self._cond.notify()
+
+    def _take(self, user_ids: Optional[List[str]]):
+        with self._cond:
+            users = self._entries.keys() | self._contexts.keys()
+            if user_ids is not None:
+                users = [u for u in user_ids if u in users]
+            return [(u, self._entries.pop(u, []), self._contexts.pop(u, None)) for u in users]
+
+    def _requeue(self, taken):
+        with self._cond:
+            for user_id, entries, pending in taken:
+                self._entries[user_id] = entries + self._entries.get(user_id, [])
+                if pending is not None:
+                    self._contexts.setdefault(user_id, pending)
+
+    @staticmethod
+    def _snapshot(pending) -> Optional[Dict[str, Any]]:
+        if pending is None:
+            return None
+        context, lock = pending
+        if lock is None:
+            return context
+        with lock:
+            return _copy_json(context)
+
+    def flush(self, user_ids: Optional[List[str]] = None):
+        """Kirli kullanıcıları (ya da yalnız verilenleri) hemen yazar; yazım bitince döner."""
+        with self._write_lock:
+            taken = self._take(user_ids)
+            if not taken:
+                return
+            MEMORY_FLUSH_BATCH.observe(len(taken))
+            batch = [(user_id, entries, self._snapshot(pending)) for user_id, entries, pending in taken]
+            try:
+                self.store.write_batch(batch)
+            except Exception:
+                self._requeue(taken)
+                raise
+
+    def discard(self):
+        """Bekleyen yazımları atar (ör. clear() öncesi)."""
+        with self._write_lock:
+            self._take(None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[WARN] Bellek arka plan yazımı başarısız, tekrar denenecek: {e}")
+            if closed:
+                return
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+
+def flush_all(user_ids: Optional[List[str]] = None):
+    """Tüm geciktirilmiş yazım tamponlarını (ya da yalnız verilen kullanıcıları) boşaltır; kapanışta da çağrılır."""
+    for buffer in list(_buffers):
+        buffer.flush(user_ids)
+
+
+MEMORY_DIRTY_USERS.set_function(lambda: sum(b.dirty_count() for b in list(_buffers)))
+atexit.register(flush_all)
+
+
+def is_sqlite_path(path: str) -> bool:
+    return path.lower().endswith(SQLITE_SUFFIXES)
+
+
+_stores: Dict[str, MemoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: str, max_turns: int = 20, **options) -> MemoryStore:
+    """
+    Dosya yolu için ortak depo: aynı dosyaya yazan tüm AgentMemory örnekleri tek depoyu paylaşır.
+    Uzantı .db/.sqlite/.sqlite3 ise SQLite, aksi halde JSON snapshot + günlük kullanılır.
+    options (ör. fsync=True) yalnız depo ilk kez oluşturulurken kullanılır.
+    """
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            store_cls = SQLiteMemoryStore if is_sqlite_path(path) else JournalStore
+            _stores[key] = store_cls(path, max_turns=max_turns, **options)
+        return _stores[key]
+
+
+def migrate_json_to_sqlite(src: str, dst: str, max_turns: int = 20, replace: bool = False) -> Tuple[int, int]:
+    """agent_memory.json (+ günlük) içeriğini SQLite deposuna aktarır; (etkileşim, context anahtarı) sayısı döner."""
+    state = read_memory_state(src, max_turns)
+    store = SQLiteMemoryStore(dst, max_turns=max_turns)
+    try:
+        (existing,) = store._conn.execute("SELECT COUNT(*) FROM interactions").fetchone()
+        if existing and not replace:
+            raise ValueError(f"{dst} boş değil ({existing} etkileşim); üzerine yazmak için --replace")
+        interaction_rows = [
+            store._interaction_row(uid, entry)
+            for uid, entries in state["interactions"].items() for entry in entries
+        ]
+        context_rows = [row for uid, ctx in state["context"].items() for row in store._context_rows(uid, ctx)]
+        conn = store._conn
+        conn.execute("BEGIN")
+        try:
+            conn.execute("DELETE FROM interactions")
+            conn.execute("DELETE FROM context")
+            conn.execute("UPDATE user_versions SET version = version + 1")
+            conn.executemany(_INSERT_INTERACTION, interaction_rows)
+            conn.executemany("INSERT INTO context (user_id, key, value) VALUES (?, ?, ?)", context_rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        store.close()
+    return len(interaction_rows), len(context_rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="agent_memory.json içeriğini SQLite bellek deposuna aktarır.")
+    parser.add_argument("--src", default="agent_memory.json", help="JSON snapshot (yanındaki .journal da okunur)")
+    parser.add_argument("--dst", default="agent_memory.db", help="Hedef SQLite dosyası")
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--replace", action="store_true", help="Hedefteki mevcut kayıtları sil")
+    args = parser.parse_args()
+
+    n_interactions, n_context = migrate_json_to_sqlite(args.src, args.dst, args.max_turns, args.replace)
+    print(f"📄 {n_interactions} etkileşim, {n_context} context anahtarı -> {args.dst}")
+    print(f"Kullanmak için: AGENT_MEMORY_PATH={args.dst}")
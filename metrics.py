@@ -0,0 +1,197 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Saniye cinsinden varsayılan histogram kovaları (HTTP / LLM / araç gecikmeleri için)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} etiketleri {self.labelnames} olmalı, gelen: {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self) -> List[Tuple[Dict[str, str], Any]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), val) for key, val in items]
+
+    def expose(self) -> List[str]:
+        """Prometheus metin biçimi satırları (HELP/TYPE hariç)."""
+        return [f"{self.name}{_labels(labels)} {_number(val)}" for labels, val in self.samples()]
+
+
+class Counter(_Metric):
+    """
+    Süreç içi, etiketli ve thread-safe sayaç.
+    Örn. SUPERVISOR_GATE.inc(action="skip", reason="idle_state")
+    """
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """
+    Anlık değer. set_function() ile verilirse değer her okumada (scrape) hesaplanır;
+    fonksiyon etiketsiz gauge için sayı, etiketli gauge için {etiket demeti: değer} döner.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], Any]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Any]):
+        self._function = function
+
+    def value(self, **labels) -> float:
+        if self._function is not None and not self.labelnames:
+            return float(self._function())
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        if self._function is None:
+            return super().samples()
+        result = self._function()
+        if not self.labelnames:
+            return [({}, float(result))]
+        return [(dict(zip(self.labelnames, key)), float(val)) for key, val in result.items()]
+
+
+class Histogram(_Metric):
+    """
+    Kümülatif kovalı histogram. Örn.
+        with TOOL_LATENCY.time(tool="get_bill_info"): ...
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [kova sayaçları..., +Inf], toplam
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Tuple[Dict[str, str], Dict[str, Any]]]:
+        with self._lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        result = []
+        for key, (counts, total) in items:
+            cumulative, running = [], 0
+            for count in counts:
+                running += count
+                cumulative.append(running)
+            result.append((dict(zip(self.labelnames, key)), {
+                "buckets": dict(zip([*self.buckets, float("inf")], cumulative)),
+                "count": running,
+                "sum": total,
+            }))
+        return result
+
+    def expose(self) -> List[str]:
+        lines = []
+        for labels, state in self.samples():
+            for bound, count in state["buckets"].items():
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': _number(bound)})} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(state['sum'])}")
+            lines.append(f"{self.name}_count{_labels(labels)} {state['count']}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def snapshot() -> Dict[str, List[Tuple[Dict[str, str], Any]]]:
+    """Tüm metriklerin anlık görüntüsü (debug / API için)."""
+    return {metric.name: metric.samples() for metric in REGISTRY}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def render_prometheus() -> str:
+    """REGISTRY'deki tüm metrikleri Prometheus metin biçiminde (0.0.4) döner."""
+    lines = []
+    for metric in REGISTRY:
+        doc = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {doc}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        try:
+            lines.extend(metric.expose())
+        except Exception as e:
+            # Tek bir gauge fonksiyonunun hatası tüm scrape'i bozmasın
+            lines.append(f"# {metric.name} okunamadı: {_escape(str(e))}")
+    return "\n".join(lines) + "\n"
@@ -1,11 +1,101 @@
 import datetime
+import os
 import sqlite3
+import threading
 import uuid
 
+from tracing import TracedConnection
+
 DB_PATH = "alfai.db"
+# Havuzda boşta bekleyen en fazla bağlantı; yoğunlukta fazlası açılır, iade edilince kapatılır
+DB_POOL_SIZE = int(os.environ.get("ALFAI_DB_POOL_SIZE", "16"))
+# Bağlantı başına hazırlanmış ifade önbelleği, sayfa önbelleği (KiB) ve bellek eşlemeli okuma boyutu
+DB_CACHED_STATEMENTS = 128
+DB_CACHE_SIZE_KIB = 8 * 1024
+DB_MMAP_SIZE = 64 * 1024 * 1024
+
+
+class PooledConnection(TracedConnection):
+    """
+    Havuzdan verilen bağlantı. close() bağlantıyı kapatmaz: commit edilmemiş işlemi geri alır (eski
+    close() ile aynı sonuç) ve havuza iade eder. İkinci close() etkisizdir.
+    """
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        if self.in_transaction:
+            self.rollback()
+        self._pool.release(self)
+
+
+class _ConnectionPool:
+    """Bir veritabanı dosyası için boşta bekleyen bağlantılar (en fazla size adet, LIFO)."""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> PooledConnection:
+        # check_same_thread=False: bağlantı iade edildikten sonra başka bir thread'e verilebilir
+        conn = sqlite3.connect(self.path, factory=PooledConnection, check_same_thread=False,
+                               cached_statements=DB_CACHED_STATEMENTS)
+        # WAL: okumalar yazanı beklemez; NORMAL: WAL'da commit başına fsync yapılmaz
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn._pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        conn._released = False
+        return conn
+
+    def release(self, conn: PooledConnection):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        sqlite3.Connection.close(conn)
+
+    def close(self):
+        with self._lock:
+            # Kullanımdaki bağlantılar iade edildiğinde kapatılır
+            self.size = 0
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
 
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    # Havuzdan bağlantı (DB_PATH başına bir havuz); close() iade eder. TracedConnection: aktif bir iz
+    # varsa her sorgu "sqlite.query" span'i olarak kaydedilir
+    pool = _pools.get(DB_PATH)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(DB_PATH, _ConnectionPool(DB_PATH, DB_POOL_SIZE))
+    return pool.acquire()
+
+
+def close_connections():
+    """Havuzlardaki boşta bağlantıları kapatır (kapanış, testler)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
 
 
 def get_cancel_current_package(user_id):
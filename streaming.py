@@ -0,0 +1,164 @@
+"""
+Ajan yanıtlarını SSE (text/event-stream) ile akıtmak için yardımcılar.
+
+Olaylar:
+    supervisor  -> supervisor kararı
+    tool_start  -> araç çağrısı başladı
+    tool_end    -> araç çağrısı bitti
+    token       -> nihai yanıtın yeni parçası (<think> blokları ayıklanmış)
+    done        -> amain() sonucu (success/response/error)
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+_SENTINEL = object()
+
+
+def _held_suffix(buf: str, tag: str) -> int:
+    """buf'un sonunda tag'in başlangıcı olabilecek en uzun parçanın uzunluğu."""
+    lowered = buf.lower()
+    for size in range(min(len(tag) - 1, len(buf)), 0, -1):
+        if tag.startswith(lowered[-size:]):
+            return size
+    return 0
+
+
+class ThinkStripper:
+    """
+    <think>...</think> bloklarını parça parça gelen metinden ayıklar.
+    Etiket parçalar arasında bölünse bile doğru çalışır; kapanmayan blok atılır (_strip_think ile aynı).
+    """
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self._buf = ""
+        self._in_think = False
+
+    def feed(self, chunk: str) -> str:
+        self._buf += chunk or ""
+        out = []
+        while True:
+            tag = self.CLOSE if self._in_think else self.OPEN
+            idx = self._buf.lower().find(tag)
+            if idx >= 0:
+                if not self._in_think:
+                    out.append(self._buf[:idx])
+                self._buf = self._buf[idx + len(tag):]
+                self._in_think = not self._in_think
+                continue
+            hold = _held_suffix(self._buf, tag)
+            if not self._in_think:
+                out.append(self._buf[:len(self._buf) - hold])
+            self._buf = self._buf[len(self._buf) - hold:] if hold else ""
+            return "".join(out)
+
+    def flush(self) -> str:
+        rest = "" if self._in_think else self._buf
+        self._buf = ""
+        self._in_think = False
+        return rest
+
+
+class FinalAnswerFilter:
+    """ReAct çıktısında yalnızca 'Final Answer:' sonrasını geçirir; her LLM çağrısında sıfırlanır."""
+
+    def __init__(self, marker: str = FINAL_ANSWER_MARKER):
+        self.marker = marker
+        self._buf = ""
+        self._found = False
+        self._started = False
+
+    def feed(self, text: str) -> str:
+        if self._found:
+            out = text
+        else:
+            self._buf += text
+            idx = self._buf.find(self.marker)
+            if idx < 0:
+                return ""
+            self._found = True
+            out = self._buf[idx + len(self.marker):]
+            self._buf = ""
+        if not self._started:
+            out = out.lstrip()
+            self._started = bool(out)
+        return out
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class StreamEventHandler(BaseCallbackHandler):
+    """
+    amain() içinden gelen olayları ve LangChain callback'lerini loop'taki bir asyncio kuyruğuna yazar;
+    API tarafı aiter_sse() ile kuyruğu SSE olarak akıtır. Callback'ler hangi thread'den gelirse gelsin
+    (araç executor'ları, to_thread) call_soon_threadsafe ile loop'a geçer.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._aqueue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._think = ThinkStripper()
+        self._final = FinalAnswerFilter()
+        self._tool_names: Dict[UUID, str] = {}
+        self.streamed_text = ""
+
+    # --- amain() tarafı ---
+    def _put(self, item: Any):
+        self._loop.call_soon_threadsafe(self._aqueue.put_nowait, item)
+
+    def emit(self, event: str, data: Any):
+        self._put((event, data))
+
+    def emit_text(self, text: str):
+        if text:
+            self.streamed_text += text
+            self.emit("token", {"text": text})
+
+    def finish(self, result: Dict[str, Any]):
+        self.emit("done", result)
+        self._put(_SENTINEL)
+
+    async def aiter_sse(self) -> AsyncIterator[str]:
+        while True:
+            item = await self._aqueue.get()
+            if item is _SENTINEL:
+                return
+            event, data = item
+            yield sse_event(event, data)
+
+    # --- LangChain callback'leri ---
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._think = ThinkStripper()
+        self._final = FinalAnswerFilter()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        self.emit_text(self._final.feed(self._think.feed(token)))
+
+    def on_llm_end(self, response, **kwargs):
+        self.emit_text(self._final.feed(self._think.flush()))
+
+    def on_agent_finish(self, finish, **kwargs):
+        # Terminal araçla biten turda "Final Answer" tokenı akmaz; şablon yanıtını tek parça gönder
+        if not self.streamed_text:
+            self.emit_text((finish.return_values or {}).get("output", ""))
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or ""
+        self._tool_names[run_id] = name
+        self.emit("tool_start", {"tool": name, "input": input_str})
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        name = self._tool_names.pop(run_id, kwargs.get("name", ""))
+        success = output.get("success") if isinstance(output, dict) else None
+        self.emit("tool_end", {"tool": name, "success": success})
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs):
+        name = self._tool_names.pop(run_id, kwargs.get("name", ""))
+        self.emit("tool_end", {"tool": name, "success": False, "error": str(error)})
@@ -0,0 +1,111 @@
+"""
+Uzun oturumlarda eski turların arka planda özetlenmesi.
+
+AgentMemory.end_turn(), özetlenmemiş geçmiş summary_trigger_tokens'ı aşınca kullanıcıyı
+BackgroundSummarizer kuyruğuna ekler; özet istek yolunun dışında, tek bir arka plan thread'inde üretilir.
+Thread AgentMemory.summarize_user() ile en yeni summary_keep_recent etkileşim hariç özetlenmemiş
+turları alır, önceki özetle birlikte LLM'e ("summary" profili) katlatır ve sonucu kullanıcının
+context'ine ("conversation_summary") yazar. load_memory_variables geçmişi "Özet: ..." satırı ve
+özetten sonraki turlar olarak verir.
+
+    summarizer = BackgroundSummarizer(llm_summarizer(make_llm("summary", model=...)))
+    memory.attach_summarizer(summarizer)
+"""
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from metrics import Counter, Histogram
+
+SUMMARY_PROMPT = """Aşağıda bir çağrı merkezi asistanı ile müşteri arasındaki konuşmanın önceki özeti ve
+ardından gelen turlar var. Bunları tek bir kısa özette birleştir (en fazla 5 madde, Türkçe).
+Korunması gerekenler: müşterinin talepleri, verilen bilgiler (tutar, tarih, paket adı gibi),
+tamamlanan işlemler ve yarım kalan / askıya alınan görevler. Selamlaşma ve tekrarları atla.
+Yalnızca özeti yaz.
+
+Önceki özet:
+{previous}
+
+Yeni turlar:
+{turns}
+
+Özet:"""
+
+_THINK_RE = re.compile(r"<think>.*?(?:</think>|$)", re.DOTALL | re.IGNORECASE)
+
+MEMORY_SUMMARIES = Counter(
+    "memory_summaries_total", "Arka plan özetleme işleri (done, skipped, failed)", ("outcome",)
+)
+MEMORY_SUMMARY_SECONDS = Histogram(
+    "memory_summary_duration_seconds",
+    "Bir kullanıcının eski turlarının özetlenme süresi (LLM dahil)",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+Summarize = Callable[[str, List[Dict[str, Any]]], str]
+
+
+def format_turns(entries: List[Dict[str, Any]]) -> str:
+    return "\n".join(f"{e['role'].capitalize()}: {e['message']}" for e in entries)
+
+
+def llm_summarizer(llm) -> Summarize:
+    """(önceki özet, yeni etkileşimler) -> yeni özet; LangChain LLM'i ile."""
+    def summarize(previous: str, entries: List[Dict[str, Any]]) -> str:
+        prompt = SUMMARY_PROMPT.format(previous=previous or "(yok)", turns=format_turns(entries))
+        return _THINK_RE.sub("", llm.invoke(prompt)).strip()
+    return summarize
+
+
+class BackgroundSummarizer:
+    """
+    Özetleme kuyruğu. Aynı kullanıcı kuyruktayken tekrar eklenmez; işler tek thread'de sırayla yapılır,
+    böylece LLM'e aynı anda en fazla bir özet isteği gider ve istek yolu hiç beklemez.
+    """
+
+    def __init__(self, summarize: Summarize):
+        self.summarize = summarize
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="memory-summarizer", daemon=True)
+        self._thread.start()
+
+    def schedule(self, memory, user_id: str) -> bool:
+        with self._lock:
+            if (id(memory), user_id) in self._pending:
+                return False
+            self._pending.add((id(memory), user_id))
+        self._queue.put((memory, user_id))
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            memory, user_id = job
+            with self._lock:
+                self._pending.discard((id(memory), user_id))
+            start = time.perf_counter()
+            try:
+                done = memory.summarize_user(user_id, self.summarize)
+                MEMORY_SUMMARIES.inc(outcome="done" if done else "skipped")
+                if done:
+                    MEMORY_SUMMARY_SECONDS.observe(time.perf_counter() - start)
+            except Exception as e:
+                MEMORY_SUMMARIES.inc(outcome="failed")
+                print(f"[WARN] Konuşma özeti üretilemedi ({user_id}): {e}")
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        """Kuyruktaki tüm işler bitene kadar bekler (kapanış, benchmark)."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
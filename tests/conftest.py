@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from memory import AgentMemory  # noqa: E402
+
+
+@pytest.fixture
+def make_memory(tmp_path):
+    """Geçici dizine yazan AgentMemory üretir; test sonunda arka plan işleri kapatılır."""
+    created = []
+
+    def _make(**kwargs):
+        kwargs.setdefault("save_path", str(tmp_path / "agent_memory.json"))
+        kwargs.setdefault("durability", "async")
+        mem = AgentMemory(**kwargs)
+        created.append(mem)
+        return mem
+
+    yield _make
+    for mem in created:
+        if mem._buffer is not None:
+            mem._buffer.close()
+        mem._store.close()
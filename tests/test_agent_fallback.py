@@ -0,0 +1,98 @@
+import re
+from typing import List, Optional
+
+import pytest
+from langchain.tools import StructuredTool
+from langchain_core.language_models.llms import LLM
+
+import agent_runner
+from tool_registry import UserId
+
+_OBSERVATION_RE = re.compile(r"Observation: (.+)")
+
+
+class ScriptedLLM(LLM):
+    """Gözlem yoksa `action` aracını çağırır; gözlem görünce onu nihai yanıt olarak döner."""
+    action: str
+    finish: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        observed = _OBSERVATION_RE.findall(prompt.split("Question:")[-1])
+        if observed and self.finish and "not a valid tool" not in observed[-1]:
+            return f"Final Answer: {observed[-1]}"
+        return f"Action: {self.action}\nAction Input: {{}}"
+
+
+@pytest.fixture
+def runner(monkeypatch, make_memory):
+    monkeypatch.setattr(agent_runner, "memory", make_memory())
+    agent_runner.clear_agent_cache()
+    yield agent_runner
+    agent_runner.clear_agent_cache()
+
+
+def _register_probe(runner, monkeypatch, description="Test aracı."):
+    probe = StructuredTool.from_function(name="echo_probe", description=description,
+                                         func=lambda user_id: f"probe-ok {user_id}", args_schema=UserId)
+    monkeypatch.setattr(runner, "tool_registry", runner.tool_registry + [probe])
+
+
+def _run(runner, tool_names):
+    agent = runner.get_agent(tool_names=tool_names)
+    inputs = {"input": "[user_id:user123] kampanyalar", "user_id": "user123"}
+    with runner.user_context("user123"):
+        return runner._invoke_agent(agent, inputs, None, None)
+
+
+def test_tools_registered_later_are_selectable(runner, monkeypatch):
+    message = "Uydu telefonu hattımı yurt dışında açtırmak istiyorum"
+    assert "echo_probe" not in (runner.select_tool_names(message, ("", 0.0)) or [])
+    _register_probe(runner, monkeypatch, description="Uydu telefonu hattını yurt dışında açar.")
+    assert "echo_probe" in {t.name for t in runner.get_tools()}
+    assert "echo_probe" in runner.select_tool_names(message, runner.classify_intent(message))
+
+
+def test_tool_outside_subset_retries_with_all_tools(runner, monkeypatch):
+    monkeypatch.setattr(runner, "llm", ScriptedLLM(action="echo_probe"))
+    _register_probe(runner, monkeypatch)
+
+    before = runner.AGENT_FALLBACK.value(reason="invalid_tool")
+    out = _run(runner, ["get_user_info"])
+    assert out == {"success": True, "response": "probe-ok user123"}
+    assert runner.AGENT_FALLBACK.value(reason="invalid_tool") == before + 1
+
+
+def test_react_step_is_never_returned_as_answer(runner, monkeypatch):
+    monkeypatch.setattr(runner, "llm", ScriptedLLM(action="no_such_tool", finish=False))
+    out = _run(runner, None)
+    assert out["success"] is False
+    assert "Action" not in out.get("error", "")
+    assert runner.memory.get_raw_interactions("user123", 10) == []
+
+
+class RecordingLLM(ScriptedLLM):
+    prompts: List[str] = []
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        self.prompts.append(prompt)
+        return "Final Answer: tamam"
+
+
+def test_memory_history_and_summary_reach_the_prompt(runner, monkeypatch):
+    llm = RecordingLLM(action="", prompts=[])
+    monkeypatch.setattr(runner, "llm", llm)
+    mem = runner.memory
+    mem.set_context("user123", "conversation_summary", {"text": "fatura itirazı açıldı", "seq": 0})
+    mem.add_interaction("user123", role="human", message="itirazım ne durumda")
+    mem.add_interaction("user123", role="ai", message="inceleniyor")
+    mem.set_context("user123", "current_intent", "fatura_itirazi")
+
+    assert _run(runner, None) == {"success": True, "response": "tamam"}
+    (prompt,) = llm.prompts
+    assert "Özet: fatura itirazı açıldı\nAi: inceleniyor" in prompt
+    assert '"current_intent": "fatura_itirazi"' in prompt
+    assert prompt.rstrip().endswith("Question: [user_id:user123] kampanyalar\nThought:")
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+from typing import List, Optional
+
+from langchain_core.language_models.llms import LLM
+
+import agent_runner
+from memory import AgentMemory
+
+
+class FinalAnswerLLM(LLM):
+    @property
+    def _llm_type(self) -> str:
+        return "final-answer-fake"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+        return "Final Answer: Size nasıl yardımcı olabilirim?"
+
+
+def test_async_turn_keeps_memory_work_off_the_event_loop(monkeypatch, make_memory):
+    monkeypatch.setattr(agent_runner, "memory", make_memory())
+    monkeypatch.setattr(agent_runner, "llm", FinalAnswerLLM())
+    agent_runner.clear_agent_cache()
+    threads = []
+    for name in ("set_context", "get_context", "add_interaction", "format_history"):
+        original = getattr(AgentMemory, name)
+
+        def recorded(self, *args, _original=original, **kwargs):
+            threads.append(threading.get_ident())
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(AgentMemory, name, recorded)
+
+    async def _turn():
+        with agent_runner.user_context("user123"):
+            result = await agent_runner._arun_turn("user123", "Merhaba, bir sorum var", None)
+        return result, threading.get_ident()
+
+    try:
+        result, loop_thread = asyncio.run(_turn())
+    finally:
+        agent_runner.clear_agent_cache()
+    assert result == {"success": True, "response": "Size nasıl yardımcı olabilirim?"}
+    assert threads and loop_thread not in threads
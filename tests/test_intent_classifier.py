@@ -0,0 +1,23 @@
+from agent_runner import TOOL_TO_INTENT
+from intent_classifier import calibrate_threshold, load_or_train
+
+
+def test_calibrated_threshold_meets_target_precision():
+    held_out = [(0.99, True), (0.98, True), (0.97, False), (0.96, True), (0.95, True),
+                (0.94, True), (0.93, True), (0.9, False), (0.8, False)]
+    threshold = calibrate_threshold(held_out, target_precision=0.85, min_support=2)
+    assert threshold == 0.93
+    covered = [ok for confidence, ok in held_out if confidence >= threshold]
+    assert sum(covered) / len(covered) >= 0.85
+
+
+def test_no_threshold_when_target_is_unreachable():
+    held_out = [(0.99, False), (0.9, True), (0.8, True)]
+    assert calibrate_threshold(held_out, target_precision=0.95, min_support=1) is None
+
+
+def test_missing_model_is_trained_in_memory_without_writing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    model = load_or_train(TOOL_TO_INTENT, model_path=str(tmp_path / "intent_model.json"))
+    assert model.predict("Faturamı ödemek istiyorum")[0]
+    assert list(tmp_path.iterdir()) == []
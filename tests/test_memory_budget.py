@@ -0,0 +1,76 @@
+import json
+
+from memory import estimate_tokens
+
+
+def test_history_keeps_newest_lines_within_budget(make_memory):
+    mem = make_memory(history_token_budget=0)
+    for i in range(10):
+        mem.add_interaction("u1", role="human", message=f"mesaj {i}")
+    # Her satır "Human: mesaj N" (5 token) + satır sonu
+    assert mem.format_history("u1", max_tokens=13) == "Human: mesaj 8\nHuman: mesaj 9"
+    assert mem.format_history("u1", max_tokens=11) == "Human: mesaj 9"
+    assert mem.format_history("u1").count("\n") == 9
+
+
+def test_oversized_newest_line_is_truncated(make_memory):
+    mem = make_memory(history_token_budget=0)
+    mem.add_interaction("u1", role="human", message="kısa")
+    mem.add_interaction("u1", role="ai", message="x" * 300)
+    text = mem.format_history("u1", max_tokens=10)
+    assert text.startswith("Ai: xxx") and text.endswith("…")
+    assert estimate_tokens(text) <= 10
+
+
+def test_agent_state_fits_budget_in_priority_order(make_memory):
+    mem = make_memory()
+    mem.set_context("u1", "current_intent", "fatura_sorgulama")
+    mem.set_context("u1", "completed_intents", [f"niyet_{i}" for i in range(40)])
+    for i in range(8):
+        mem.add_tool_output("u1", "get_bill_info", {"ay": f"2025-{i + 1:02d}", "tutar": 100 + i})
+    full = json.loads(mem.format_agent_state("u1"))
+
+    for budget in (5, 20, 60, 120, 400):
+        text = mem.format_agent_state("u1", max_tokens=budget)
+        assert estimate_tokens(text) <= budget
+        state = json.loads(text)
+        if budget >= 20:
+            assert state["current_intent"] == "fatura_sorgulama"
+        for key, value in state.items():
+            # Listelerde en yeni öğeler tutulur
+            if isinstance(value, list) and value:
+                assert full[key][-len(value):] == value
+    # Tool çıktıları tamamlanan niyetlerden önce doldurulur
+    state = json.loads(mem.format_agent_state("u1", max_tokens=400))
+    assert state["tool_outputs"] == full["tool_outputs"]
+    assert 0 < len(state["completed_intents"]) < 40
+    assert json.loads(mem.format_agent_state("u1", max_tokens=10000)) == full
+
+
+def test_agent_state_cache_follows_context_changes(make_memory):
+    mem = make_memory()
+    mem.set_context("u1", "current_intent", "fatura_sorgulama")
+    assert json.loads(mem.format_agent_state("u1", max_tokens=50))["current_intent"] == "fatura_sorgulama"
+    mem.set_context("u1", "current_intent", "paket_degisikligi")
+    assert json.loads(mem.format_agent_state("u1", max_tokens=50))["current_intent"] == "paket_degisikligi"
+
+
+def test_budgets_bound_the_agent_prompt(make_memory):
+    import agent_runner
+
+    mem = make_memory(max_turns=200, history_token_budget=100, state_token_budget=60)
+    for i in range(100):
+        mem.add_interaction("u1", role="human", message=f"faturam neden yüksek geldi, soru {i}")
+    mem.set_context("u1", "completed_intents", [f"niyet_{i}" for i in range(40)])
+    prompt = agent_runner.get_agent().agent.llm_chain.prompt
+
+    def memory_section():
+        text = prompt.format(input="", agent_scratchpad="", **mem.load_memory_variables({"user_id": "u1"}))
+        return text.split("Konuşma geçmişi:\n", 1)[1].split("\n\nBegin!", 1)[0]
+
+    bounded = memory_section()
+    assert "soru 99" in bounded
+    # Başlıklar ve ayraçlar dışında geçmiş + durum bütçeyi aşmaz
+    assert estimate_tokens(bounded) <= 100 + 60 + 10
+    mem.history_token_budget = mem.state_token_budget = 0
+    assert estimate_tokens(memory_section()) > 10 * estimate_tokens(bounded)
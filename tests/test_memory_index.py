@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+WORDS = ["Fatura", "faturam", "ödeme", "İnternet", "paket", "hata", "kampanya", "a", "Bİ", "ışık"]
+KEYWORDS = WORDS + ["fat", "A B", "", "ödeme fat", " x"]
+
+
+def _scan_keywords(history, keywords):
+    return [kw for entry in history for kw in keywords if kw.lower() in entry["message"].lower()]
+
+
+def _check(mem, rng):
+    history = mem.get_raw_interactions("u", 1000)
+    keywords = rng.sample(KEYWORDS, 3)
+    assert mem.find_keywords_in_history("u", keywords) == _scan_keywords(history, keywords), keywords
+    for tool in ("t1", "t2", "t3"):
+        used = [e for e in history if (e.get("metadata") or {}).get("tool") == tool]
+        assert mem.get_interactions_by_tool("u", tool) == used
+        assert mem.has_used_tool("u", tool) == bool(used)
+    errors = [e["message"] for e in reversed(history) if e.get("type") == "tool_error"]
+    assert mem.get_recent_errors("u", 2) == errors[:2]
+    assert mem.get_last_tool_error("u") == (errors[0] if errors else "")
+
+
+@pytest.mark.parametrize("suffix", [".json", ".db"])
+@pytest.mark.parametrize("seed", range(4))
+def test_index_matches_linear_scans(make_memory, tmp_path, seed, suffix):
+    """İndeksli sorgular, pencere kayarken ve oturum yeniden yüklenirken doğrusal taramayla aynı sonucu verir."""
+    rng = random.Random(seed)
+    mem = make_memory(save_path=str(tmp_path / f"m{seed}{suffix}"), max_turns=rng.choice([3, 7, 20]))
+    for _ in range(300):
+        message = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 5)))
+        metadata = {"tool": rng.choice(["t1", "t2"])} if rng.random() < 0.5 else None
+        mem.add_interaction("u", "human", message, type=rng.choice(["message", "tool", "tool_error"]),
+                            metadata=metadata)
+        if rng.random() < 0.3:
+            _check(mem, rng)
+        if rng.random() < 0.05:
+            # Oturum bırakılır; indeks depodan yüklenen pencereyle yeniden kurulur
+            mem.load()
+    _check(mem, rng)
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from memory import MEMORY_SESSION_EVICTIONS
+
+
+def _run_threads(target, n):
+    threads = [threading.Thread(target=target, args=(k,)) for k in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+@pytest.mark.parametrize("filename", ["agent_memory.json", "agent_memory.db"])
+def test_concurrent_users_lose_no_writes_under_eviction(make_memory, tmp_path, filename):
+    """Farklı kullanıcılar paralel yazarken oturumlar sürekli tahliye edilse de hiçbir yazım kaybolmaz."""
+    mem = make_memory(save_path=str(tmp_path / filename), max_turns=200, max_sessions=2)
+
+    def worker(k):
+        user_id = f"u{k % 4}"
+        for i in range(40):
+            mem.add_interaction(user_id, role="human", message=f"{k}:{i}")
+            mem.set_context(user_id, f"son_{k}", i)
+
+    _run_threads(worker, 8)
+    assert mem.resident_sessions() <= 2
+
+    mem.load()
+    for u in range(4):
+        messages = [e["message"] for e in mem.get_raw_interactions(f"u{u}", 1000)]
+        for k in (u, u + 4):
+            # Aynı thread'in yazımları sırasını korur
+            assert [m for m in messages if m.startswith(f"{k}:")] == [f"{k}:{i}" for i in range(40)]
+            assert mem.get_context(f"u{u}", f"son_{k}") == 39
+
+
+def test_same_user_writes_are_serialized(make_memory):
+    mem = make_memory(max_turns=1000)
+    _run_threads(lambda k: [mem.add_interaction("u1", role="human", message=str(k)) for _ in range(50)], 8)
+    assert len(mem.get_raw_interactions("u1", 1000)) == 400
+
+
+def test_lru_eviction_reloads_from_store(make_memory):
+    mem = make_memory(max_sessions=2)
+    before = MEMORY_SESSION_EVICTIONS.value(reason="lru")
+    for u in range(5):
+        mem.add_interaction(f"u{u}", role="human", message=f"merhaba {u}")
+        mem.set_context(f"u{u}", "current_intent", "fatura")
+    assert mem.resident_sessions() == 2
+    assert MEMORY_SESSION_EVICTIONS.value(reason="lru") - before == 3
+    # Tahliye edilen kullanıcı ilk erişimde depodan yüklenir
+    assert mem.format_history("u0") == "Human: merhaba 0"
+    assert mem.get_context("u0", "current_intent") == "fatura"
+
+
+def test_ttl_eviction_keeps_pending_writes(make_memory):
+    mem = make_memory(session_ttl=0)
+    mem.add_interaction("u1", role="human", message="fatura")
+    assert mem.evict_idle_sessions() == 1
+    assert mem.resident_sessions() == 0
+    # Okuma kayıt oluşturmaz, yazılmamış değişiklik de kaybolmaz
+    assert mem.get_context("u2", "current_intent") is None
+    assert [e["message"] for e in mem.get_raw_interactions("u1")] == ["fatura"]
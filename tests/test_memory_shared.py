@@ -0,0 +1,61 @@
+import pytest
+
+from memory import MEMORY_SESSION_REFRESHES, MEMORY_VERSION_CONFLICTS
+from memory_store import SQLiteMemoryStore
+
+
+@pytest.fixture
+def shared(make_memory, tmp_path):
+    """Paylaşımlı bellek ve aynı dosyaya kendi bağlantısıyla yazan ikinci bir süreç yerine geçen depo."""
+    path = str(tmp_path / "agent_memory.db")
+    mem = make_memory(save_path=path, shared=True, durability="sync")
+    other = SQLiteMemoryStore(path)
+    yield mem, other
+    other.close()
+
+
+def _external_write(store, user_id, key, value):
+    version, loaded = store.load_user_versioned(user_id)
+    ctx = loaded[1] if loaded else {}
+    ctx[key] = value
+    return store.commit_user(user_id, [{"role": "human", "message": f"{key}={value}", "type": "message"}],
+                             ctx, version)
+
+
+def test_external_write_is_visible(shared):
+    mem, other = shared
+    mem.set_context("u1", "current_intent", "fatura")
+    before = MEMORY_SESSION_REFRESHES.value()
+    _external_write(other, "u1", "current_intent", "paket")
+    assert mem.get_context("u1", "current_intent") == "paket"
+    assert mem.format_history("u1") == "Human: current_intent=paket"
+    assert MEMORY_SESSION_REFRESHES.value() - before == 1
+
+
+def test_version_conflict_is_retried_on_fresh_state(shared, monkeypatch):
+    mem, other = shared
+    mem.set_context("u1", "a", 1)
+    commit = mem._store.commit_user
+    calls = []
+
+    def racing_commit(*args):
+        # İlk yazımdan hemen önce başka bir süreç kullanıcıyı değiştirir
+        if not calls:
+            _external_write(other, "u1", "b", 2)
+        calls.append(args)
+        return commit(*args)
+
+    monkeypatch.setattr(mem._store, "commit_user", racing_commit)
+    before = MEMORY_VERSION_CONFLICTS.value()
+    mem.set_context("u1", "c", 3)
+    assert len(calls) == 2
+    assert MEMORY_VERSION_CONFLICTS.value() - before == 1
+    # Yeniden deneme güncel durumla çalıştı: iki sürecin yazımı da korunur
+    mem.load()
+    assert [mem.get_context("u1", key) for key in "abc"] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("filename, durability", [("agent_memory.json", "sync"), ("agent_memory.db", "async")])
+def test_shared_mode_requires_sqlite_and_sync(make_memory, tmp_path, filename, durability):
+    with pytest.raises(ValueError):
+        make_memory(save_path=str(tmp_path / filename), shared=True, durability=durability)
@@ -0,0 +1,49 @@
+import pytest
+
+from memory import _entry_seqs
+
+
+def _turn(mem, human, ai):
+    mem.add_interaction("u1", role="human", message=human)
+    mem.add_interaction("u1", role="ai", message=ai)
+
+
+@pytest.mark.parametrize("filename", ["agent_memory.json", "agent_memory.db"])
+def test_repeated_turns_after_summary_stay_in_prompt(make_memory, tmp_path, filename):
+    mem = make_memory(save_path=str(tmp_path / filename), summary_keep_recent=2, history_token_budget=0)
+    for _ in range(4):
+        _turn(mem, "evet", "Tamam")
+    assert mem.summarize_user("u1", lambda previous, entries: f"{len(entries)} etkileşim özetlendi")
+
+    _turn(mem, "faturam ne kadar", "450 TL")
+    for _ in range(2):
+        _turn(mem, "evet", "Tamam")
+    expected = "\n".join([
+        "Özet: 6 etkileşim özetlendi",
+        "Human: evet", "Ai: Tamam",
+        "Human: faturam ne kadar", "Ai: 450 TL",
+        "Human: evet", "Ai: Tamam", "Human: evet", "Ai: Tamam",
+    ])
+    assert mem.format_history("u1") == expected
+
+    # Sıra numaraları depoya yazılır; yeniden yüklenen oturum aynı sınırı bulur
+    mem.load()
+    assert mem.format_history("u1") == expected
+
+
+def test_summary_boundary_survives_window_eviction(make_memory):
+    mem = make_memory(max_turns=6, summary_keep_recent=2, history_token_budget=0)
+    for i in range(3):
+        _turn(mem, "evet", f"Tamam {i}")
+    assert mem.summarize_user("u1", lambda previous, entries: "özet")
+    # Özetlenen etkileşimlerin hepsi pencereden düşer
+    for i in range(3):
+        _turn(mem, "evet", "Tamam")
+    assert mem.format_history("u1") == "Özet: özet\n" + "\n".join(["Human: evet", "Ai: Tamam"] * 3)
+
+
+def test_legacy_entries_are_numbered_back_from_the_first_sequenced_entry():
+    history = [{"message": "a"}, {"message": "b"}, {"message": "c", "seq": 7}, {"message": "d", "seq": 8}]
+    assert _entry_seqs(history) == [5, 6, 7, 8]
+    assert _entry_seqs(history[1:]) == [6, 7, 8]
+    assert _entry_seqs([{"message": "a"}, {"message": "b"}]) == [0, 1]
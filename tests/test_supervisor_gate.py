@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import agent_runner
+
+CONFIDENT = agent_runner.INTENT_CONFIDENCE_THRESHOLD
+
+
+class FakePolicyLLM:
+    def __init__(self, decision: dict):
+        self.decision = decision
+        self.prompts = []
+
+    def invoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return json.dumps(self.decision)
+
+
+@pytest.fixture
+def runner(monkeypatch, make_memory):
+    monkeypatch.setattr(agent_runner, "memory", make_memory())
+    policy = FakePolicyLLM({"decision": "ContextSwitch", "detected_new_intent": "paket_degisikligi"})
+    monkeypatch.setattr(agent_runner, "policy_llm", policy)
+    with agent_runner.user_context("user123"):
+        yield agent_runner, policy
+
+
+def _turn(runner, prediction):
+    runner._start_turn("user123")
+    return runner.run_supervisor("mesaj", prediction=prediction)
+
+
+def test_idle_state_skips_the_llm(runner):
+    runner, policy = runner
+    assert _turn(runner, ("", 0.2))["notes"] == "skipped:idle_state"
+    assert policy.prompts == []
+    assert runner.memory.get_context("user123", "current_task") == "giris"
+
+
+def test_live_task_lets_the_supervisor_call_through(runner):
+    runner, policy = runner
+    before = runner.SUPERVISOR_GATE.value(action="call", reason="active_state")
+    # Güvenli tahmin boştaki kullanıcıda görevi LLM'siz başlatır
+    assert _turn(runner, ("fatura_bilgisi", CONFIDENT))["decision"] == "NoChange"
+    assert policy.prompts == []
+    assert runner.memory.get_context("user123", "current_task") == "fatura_bilgisi"
+
+    # Sonraki turda görev korunur; düşük güvenli mesajda karar LLM'e sorulur
+    decision = _turn(runner, ("", 0.3))
+    assert decision["decision"] == "ContextSwitch"
+    assert len(policy.prompts) == 1 and "current_task=fatura_bilgisi" in policy.prompts[0]
+    assert runner.SUPERVISOR_GATE.value(action="call", reason="active_state") == before + 1
+    runner._apply_decision("user123", decision, None)
+    assert runner.memory.get_context("user123", "current_task") == "paket_degisikligi"
+    assert runner.memory.get_context("user123", "suspended_task") == "fatura_bilgisi"
+
+
+def test_classifier_switch_suspends_the_running_task(runner):
+    runner, policy = runner
+    _turn(runner, ("fatura_bilgisi", CONFIDENT))
+    decision = _turn(runner, ("kampanya_bilgisi", CONFIDENT))
+    runner._apply_decision("user123", decision, None)
+    assert decision["decision"] == "ContextSwitch"
+    assert policy.prompts == []
+    assert runner.memory.get_context("user123", "current_task") == "kampanya_bilgisi"
+    assert runner.memory.get_context("user123", "suspended_task") == "fatura_bilgisi"
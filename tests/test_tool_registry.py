@@ -0,0 +1,24 @@
+import json
+import os
+
+from conftest import ROOT
+from tool_registry import TOOL_METADATA, is_terminal_tool, render_tool_result
+
+
+def _plans():
+    with open(os.path.join(ROOT, "scenarios.json"), "r", encoding="utf-8") as f:
+        return [[step["tool"] for step in sc.get("tool_chain_plan", [])] for sc in json.load(f)]
+
+
+def test_terminal_tools_only_end_plans():
+    # Terminal araç döngüyü bitirir; bir planın ortasında yer alırsa sonraki adımlar hiç çalışmaz
+    for plan in _plans():
+        assert not [tool for tool in plan[:-1] if is_terminal_tool(tool)], plan
+
+
+def test_read_tools_keep_fast_path_templates():
+    for name in ("get_bill_info", "get_line_status", "get_outstanding_balance", "get_package_information"):
+        assert not is_terminal_tool(name)
+        assert TOOL_METADATA[name]["response_template"]
+    assert render_tool_result("get_line_status", {"success": True, "data": "Hattınız aktif."}) == \
+        "Hattınız aktif. Başka bir konuda yardımcı olabilir miyim?"
@@ -173,24 +173,31 @@ def get_campaigns(user_id:str):
 
 
 #Araç kaydı: StructuredTool.from_function(...) ile fonksiyonları sarmalayıp lc_tools listesine koyma
+# metadata["return_direct"]: araç BAŞARILI dönerse ReAct döngüsü burada biter, yanıt
+# metadata["response_template"] ile sonuç sözlüğünden üretilir (ek LLM turu yok). Başarısızsa ajan devam eder.
+# Yalnızca planın son adımı olan işlem araçları terminaldir; sorgu araçlarından sonra (ör. get_line_status ->
+# create_support_ticket) ajan devam edebilmeli. Sorgu araçlarının şablonu hızlı yol içindir (render_tool_result).
 tool_registry = [
     StructuredTool.from_function(
         name = "get_package_information",
         description = "Kullanıcının mevcut paket bilgisini verir.",
         func = get_package_information,
         args_schema = UserId,
+        metadata = {"response_template": "{data}. Paketinizle ilgili başka bir işlem yapmak ister misiniz?"},
     ),
     StructuredTool.from_function(
         name = "cancel_current_package",
         description = "Mevcut paketi iptal eder.",
         func = cancel_current_package,
         args_schema = UserId,
+        metadata = {"return_direct": True, "response_template": "{data}. Başka bir konuda yardımcı olabilir miyim?"},
     ),
     StructuredTool.from_function(
         name = "get_bill_info",
         description = "Kullanıcının belirli aya ait fatura bilgisini alır.",
         func = get_bill_info,
         args_schema = UserIdMonth,
+        metadata = {"response_template": "{data}. Faturanızla ilgili başka bir sorunuz var mı?"},
     ),
     StructuredTool.from_function(
         name = "get_user_info",
@@ -203,6 +210,7 @@ tool_registry = [
         description = "Kullanıcıyı yeni pakete geçirir. Paket değişikliği yapar.",
         func = initiate_package_change,
         args_schema = UserIdPackageId,
+        metadata = {"return_direct": True, "response_template": "{data[message]} Başka bir konuda yardımcı olabilir miyim?"},
     ),
     StructuredTool.from_function(
         name = "get_available_packages",
@@ -221,18 +229,21 @@ tool_registry = [
         description = "Kullanıcının sistemle veya paketlerle ilgili geri bildirimini kaydeder.",
         func = submit_feedback,
         args_schema = UserIdFeedback,
+        metadata = {"return_direct": True, "response_template": "{message}. Geri bildiriminiz için teşekkür ederiz."},
     ),
     StructuredTool.from_function(
         name = "request_additional_package",
         description = "Kullanıcının ek paket talebini başlatır.",
         func = request_additional_package,
         args_schema = UserIdExtraPackage,
+        metadata = {"return_direct": True, "response_template": "{message}. Başka bir konuda yardımcı olabilir miyim?"},
     ),
     StructuredTool.from_function(
         name = "initiate_billing_dispute",
         description = "Belirtilen kullanıcının fatura itirazını kaydeder.",
         func = initiate_billing_dispute,
         args_schema = UserIdReason,
+        metadata = {"return_direct": True, "response_template": "{message}. İtirazınız incelendikten sonra size bilgi verilecektir."},
     ),
     StructuredTool.from_function(
         name = "get_package_id_by_name",
@@ -245,42 +256,49 @@ tool_registry = [
         description = "Kullanıcıya ait hattın durum bilgisini verir.",
         func = get_line_status,
         args_schema = UserId,
+        metadata = {"response_template": "{data}. Başka bir konuda yardımcı olabilir miyim?"},
     ),
     StructuredTool.from_function(
         name = "pay_bill",
         description = "Kullanıcının faturayı ödeme işlemini gerçekleştirir.",
         func = pay_bill,
         args_schema = UserIdAmountMethod,
+        metadata = {"return_direct": True, "response_template": "{message}. Başka bir konuda yardımcı olabilir miyim?"},
     ),
     StructuredTool.from_function(
         name = "get_outstanding_balance",
         description = "Ödenmemiş fatura borcunun toplamını döndürür.",
         func = get_outstanding_balance,
         args_schema = UserId,
+        metadata = {"response_template": "{data}. Ödeme yapmak isterseniz yardımcı olabilirim."},
     ),
     StructuredTool.from_function(
         name = "cancel_support_ticket",
         description = "Belirtilen destek talebini iptal eder.",
         func = cancel_support_ticket,
         args_schema = UserIdTicketId,
+        metadata = {"return_direct": True, "response_template": "{message}. Başka bir konuda yardımcı olabilir miyim?"},
     ),
     StructuredTool.from_function(
         name = "get_ticket_status",
         description = "Belirli bir destek talebinin güncel durumunu getirir.",
         func = get_ticket_status,
         args_schema = UserIdTicketId,
+        metadata = {"response_template": "{ticket_id} numaralı destek talebinizin durumu: {status}. Başka bir konuda yardımcı olabilir miyim?"},
     ),
     StructuredTool.from_function(
         name = "create_support_ticket",
         description = "Yeni bir teknik destek talebi oluşturur.",
         func = create_support_ticket,
-        args_schema = CreateTicket
+        args_schema = CreateTicket,
+        metadata = {"return_direct": True, "response_template": "{message}. Talep numaranız: {ticket_id}."},
     ),
     StructuredTool.from_function(
         name = "join_campaign",
         description = "Kullanıcıyı belirtilen kampanyaya katar.",
         func = join_campaign,
         args_schema = UserIdCampaignId,
+        metadata = {"return_direct": True, "response_template": "{message}. Başka bir konuda yardımcı olabilir miyim?"},
     ),
     StructuredTool.from_function(
         name = "get_campaigns",
@@ -292,3 +310,33 @@ tool_registry = [
 
 #  dict olarak da erişim gerekirse:
 # tool_registry = {tool.name: tool for tool in lc_tools}
+
+
+# Terminal araç metadatası ve Türkçe yanıt üretici
+TOOL_METADATA = {tool.name: dict(tool.metadata or {}) for tool in tool_registry}
+
+
+def is_terminal_tool(tool_name: str) -> bool:
+    return bool(TOOL_METADATA.get(tool_name, {}).get("return_direct"))
+
+
+def _clean(value):
+    # Sonuç metinleri bazen boşluk/nokta ile bitiyor; şablon noktalaması tek kalsın
+    if isinstance(value, str):
+        return value.strip().rstrip(".")
+    return value
+
+
+def render_tool_result(tool_name: str, result) -> Optional[str]:
+    """
+    Başarılı bir araç sonucunu response_template ile metne çevirir.
+    Şablon yoksa, sonuç başarısızsa veya alan eksik/None ise None döner.
+    """
+    template = TOOL_METADATA.get(tool_name, {}).get("response_template")
+    if not template or not isinstance(result, dict) or result.get("success") is not True:
+        return None
+    fields = {k: _clean(v) for k, v in result.items() if v is not None}
+    try:
+        return template.format_map(fields)
+    except (KeyError, IndexError, ValueError, TypeError):
+        return None
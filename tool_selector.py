@@ -0,0 +1,71 @@
+"""
+Mesaja göre ajana verilecek araç alt kümesini seçmek için sözcüksel eşleştirici.
+
+Her araç için bir belge (adı + açıklaması + varsa ek anahtar kelimeler) intent_classifier ile aynı
+özelliklere (karakter n-gram + kelime) çevrilir ve TF-IDF ile ağırlıklandırılır.
+rank() mesajla kosinüs benzerliğine göre araçları sıralar; niyet kapsamı bununla tamamlanır
+(bkz. agent_runner.select_tool_names).
+"""
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from intent_classifier import _l2_normalize, extract_features
+
+# Açıklamalarda geçmeyen ama kullanıcıların sık kullandığı ifadeler
+TOOL_KEYWORDS: Dict[str, str] = {
+    "get_bill_info": "fatura tutarı son ödeme tarihi aylık fatura",
+    "pay_bill": "ödeme yap öde kredi kartı havale",
+    "get_outstanding_balance": "borç borcum toplam bakiye ödenmemiş",
+    "get_line_status": "hat durumu hattım aktif kapalı",
+    "get_package_information": "paketim mevcut paket tarifem",
+    "get_available_packages": "paket seçenekleri tarifeler yeni paket",
+    "initiate_package_change": "paket değiştir geçmek istiyorum tarife değişikliği",
+    "cancel_current_package": "paket iptal iptal etmek",
+    "get_additional_packages": "ek paket ekstra internet",
+    "request_additional_package": "ek paket almak ekstra gb dakika sms",
+    "initiate_billing_dispute": "itiraz fatura yanlış hatalı",
+    "create_support_ticket": "arıza internet yavaş çekmiyor destek talebi şikayet",
+    "get_ticket_status": "destek talebi durumu kayıt numarası",
+    "cancel_support_ticket": "destek talebi iptal",
+    "get_campaigns": "kampanya kampanyalar fırsat indirim",
+    "join_campaign": "kampanyaya katıl katılmak",
+    "submit_feedback": "geri bildirim öneri memnuniyet puan",
+    "get_user_info": "bilgilerim adım e-posta hesabım",
+    "get_package_id_by_name": "paket adı paket kimliği",
+}
+
+
+class ToolSelector:
+    def __init__(self, tool_docs: Dict[str, str]):
+        docs = {name: extract_features(text) for name, text in tool_docs.items()}
+        df: Counter = Counter()
+        for feats in docs.values():
+            df.update(feats.keys())
+        n_docs = len(docs)
+        self.idf = {f: math.log((n_docs + 1) / (c + 1)) + 1.0 for f, c in df.items()}
+        self.names = list(docs)
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for idx, name in enumerate(self.names):
+            vec = self._weigh(docs[name])
+            for feat, weight in vec.items():
+                self._postings[feat].append((idx, weight))
+
+    @classmethod
+    def from_registry(cls, registry: Iterable, keywords: Optional[Dict[str, str]] = None) -> "ToolSelector":
+        keywords = TOOL_KEYWORDS if keywords is None else keywords
+        docs = {
+            entry.name: f"{entry.name.replace('_', ' ')} {entry.description} {keywords.get(entry.name, '')}"
+            for entry in registry
+        }
+        return cls(docs)
+
+    def _weigh(self, feats: Counter) -> Dict[str, float]:
+        return _l2_normalize({f: (1.0 + math.log(c)) * self.idf[f] for f, c in feats.items() if f in self.idf})
+
+    def rank(self, text: str) -> List[Tuple[str, float]]:
+        sims = [0.0] * len(self.names)
+        for feat, weight in self._weigh(extract_features(text)).items():
+            for idx, tw in self._postings.get(feat, ()):
+                sims[idx] += weight * tw
+        return sorted(zip(self.names, sims), key=lambda x: x[1], reverse=True)
@@ -1,6 +1,6 @@
 import datetime
 import uuid
-from memory import AgentMemory
+from memory import AgentMemory, memory
 from typing import Optional, List, Dict, Any
 from langchain.tools import StructuredTool
 import uuid
@@ -34,8 +34,6 @@ from mock_apis import (
     # get_bill_info
 )
 
-memory = AgentMemory()
-
 def general_question(
     message: str = "",
     context: dict = None,
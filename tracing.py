@@ -0,0 +1,219 @@
+"""
+Hafif, süreç içi izleme (tracing): her main()/amain() turu bir iz (trace), içindeki supervisor,
+LLM çağrıları, araçlar, SQLite sorguları ve bellek kaydı iç içe span'lerdir.
+
+Aktif iz ContextVar ile taşınır; thread havuzuna (asyncio.to_thread, LangChain executor'ları)
+kopyalanan bağlamda da aynı ize yazılır. İz yoksa span() hiçbir şey yapmaz.
+Tamamlanan izler TRACE_PATH'e JSONL olarak eklenir; /api/traces bu dosyayı okur.
+
+Örnek satır:
+    {"trace_id": "...", "name": "turn", "user_id": "user000", "start": 1718000000.1, "duration_ms": 812.4,
+     "spans": [{"span_id": "...", "parent_id": null, "name": "turn", "duration_ms": 812.4, "attrs": {...}}, ...]}
+"""
+import json
+import math
+import os
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+TRACE_PATH = "traces.jsonl"
+# Dosya bu boyutu aşınca traces.jsonl.1'e döndürülür
+TRACE_MAX_BYTES = 20 * 1024 * 1024
+SQL_ATTR_CHARS = 120
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "start", "duration_ms", "attrs", "_t0")
+
+    def __init__(self, name: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.duration_ms: Optional[float] = None
+        self.attrs = attrs
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self):
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attrs": self.attrs,
+        }
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+
+_TRACE: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_SPAN: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+_write_lock = threading.Lock()
+
+
+def current_span() -> Optional[Span]:
+    return _SPAN.get() if _TRACE.get() is not None else None
+
+
+def set_attrs(**attrs):
+    """Aktif span'e öznitelik ekler (ör. token sayıları); iz yoksa bir şey yapmaz."""
+    span = current_span()
+    if span is not None:
+        span.set(**attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    trace = _TRACE.get()
+    if trace is None:
+        yield None
+        return
+    parent = _SPAN.get()
+    current = Span(name, parent.span_id if parent else None, attrs)
+    trace.add(current)
+    token = _SPAN.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end()
+        _SPAN.reset(token)
+
+
+@contextmanager
+def start_trace(name: str = "turn", **attrs):
+    """Yeni bir iz başlatır; blok bitince iz diske yazılır. İç içe çağrılırsa mevcut ize span açar."""
+    if _TRACE.get() is not None:
+        with span(name, **attrs) as s:
+            yield s
+        return
+    trace = Trace()
+    trace_token = _TRACE.set(trace)
+    try:
+        with span(name, **attrs) as root:
+            yield root
+    finally:
+        _TRACE.reset(trace_token)
+        _write_trace(trace, name)
+
+
+def _write_trace(trace: Trace, name: str):
+    spans = [s.to_dict() for s in trace.spans]
+    root = spans[0] if spans else {}
+    record = {
+        "trace_id": trace.trace_id,
+        "name": name,
+        "user_id": root.get("attrs", {}).get("user_id"),
+        "start": root.get("start"),
+        "duration_ms": root.get("duration_ms"),
+        "spans": spans,
+    }
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    try:
+        with _write_lock:
+            if os.path.exists(TRACE_PATH) and os.path.getsize(TRACE_PATH) > TRACE_MAX_BYTES:
+                os.replace(TRACE_PATH, f"{TRACE_PATH}.1")
+            with open(TRACE_PATH, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"[WARN] İz yazılamadı: {e}")
+
+
+# --- SQLite sorgu span'leri ---------------------------------------------------
+def _sql_attr(sql: str) -> str:
+    return " ".join(sql.split())[:SQL_ATTR_CHARS]
+
+
+class TracedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        with span("sqlite.query", sql=_sql_attr(sql)):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with span("sqlite.query", sql=_sql_attr(sql), many=True):
+            return super().executemany(sql, seq_of_parameters)
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=TracedConnection): her sorgu aktif izde bir span olur."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        with span("sqlite.commit"):
+            return super().commit()
+
+
+# --- Okuma / özet --------------------------------------------------------------
+def read_traces(limit: int = 50, user_id: Optional[str] = None,
+                min_duration_ms: Optional[float] = None, path: str = TRACE_PATH) -> List[Dict[str, Any]]:
+    """Filtreye uyan en yeni `limit` izi yeniden eskiye sıralı döner."""
+    if not os.path.exists(path):
+        return []
+    matched: deque = deque(maxlen=max(limit, 0))
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if user_id and record.get("user_id") != user_id:
+                continue
+            if min_duration_ms is not None and (record.get("duration_ms") or 0) < min_duration_ms:
+                continue
+            matched.append(record)
+    return list(reversed(matched))
+
+
+def summarize(traces: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Span adı başına adet, ortalama/p95 süre ve tur başına toplam süre payı."""
+    durations: Dict[str, List[float]] = defaultdict(list)
+    total_turn_ms = 0.0
+    for record in traces:
+        total_turn_ms += record.get("duration_ms") or 0.0
+        for s in record.get("spans", []):
+            if s.get("duration_ms") is not None:
+                durations[s["name"]].append(s["duration_ms"])
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            "count": len(values),
+            "mean_ms": round(statistics.mean(values), 3),
+            "p95_ms": round(values[max(0, math.ceil(len(values) * 0.95) - 1)], 3),
+            "total_ms": round(sum(values), 3),
+            "share": round(sum(values) / total_turn_ms, 4) if total_turn_ms else 0.0,
+        }
+    return dict(sorted(summary.items(), key=lambda kv: kv[1]["total_ms"], reverse=True))